@@ -0,0 +1,175 @@
+import json # cached responses are stored as JSON
+import sqlite3 # the cache is a single SQLite file indexed by block number
+import time # used to limit how often the finalized head is refreshed
+import zlib # cached responses are stored compressed
+from web3 import Web3 # used to serialize web3 responses
+from audit_transfers import TRANSFER_TOPIC, fetch_transfer_logs # raw Transfer log requests
+
+# Approximate bytes taken by a contract flag besides its address: the flag, the time it was checked and the row overhead
+CONTRACT_FLAG_BYTES = 24
+
+# Read-through cache of finalized block bodies and Transfer logs, so repeated audits of the same
+# block ranges are served from disk instead of the provider. Only finalized blocks are stored since
+# they can no longer change. Once the cache grows past `max_bytes`, the least recently used blocks are evicted.
+# Access times are kept in memory and written in batches, so reading from a warm cache doesn't write on every hit.
+# Whether an address holds contract code is cached too, for `code_ttl` seconds since it is read at the latest
+# block and an address can gain code (or, with EIP-7702 delegations, lose it) over time. These flags count
+# toward `max_bytes` as well: expired ones are dropped first on eviction, then the least recently checked.
+class BlockCache:
+    def __init__(self, w3, file_path, max_bytes=2 * 1024 ** 3, finality_depth=64, access_batch=1000, code_ttl=3600):
+        self.w3 = w3
+        self.max_bytes = max_bytes
+        self.finality_depth = finality_depth
+        self.access_batch = access_batch
+        self.code_ttl = code_ttl
+        self.finalized_block = -1
+        self.finalized_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.accessed = {}
+
+        self.connection = sqlite3.connect(file_path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        for table in ("blocks", "transfer_logs"):
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "number INTEGER PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS contract_flags (address TEXT PRIMARY KEY, is_contract INTEGER NOT NULL, checked REAL NOT NULL)"
+        )
+        self.total_bytes = self._stored_bytes()
+
+    # Function to fetch a block with its full transactions
+    # Cached blocks are returned as plain dicts with hex strings in place of HexBytes values
+    def get_block(self, block_num):
+        return self._read_through(
+            "blocks", block_num, lambda: self.w3.eth.getBlock(block_num, full_transactions=True)
+        )
+
+    # Function to fetch all the ERC20 Transfer logs of a block
+    def get_transfer_logs(self, block_num):
+        block_hex = hex(block_num)
+        return self._read_through(
+            "transfer_logs", block_num,
+            lambda: fetch_transfer_logs(self.w3, {"fromBlock": block_hex, "toBlock": block_hex, "topics": [TRANSFER_TOPIC]})
+        )
+
+    # Function to check whether an address holds contract code, i.e. whether a transaction to it can be traced
+    def is_contract(self, address):
+        address = address.lower()
+        now = time.time()
+        cached = self.connection.execute(
+            "SELECT is_contract, checked FROM contract_flags WHERE address = ?", (address,)
+        ).fetchone()
+        if cached is not None and now - cached[1] < self.code_ttl:
+            self.hits += 1
+            return bool(cached[0])
+
+        self.misses += 1
+        is_contract = len(self.w3.eth.getCode(Web3.toChecksumAddress(address))) > 0
+        self.connection.execute(
+            "INSERT OR REPLACE INTO contract_flags (address, is_contract, checked) VALUES (?, ?, ?)",
+            (address, is_contract, now)
+        )
+        if cached is None:
+            self.total_bytes += len(address) + CONTRACT_FLAG_BYTES
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+        return is_contract
+
+    def _read_through(self, table, block_num, fetch):
+        row = self.connection.execute(f"SELECT data FROM {table} WHERE number = ?", (block_num,)).fetchone()
+        if row is not None:
+            self.hits += 1
+            self.accessed[(table, block_num)] = time.time()
+            if len(self.accessed) >= self.access_batch:
+                self._write_access_times()
+            return json.loads(zlib.decompress(row[0]))
+
+        self.misses += 1
+        result = fetch()
+        if self._is_finalized(block_num):
+            self._store(table, block_num, zlib.compress(Web3.toJSON(result).encode()))
+        return result
+
+    def _is_finalized(self, block_num):
+        # Only ask the provider again when the block is past the last known finalized head
+        if block_num > self.finalized_block and time.monotonic() - self.finalized_checked_at > 12:
+            self.finalized_checked_at = time.monotonic()
+            try:
+                self.finalized_block = self.w3.eth.getBlock("finalized")["number"]
+            except Exception:
+                # Providers without the "finalized" tag, assume blocks deep enough are final
+                self.finalized_block = self.w3.eth.blockNumber - self.finality_depth
+        return block_num <= self.finalized_block
+
+    def _store(self, table, block_num, data):
+        self.connection.execute("BEGIN IMMEDIATE")
+        previous = self.connection.execute(f"SELECT size FROM {table} WHERE number = ?", (block_num,)).fetchone()
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {table} (number, data, size, accessed) VALUES (?, ?, ?, ?)",
+            (block_num, data, len(data), time.time())
+        )
+        self.connection.execute("COMMIT")
+        self.total_bytes += len(data) - (previous[0] if previous else 0)
+
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+
+    # Function to write the access times of the cache hits since the last batch in a single transaction
+    def _write_access_times(self):
+        if not self.accessed:
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        for (table, number), accessed in self.accessed.items():
+            self.connection.execute(f"UPDATE {table} SET accessed = ? WHERE number = ?", (accessed, number))
+        self.connection.execute("COMMIT")
+        self.accessed = {}
+
+    # Function to drop the least recently used entries until the cache is back under 90% of its size limit
+    def _evict(self):
+        # Entries read since the last batch must not look unused
+        self._write_access_times()
+        target = int(self.max_bytes * 0.9)
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        # Expired contract flags would be checked again anyway
+        self.connection.execute("DELETE FROM contract_flags WHERE checked < ?", (time.time() - self.code_ttl,))
+        # Other processes may be sharing the cache file, so start from the actual size
+        self.total_bytes = self._stored_bytes()
+        while self.total_bytes > target:
+            oldest = []
+            for table in ("blocks", "transfer_logs"):
+                oldest.extend(
+                    (accessed, table, "number", number, size) for number, size, accessed in self.connection.execute(
+                        f"SELECT number, size, accessed FROM {table} ORDER BY accessed LIMIT 256"
+                    )
+                )
+            oldest.extend(
+                (checked, "contract_flags", "address", address, size) for address, size, checked in self.connection.execute(
+                    "SELECT address, LENGTH(address) + ?, checked FROM contract_flags ORDER BY checked LIMIT 256",
+                    (CONTRACT_FLAG_BYTES,)
+                )
+            )
+            if not oldest:
+                break
+            for _, table, key_column, key, size in sorted(oldest)[:256]:
+                self.connection.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= target:
+                    break
+        self.connection.execute("COMMIT")
+
+    def _stored_bytes(self):
+        return sum(
+            self.connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+            for table in ("blocks", "transfer_logs")
+        ) + self.connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(address) + ?), 0) FROM contract_flags", (CONTRACT_FLAG_BYTES,)
+        ).fetchone()[0]
+
+    def close(self):
+        self._write_access_times()
+        self.connection.close()
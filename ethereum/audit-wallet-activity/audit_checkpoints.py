@@ -0,0 +1,200 @@
+import os # used to build a default worker id and to key the output files
+import socket # used to build a default worker id
+import sqlite3 # the checkpoint store is a single SQLite file shared by all workers
+import time # used to expire stale range claims
+
+# Records which block ranges of an audit are finished, which records were already written out and how far
+# each output file was written when they were, so a restarted audit skips completed work. Several workers
+# (threads or processes) can share the same file and claim disjoint ranges from it. A worker keeps its claims
+# by renewing their lease while it processes them, claims whose lease ran out are free to be claimed again.
+# Each output file belongs to one worker at a time under the same lease, since resuming cuts the file back to
+# the last size its worker checkpointed.
+class CheckpointStore:
+    def __init__(self, file_path, lease_seconds=600):
+        self.file_path = file_path
+        self.lease_seconds = lease_seconds
+        self.renewed_at = 0.0
+        self.connection = sqlite3.connect(file_path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ranges ("
+            "start_block INTEGER PRIMARY KEY, end_block INTEGER NOT NULL, "
+            "status TEXT NOT NULL, worker TEXT, claimed_at REAL)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS emitted (record_key TEXT PRIMARY KEY)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            "file_path TEXT PRIMARY KEY, offset INTEGER NOT NULL, worker TEXT, updated_at REAL)"
+        )
+        # Stores created before outputs had an owner
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outputs)")]
+        for column, column_type in (("worker", "TEXT"), ("updated_at", "REAL")):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE outputs ADD COLUMN {column} {column_type}")
+
+    # Function to atomically claim the next unfinished range of at most `size` blocks
+    # Claims older than `lease_seconds` are considered abandoned (e.g. the worker crashed) and can be claimed again
+    def claim_range(self, from_block, to_block, size, worker_id=None):
+        worker_id = worker_id or default_worker_id()
+        now = time.time()
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Drop abandoned claims so their blocks become available again
+            self.connection.execute(
+                "DELETE FROM ranges WHERE status = 'claimed' AND claimed_at < ?",
+                (now - self.lease_seconds,)
+            )
+            taken = self.connection.execute(
+                "SELECT start_block, end_block FROM ranges WHERE end_block >= ? AND start_block <= ? ORDER BY start_block",
+                (from_block, to_block)
+            ).fetchall()
+
+            # Find the first gap between the taken ranges
+            start = from_block
+            for taken_start, taken_end in taken:
+                if taken_start > start:
+                    break
+                start = max(start, taken_end + 1)
+            if start > to_block:
+                self.connection.execute("COMMIT")
+                return None
+
+            end = min(start + size - 1, to_block)
+            for taken_start, _ in taken:
+                if taken_start > start:
+                    end = min(end, taken_start - 1)
+                    break
+
+            self.connection.execute(
+                "INSERT INTO ranges (start_block, end_block, status, worker, claimed_at) VALUES (?, ?, 'claimed', ?, ?)",
+                (start, end, worker_id, now)
+            )
+            self.connection.execute("COMMIT")
+            return start, end
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    # Generator that keeps claiming ranges until the whole audit is covered
+    def iter_claims(self, from_block, to_block, size, worker_id=None):
+        while True:
+            claimed = self.claim_range(from_block, to_block, size, worker_id)
+            if claimed is None:
+                return
+            yield claimed
+
+    # Function to mark a claimed range as finished
+    def complete_range(self, start, end):
+        self.connection.execute(
+            "UPDATE ranges SET status = 'done', claimed_at = ? WHERE start_block = ? AND end_block = ?",
+            (time.time(), start, end)
+        )
+
+    # Function to extend the lease of the ranges a worker is processing
+    # Leases are renewed at most every tenth of their duration, so it can be called for every block
+    def renew_claims(self, worker_id):
+        now = time.time()
+        if now - self.renewed_at < self.lease_seconds / 10:
+            return
+        self.renewed_at = now
+        self.connection.execute("BEGIN")
+        self.connection.execute(
+            "UPDATE ranges SET claimed_at = ? WHERE status = 'claimed' AND worker = ?", (now, worker_id)
+        )
+        self.connection.execute("UPDATE outputs SET updated_at = ? WHERE worker = ?", (now, worker_id))
+        self.connection.execute("COMMIT")
+
+    # Function to release the ranges a worker claimed but never finished, e.g. before restarting it
+    def release_claims(self, worker_id):
+        self.connection.execute("DELETE FROM ranges WHERE status = 'claimed' AND worker = ?", (worker_id,))
+
+    # Function to count the blocks of an audit that still need to be processed
+    def remaining_blocks(self, from_block, to_block):
+        done = self.connection.execute(
+            "SELECT COALESCE(SUM(MIN(end_block, ?) - MAX(start_block, ?) + 1), 0) FROM ranges "
+            "WHERE status = 'done' AND end_block >= ? AND start_block <= ?",
+            (to_block, from_block, from_block, to_block)
+        ).fetchone()[0]
+        return (to_block - from_block + 1) - done
+
+    # Function to check which of the given records were already written out by a previous run
+    def emitted_keys(self, keys):
+        keys = list(keys)
+        emitted = set()
+        # Stay under SQLite's limit on the number of query parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.connection.execute(
+                f"SELECT record_key FROM emitted WHERE record_key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            emitted.update(row[0] for row in rows)
+        return emitted
+
+    # Function to remember records that were written out
+    # With `output_path`, the size of the output once they were flushed is stored in the same transaction, so
+    # a resumed run can cut off whatever was written after it and never marked (see `claim_output`)
+    def mark_emitted(self, keys, output_path=None, output_offset=None):
+        self.connection.execute("BEGIN")
+        self.connection.executemany("INSERT OR IGNORE INTO emitted (record_key) VALUES (?)", [(key,) for key in keys])
+        if output_path is not None and output_offset is not None:
+            self.connection.execute(
+                "UPDATE outputs SET offset = ?, updated_at = ? WHERE file_path = ?",
+                (output_offset, time.time(), os.path.abspath(output_path))
+            )
+        self.connection.execute("COMMIT")
+
+    # Function to take an output file for a worker, returns its size at the last checkpoint (None if it was never
+    # checkpointed) to cut it back to
+    # Raises ValueError while another worker writes to it: cutting the file back would delete the records that
+    # worker already marked as written. The file is taken over once its owner released it or its lease ran out.
+    def claim_output(self, output_path, worker_id):
+        output_path = os.path.abspath(output_path)
+        now = time.time()
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT offset, worker, updated_at FROM outputs WHERE file_path = ?", (output_path,)
+            ).fetchone()
+            if row is None:
+                self.connection.execute(
+                    "INSERT INTO outputs (file_path, offset, worker, updated_at) VALUES (?, 0, ?, ?)",
+                    (output_path, worker_id, now)
+                )
+                self.connection.execute("COMMIT")
+                return None
+
+            offset, owner, updated_at = row
+            if owner not in (None, worker_id) and now - (updated_at or 0) < self.lease_seconds:
+                raise ValueError(
+                    f"{output_path} is being written by worker {owner}: give each worker its own output file, or pass "
+                    f"--worker-id {owner} to take it over if that worker is gone"
+                )
+            self.connection.execute(
+                "UPDATE outputs SET worker = ?, updated_at = ? WHERE file_path = ?", (worker_id, now, output_path)
+            )
+            self.connection.execute("COMMIT")
+            return offset
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    # Function to give up an output file once a worker stopped writing to it, so any worker can resume it
+    def release_output(self, output_path, worker_id):
+        self.connection.execute(
+            "UPDATE outputs SET worker = NULL WHERE file_path = ? AND worker = ?", (os.path.abspath(output_path), worker_id)
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Function to identify the current worker in the claims table
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -0,0 +1,175 @@
+import json # used to estimate request and response sizes and to export the metrics
+import threading # requests are made from several threads when tracing
+import time # used to time each request
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")]
+
+# Function to create the statistics of one RPC method
+def new_method_stats():
+    return {
+        "requests": 0,
+        "errors": 0,
+        "retries": 0,
+        "request_bytes": 0,
+        "response_bytes": 0,
+        "seconds": 0.0,
+        "buckets": [0] * len(LATENCY_BUCKETS)
+    }
+
+# Records the count, payload sizes and latency histogram of every JSON-RPC request per method
+# (eth_getBlockByNumber, eth_getCode, eth_getLogs, debug_traceTransaction, ...), to see where the time of an
+# audit goes and what it costs. `credit_costs` maps method names to the provider credits charged per request.
+# Payload sizes are measured on the JSON encoded params and decoded responses, close to but not exactly the
+# bytes on the wire; set `measure_bytes=False` to skip that work on large responses. Requests rejected by the
+# provider's rate limit count as errors, and the retries made for them are counted too (see audit_retries.py).
+class RpcMetrics:
+    def __init__(self, credit_costs=None, measure_bytes=True):
+        self.credit_costs = credit_costs or {}
+        self.measure_bytes = measure_bytes
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    # Function to record every request made through a web3 instance
+    # The provider itself is wrapped so requests made directly with `w3.provider.make_request` are recorded too
+    def instrument(self, w3):
+        make_request = w3.provider.make_request
+
+        def instrumented_make_request(method, params):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = make_request(method, params)
+                return response
+            finally:
+                self.record(method, time.perf_counter() - started, params, response)
+
+        w3.provider.make_request = instrumented_make_request
+        return w3
+
+    def record(self, method, seconds, params, response):
+        request_bytes = response_bytes = 0
+        if self.measure_bytes:
+            request_bytes = len(json.dumps(params, default=str))
+            if response is not None:
+                response_bytes = len(json.dumps(response, default=str))
+        failed = response is None or "error" in response
+        bucket = next(i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound)
+
+        with self.lock:
+            stats = self.methods.setdefault(method, new_method_stats())
+            stats["requests"] += 1
+            stats["errors"] += failed
+            stats["request_bytes"] += request_bytes
+            stats["response_bytes"] += response_bytes
+            stats["seconds"] += seconds
+            stats["buckets"][bucket] += 1
+
+    # Function to count a request sent again after it was rejected by the provider's rate limit
+    def record_retry(self, method):
+        with self.lock:
+            self.methods.setdefault(method, new_method_stats())["retries"] += 1
+
+    # Function to drop the recorded statistics, e.g. at the start of a new audit
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+
+    # Function to take the recorded statistics and start over, used to collect them from worker processes
+    def snapshot(self, reset=False):
+        with self.lock:
+            methods = self.methods
+            if reset:
+                self.methods = {}
+            else:
+                methods = json.loads(json.dumps(methods))
+        return methods
+
+    # Function to add the statistics recorded by another RpcMetrics instance, e.g. in a worker process
+    def merge(self, methods):
+        with self.lock:
+            for method, other in methods.items():
+                stats = self.methods.setdefault(method, new_method_stats())
+                for key in ("requests", "errors", "retries", "request_bytes", "response_bytes", "seconds"):
+                    stats[key] += other[key]
+                stats["buckets"] = [a + b for a, b in zip(stats["buckets"], other["buckets"])]
+
+    # Function to estimate a latency percentile from the histogram buckets
+    @staticmethod
+    def percentile(stats, fraction):
+        target = stats["requests"] * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def total_requests(self):
+        return sum(stats["requests"] for stats in self.methods.values())
+
+    def total_retries(self):
+        return sum(stats["retries"] for stats in self.methods.values())
+
+    def total_credits(self):
+        return sum(stats["requests"] * self.credit_costs.get(method, 0) for method, stats in self.methods.items())
+
+    # Function to format a per-method summary table
+    def summary(self, blocks=None):
+        lines = [
+            f"{'method':<28} {'requests':>9} {'errors':>7} {'retries':>8} {'sent KB':>9} {'recv KB':>10} "
+            f"{'avg ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'total s':>8}"
+        ]
+        for method, stats in sorted(self.methods.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{method:<28} {stats['requests']:>9} {stats['errors']:>7} {stats['retries']:>8} "
+                f"{stats['request_bytes'] / 1024:>9.1f} "
+                f"{stats['response_bytes'] / 1024:>10.1f} {stats['seconds'] / stats['requests'] * 1000:>8.1f} "
+                f"{format_bound(self.percentile(stats, 0.5)):>8} {format_bound(self.percentile(stats, 0.99)):>8} "
+                f"{stats['seconds']:>8.1f}"
+            )
+
+        total = f"Total: {self.total_requests()} requests"
+        if self.total_retries():
+            total += f" ({self.total_retries()} retried after a rate limit)"
+        if blocks:
+            total += f", {self.total_requests() / blocks:.2f} requests per block"
+        if self.credit_costs:
+            total += f", {self.total_credits():,} credits"
+        lines.append(total)
+        return "\n".join(lines)
+
+    # Function to export the metrics as JSON, or in the Prometheus text format for paths ending in .prom
+    def export(self, file_path):
+        with open(file_path, "w") as metrics_file:
+            if file_path.endswith(".prom"):
+                metrics_file.write(self.to_prometheus())
+            else:
+                json.dump({"methods": self.methods, "buckets": [str(bound) for bound in LATENCY_BUCKETS],
+                           "credits": self.total_credits()}, metrics_file, indent=4)
+
+    def to_prometheus(self):
+        lines = [
+            "# TYPE wallet_auditor_rpc_request_seconds histogram",
+            "# TYPE wallet_auditor_rpc_errors_total counter",
+            "# TYPE wallet_auditor_rpc_retries_total counter",
+            "# TYPE wallet_auditor_rpc_request_bytes_total counter",
+            "# TYPE wallet_auditor_rpc_response_bytes_total counter",
+        ]
+        for method, stats in sorted(self.methods.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else bound
+                lines.append(f'wallet_auditor_rpc_request_seconds_bucket{{method="{method}",le="{le}"}} {cumulative}')
+            lines.append(f'wallet_auditor_rpc_request_seconds_sum{{method="{method}"}} {stats["seconds"]}')
+            lines.append(f'wallet_auditor_rpc_request_seconds_count{{method="{method}"}} {stats["requests"]}')
+            lines.append(f'wallet_auditor_rpc_errors_total{{method="{method}"}} {stats["errors"]}')
+            lines.append(f'wallet_auditor_rpc_retries_total{{method="{method}"}} {stats["retries"]}')
+            lines.append(f'wallet_auditor_rpc_request_bytes_total{{method="{method}"}} {stats["request_bytes"]}')
+            lines.append(f'wallet_auditor_rpc_response_bytes_total{{method="{method}"}} {stats["response_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+# Function to format a histogram bucket bound in milliseconds
+def format_bound(bound):
+    return ">10000" if bound == float("inf") else f"<={bound * 1000:g}"
@@ -0,0 +1,45 @@
+import random # used to jitter the backoff so retrying threads don't hit the provider in lockstep
+import time # used to wait between attempts
+import requests # rate limited requests are rejected with an HTTP 429 error
+
+# JSON-RPC error code providers answer with when the request rate of the plan is exceeded
+RATE_LIMIT_ERROR_CODE = -32005
+
+# Function to retry the requests rejected by the provider's rate limit, with a jittered exponential backoff
+# Providers reject them either with an HTTP 429 response or with a -32005 JSON-RPC error. The provider itself is
+# wrapped, like RpcMetrics does, since most of the auditor's requests go straight to `w3.provider.make_request`
+# and skip web3's middlewares. A Retry-After header, when present, is waited out instead of the backoff.
+# Each retry is counted in `metrics`; once `max_retries` retries are used up the rejection is raised as it is.
+def retry_rate_limited(w3, metrics=None, max_retries=8, backoff_base=0.25, backoff_max=10.0):
+    make_request = w3.provider.make_request
+
+    def retrying_make_request(method, params):
+        attempt = 0
+        while True:
+            try:
+                response = make_request(method, params)
+                error = response.get("error")
+                if not isinstance(error, dict) or error.get("code") != RATE_LIMIT_ERROR_CODE or attempt >= max_retries:
+                    return response
+                delay = None
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 429 or attempt >= max_retries:
+                    raise
+                delay = retry_after(e.response)
+
+            if delay is None:
+                delay = random.uniform(0, min(backoff_max, backoff_base * 2 ** attempt))
+            attempt += 1
+            if metrics is not None:
+                metrics.record_retry(method)
+            time.sleep(delay)
+
+    w3.provider.make_request = retrying_make_request
+    return w3
+
+# Function to read the seconds to wait from the Retry-After header of a rejected response, None without one
+def retry_after(response):
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
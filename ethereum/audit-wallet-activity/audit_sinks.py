@@ -0,0 +1,150 @@
+import gzip # used for the compressed JSON Lines output
+import io # used to write text to the output file
+import json # we will need this to serialize the audit records
+import os # used to sync the output to disk and cut it back on resume
+import time # used to flush the output periodically
+
+# Function to make web3 values (such as HexBytes) and compact records JSON serializable
+def to_serializable(value):
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return str(value)
+
+# Writes one JSON record per line and flushes it to disk periodically, so a crash only loses the unflushed tail
+# With `resume_offset`, the file is first cut back to that size (as returned by `sync`), dropping a partial tail
+# left by a crash. Compressed output is written as a series of gzip members, one per `sync`, so it stays
+# readable when cut back at any of these offsets.
+class JsonLinesSink:
+    def __init__(self, file_path, flush_every=100, flush_interval=5.0, append=False, resume_offset=None):
+        if resume_offset is not None and os.path.exists(file_path):
+            os.truncate(file_path, resume_offset)
+            append = True
+        self.file_path = file_path
+        self.compressed = file_path.endswith(".gz")
+        self.raw_file = open(file_path, "ab" if append else "wb")
+        self.file = self._open_member()
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self.records_written = 0
+        self.last_flush = time.monotonic()
+
+    def write_block(self, records):
+        for record in records:
+            self.file.write(json.dumps(record, default=to_serializable))
+            self.file.write("\n")
+        self.pending += len(records)
+        self.records_written += len(records)
+
+        # Flush after enough records or enough time, whichever comes first
+        if self.pending >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _open_member(self):
+        if self.compressed:
+            return io.TextIOWrapper(gzip.GzipFile(fileobj=self.raw_file, mode="wb"), encoding="utf-8")
+        return io.TextIOWrapper(self.raw_file, encoding="utf-8")
+
+    def flush(self):
+        self.file.flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    # Function to make everything written so far durable, returns the size of the file at that point
+    def sync(self):
+        if self.compressed:
+            # Closing the member writes its trailer, the raw file stays open for the next one
+            self.file.close()
+        else:
+            self.file.flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.raw_file.flush()
+        os.fsync(self.raw_file.fileno())
+        offset = os.fstat(self.raw_file.fileno()).st_size
+        if self.compressed:
+            self.file = self._open_member()
+        return offset
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.raw_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Writes the records to a Parquet file in row groups of `flush_every` records (requires `pip install pyarrow`)
+# Nested fields are stored as JSON strings and integer values as strings since they can exceed 64 bits
+class ParquetSink:
+    COLUMNS = ["block", "hash", "from", "to", "value", "gas", "gasPrice", "input", "matched", "token_transfers", "internal_transactions"]
+
+    def __init__(self, file_path, flush_every=10000, append=False):
+        import pyarrow # optional dependency, only needed for columnar output
+        import pyarrow.parquet
+
+        if append:
+            raise ValueError("Parquet output cannot be appended to, use a new file or JSON Lines output")
+
+        self.pyarrow = pyarrow
+        self.file_path = file_path
+        self.schema = pyarrow.schema([(column, pyarrow.int64() if column == "block" else pyarrow.string()) for column in self.COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(file_path, self.schema)
+        self.flush_every = flush_every
+        self.rows = []
+        self.records_written = 0
+
+    def write_block(self, records):
+        for record in records:
+            self.rows.append({
+                column: record[column] if column == "block" else self._to_column(record[column])
+                for column in self.COLUMNS
+            })
+        self.records_written += len(records)
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    # Number of records not yet written to the file
+    @property
+    def pending(self):
+        return len(self.rows)
+
+    def _to_column(self, value):
+        if value is None:
+            return None
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, default=to_serializable)
+        if isinstance(value, (bytes, bytearray)):
+            return to_serializable(value)
+        return str(value)
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(self.pyarrow.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    # Row groups can't be made durable one at a time, there is no offset to resume from
+    def sync(self):
+        self.flush()
+        return None
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Function to pick the output writer based on the file extension
+def open_sink(file_path, flush_every=100, append=False, resume_offset=None):
+    if file_path.endswith(".parquet"):
+        return ParquetSink(file_path, append=append)
+    return JsonLinesSink(file_path, flush_every=flush_every, append=append, resume_offset=resume_offset)
@@ -0,0 +1,126 @@
+import gzip # trace results are stored compressed
+import json # we will need this to store the trace results
+import os # used to lay out the cache directory
+from concurrent.futures import ThreadPoolExecutor # runs the trace requests concurrently
+
+# Stores trace results on disk keyed by transaction hash, which never change once a transaction is mined
+# Files are spread across subdirectories named after the first bytes of the hash to keep directories small
+class TraceCache:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, tx_hash):
+        key = tx_hash.lower().replace("0x", "")
+        return os.path.join(self.directory, key[:2], key[2:4], key + ".json.gz")
+
+    def get(self, tx_hash):
+        try:
+            with gzip.open(self._path(tx_hash), "rt") as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+
+    def put(self, tx_hash, result):
+        path = self._path(tx_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a truncated entry behind
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temp_path, "wt") as cache_file:
+            json.dump(result, cache_file)
+        os.replace(temp_path, path)
+
+# Structured trace failure, a dict with "type", "code" and "message" keys
+# A distinct type is used since successful call traces of reverted transactions carry an "error" key themselves
+class TraceFailure(dict):
+    pass
+
+# Function to build a structured trace failure
+def trace_error(error_type, message, code=None):
+    return TraceFailure(type=error_type, code=code, message=message)
+
+# Runs `debug_traceTransaction` requests concurrently, with its own concurrency limit so slow traces
+# don't hold up block and log requests. Successful results are cached, failures are returned as
+# TraceFailure dicts and retried on the next run.
+# When a block has at least `block_trace_threshold` transactions to trace, a single
+# `debug_traceBlockByNumber` request is made for the whole block instead.
+class Tracer:
+    def __init__(self, w3, max_workers=8, cache=None, block_trace_threshold=None, tracer_config=None):
+        self.w3 = w3
+        self.max_workers = max_workers
+        self.cache = cache
+        self.block_trace_threshold = block_trace_threshold
+        self.tracer_config = tracer_config or {"tracer": "callTracer"}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tracer")
+
+    # Function to trace a list of transactions, returning a dict of trace result or failure per transaction hash
+    # `block_num` and `block_tx_hashes` (all the transaction hashes of the block, in order) enable block tracing
+    def trace_transactions(self, tx_hashes, block_num=None, block_tx_hashes=None):
+        results = {}
+        missing = []
+        for tx_hash in tx_hashes:
+            cached = self.cache.get(tx_hash) if self.cache else None
+            if cached is not None:
+                results[tx_hash] = cached
+            else:
+                missing.append(tx_hash)
+
+        if not missing:
+            return results
+
+        traced = None
+        if self.block_trace_threshold and block_num is not None and len(missing) >= self.block_trace_threshold:
+            traced = self._trace_block(block_num, missing, block_tx_hashes)
+
+        # Fall back to tracing each transaction when block tracing is unavailable
+        if traced is None:
+            traced = dict(zip(missing, self.pool.map(self._trace_transaction, missing)))
+
+        for tx_hash, result in traced.items():
+            if self.cache and not isinstance(result, TraceFailure):
+                self.cache.put(tx_hash, result)
+            results[tx_hash] = result
+        return results
+
+    def _trace_transaction(self, tx_hash):
+        try:
+            response = self.w3.provider.make_request("debug_traceTransaction", [tx_hash, self.tracer_config])
+        except Exception as e:
+            return trace_error(type(e).__name__, str(e))
+
+        if "error" in response:
+            return trace_error("rpc", response["error"].get("message"), response["error"].get("code"))
+        return response["result"]
+
+    # Returns None when the block could not be traced as a whole
+    def _trace_block(self, block_num, tx_hashes, block_tx_hashes):
+        try:
+            response = self.w3.provider.make_request("debug_traceBlockByNumber", [hex(block_num), self.tracer_config])
+        except Exception:
+            return None
+
+        if "error" in response:
+            return None
+
+        # Newer clients include the transaction hash with each trace, older ones return the traces in block order
+        traces = {}
+        for position, entry in enumerate(response["result"]):
+            tx_hash = entry.get("txHash")
+            if tx_hash is None and block_tx_hashes is not None:
+                tx_hash = block_tx_hashes[position]
+            if tx_hash is not None:
+                traces[tx_hash.lower()] = entry
+
+        results = {}
+        for tx_hash in tx_hashes:
+            entry = traces.get(tx_hash.lower())
+            if entry is None:
+                results[tx_hash] = trace_error("missing", "Transaction not found in block trace")
+            elif "error" in entry:
+                results[tx_hash] = trace_error("trace", str(entry["error"]))
+            else:
+                results[tx_hash] = entry["result"]
+        return results
+
+    def close(self):
+        self.pool.shutdown()
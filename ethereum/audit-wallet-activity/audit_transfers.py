@@ -0,0 +1,104 @@
+from functools import lru_cache # checksummed addresses are memoized since the same tokens and wallets recur
+from web3 import Web3 # used to checksum addresses when the records are written out
+
+# ERC20 Transfer event signature
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Function to fetch Transfer logs as the raw JSON-RPC result
+# The request goes straight to the provider, skipping web3's result formatters which would checksum
+# and convert every field of every log, only for most of them to be discarded
+def fetch_transfer_logs(w3, filter_params):
+    response = w3.provider.make_request("eth_getLogs", [filter_params])
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
+
+# Function to read a quantity that is either an int or a hex string (as in raw JSON-RPC results)
+def as_int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+# Function to get the raw bytes of a HexBytes value or a hex string (as in raw results or the block cache)
+# HexBytes values are bytes already and are used as they are
+def as_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value[2:] if value[:2] == "0x" else value)
+
+# Function to format raw bytes as a hex string
+# bytes.hex is called directly since HexBytes overrides .hex() and, depending on its version, adds a 0x prefix
+def to_hex(value):
+    return "0x" + bytes.hex(value)
+
+# Function to checksum a 20 bytes address key
+@lru_cache(maxsize=65536)
+def checksum(address_key):
+    return Web3.toChecksumAddress(to_hex(address_key))
+
+# Compact ERC20 Transfer record holding the raw log bytes
+# Addresses are kept as 20 bytes keys and only checksummed when the record is written out with `to_dict`
+class Transfer:
+    __slots__ = (
+        "contract", "sender", "recipient", "value", "topics", "data", "block_number",
+        "log_index", "transaction_index", "transaction_hash", "block_hash", "removed"
+    )
+
+    def __init__(self, entry):
+        topics = [as_bytes(topic) for topic in entry["topics"]]
+        data = as_bytes(entry["data"])
+
+        self.contract = as_bytes(entry["address"])
+        self.sender = topics[1][12:]
+        self.recipient = topics[2][12:]
+        # Tokens that index every argument (such as ERC721) have no data to read the value from
+        self.value = int.from_bytes(data[:32], "big") if data else None
+        self.topics = topics
+        self.data = data
+        self.block_number = as_int(entry["blockNumber"])
+        self.log_index = as_int(entry["logIndex"])
+        self.transaction_index = as_int(entry["transactionIndex"])
+        self.transaction_hash = as_bytes(entry["transactionHash"])
+        self.block_hash = as_bytes(entry["blockHash"])
+        self.removed = entry["removed"]
+
+    # Function to convert the record to the output format
+    def to_dict(self):
+        return {
+            "contractAddress": checksum(self.contract),
+            "from": checksum(self.sender),
+            "to": checksum(self.recipient),
+            "value": self.value,
+            "topics": [to_hex(topic) for topic in self.topics],
+            "data": to_hex(self.data),
+            "blockNumber": self.block_number,
+            "logIndex": self.log_index,
+            "transactionIndex": self.transaction_index,
+            "transactionHash": to_hex(self.transaction_hash),
+            "blockHash": to_hex(self.block_hash),
+            "removed": self.removed
+        }
+
+    def __getstate__(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+# Index of the Transfer logs of a block by sender and by recipient address key, so the transfers
+# of any wallet are found with two dict lookups. Only the address topics are read while indexing,
+# the full records are decoded for the matched logs only.
+class TransferIndex:
+    def __init__(self, logs):
+        self.sent = {}
+        self.received = {}
+        for entry in logs:
+            topics = entry["topics"]
+            # Transfer events without indexed addresses can't be matched
+            if len(topics) < 3:
+                continue
+            self.sent.setdefault(as_bytes(topics[1])[12:], []).append(entry)
+            self.received.setdefault(as_bytes(topics[2])[12:], []).append(entry)
+
+    # Function to get the transfers sent by an address followed by the transfers it received
+    def transfers_for(self, address_key):
+        return [Transfer(entry) for entry in self.sent.get(address_key, []) + self.received.get(address_key, [])]
@@ -0,0 +1,83 @@
+# Benchmark of the wallet auditor against the local JSON-RPC stub (rpc_stub.py), reporting blocks per second
+# and requests per block for a cold run, a run over the warm local caches and a sharded run.
+# Usage: python benchmark_auditor.py --blocks 200 --wallets 100 --latency 0.02 --rate-limit 500 --processes 4
+import argparse # used to read the command line options
+import os # used to build the output paths
+import tempfile # outputs and caches of the benchmark are written to a temporary directory
+import time # used to time each scenario
+import wallet_auditor
+from rpc_stub import SyntheticChain, load_fixtures, start_stub
+
+# Function to run one scenario and collect its throughput figures
+def measure(name, stub, blocks, audit):
+    wallet_auditor.metrics.snapshot(reset=True)
+    stub_requests, stub_rejected = stub.requests, stub.rejected
+
+    started = time.perf_counter()
+    audit()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "blocks_per_second": blocks / elapsed,
+        "requests_per_block": wallet_auditor.metrics.total_requests() / blocks,
+        "rejected": stub.rejected - stub_rejected,
+        "retried": wallet_auditor.metrics.total_retries(),
+        "stub_requests": stub.requests - stub_requests,
+        "seconds": elapsed
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the wallet auditor throughput against a local JSON-RPC stub.")
+    parser.add_argument("--blocks", type=int, default=200, help="number of blocks to audit")
+    parser.add_argument("--wallets", type=int, default=100, help="number of audited wallets")
+    parser.add_argument("--transactions", type=int, default=150, help="transactions per synthetic block")
+    parser.add_argument("--transfers", type=int, default=300, help="Transfer logs per synthetic block")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random seconds added to the latency")
+    parser.add_argument("--rate-limit", type=float, help="stub requests per second before answering with HTTP 429")
+    parser.add_argument("--processes", type=int, default=4, help="processes of the sharded scenario, 0 to skip it")
+    parser.add_argument("--fixtures", help="JSON file of recorded responses served before the synthetic data")
+    args = parser.parse_args()
+
+    chain = SyntheticChain(transactions_per_block=args.transactions, transfers_per_block=args.transfers)
+    stub = start_stub(
+        chain, fixtures=load_fixtures(args.fixtures) if args.fixtures else None,
+        latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit
+    )
+    wallets = chain.wallets(args.wallets)
+
+    # Audit finalized blocks so the block cache stores them
+    to_block = chain.head - 64
+    from_block = to_block - args.blocks + 1
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_file_path = os.path.join(work_dir, "audit.jsonl")
+        wallet_auditor.configure(
+            stub.url,
+            block_cache_path=os.path.join(work_dir, "blocks.sqlite"),
+            trace_cache_dir=os.path.join(work_dir, "traces")
+        )
+        audit = lambda: wallet_auditor.run(wallets, from_block, to_block, output_file_path=output_file_path)
+        results.append(measure("sequential, cold caches", stub, args.blocks, audit))
+        results.append(measure("sequential, warm caches", stub, args.blocks, audit))
+
+        if args.processes:
+            wallet_auditor.configure(stub.url, block_cache_path=None, trace_cache_dir=None)
+            results.append(measure(
+                f"sharded, {args.processes} processes, no caches", stub, args.blocks,
+                lambda: wallet_auditor.run_sharded(wallets, from_block, to_block, processes=args.processes,
+                                                   shard_size=max(1, args.blocks // (args.processes * 4)),
+                                                   output_file_path=output_file_path)
+            ))
+
+    stub.shutdown()
+
+    print(f"\n{args.blocks} blocks, {args.wallets} wallets, {args.transactions} transactions and "
+          f"{args.transfers} Transfer logs per block, {args.latency * 1000:g} ms stub latency")
+    print(f"{'scenario':<40} {'blocks/s':>10} {'requests/block':>15} {'rejected':>9} {'retried':>8} {'seconds':>8}")
+    for result in results:
+        print(f"{result['scenario']:<40} {result['blocks_per_second']:>10.1f} {result['requests_per_block']:>15.2f} "
+              f"{result['rejected']:>9} {result['retried']:>8} {result['seconds']:>8.1f}")
@@ -0,0 +1,83 @@
+# Benchmark of the ERC20 Transfer log decoding, comparing the original per-entry dict rebuilding
+# against the raw bytes decoding of audit_transfers.py on a synthetic block of Transfer logs.
+# Usage: python benchmark_transfers.py [number_of_logs] [number_of_wallets]
+import os # used to generate random addresses and hashes
+import random # used to pick the senders and recipients of the synthetic transfers
+import sys # used to read the command line arguments
+import time # used to time each decoding path
+from hexbytes import HexBytes # web3 returns topics and hashes as HexBytes
+from web3 import Web3 # the original decoding path checksums with web3
+from audit_transfers import Transfer, TransferIndex, checksum
+
+TRANSFER_TOPIC = HexBytes("0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef")
+
+# Function to build Transfer logs shaped like the ones returned by w3.eth.getLogs
+def make_logs(count, wallets, tokens):
+    block_hash = HexBytes(os.urandom(32))
+    logs = []
+    for log_index in range(count):
+        sender, recipient = random.choice(wallets), random.choice(wallets)
+        logs.append({
+            "address": Web3.toChecksumAddress(random.choice(tokens)),
+            "topics": [TRANSFER_TOPIC, HexBytes(bytes(12) + sender), HexBytes(bytes(12) + recipient)],
+            "data": "0x" + random.getrandbits(96).to_bytes(32, "big").hex(),
+            "blockNumber": 17881437,
+            "logIndex": log_index,
+            "transactionIndex": log_index // 4,
+            "transactionHash": HexBytes(os.urandom(32)),
+            "blockHash": block_hash,
+            "removed": False
+        })
+    return logs
+
+# The original decoding from get_token_transfers, kept here as the baseline
+# Addresses are sliced from the topics since lstrip("0x") also strips the leading zeros of an address
+def decode_original(entry):
+    return {
+        "contractAddress": entry["address"],
+        "from": Web3.toChecksumAddress(entry["topics"][1].hex()[-40:]),
+        "to": Web3.toChecksumAddress(entry["topics"][2].hex()[-40:]),
+        "value": int(entry["data"],16),
+        "topics": [topic.hex() if isinstance(topic, bytes) else topic for topic in entry["topics"]],
+        "data": entry["data"],
+        "blockNumber": entry["blockNumber"],
+        "logIndex": entry["logIndex"],
+        "transactionIndex": entry["transactionIndex"],
+        "transactionHash": entry["transactionHash"].hex(),
+        "blockHash": entry["blockHash"].hex(),
+        "removed": entry["removed"]
+    }
+
+# Function to time a decoding path and print its throughput
+def measure(name, logs, decode):
+    started = time.perf_counter()
+    decode()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<40} {elapsed * 1000:>9.1f} ms {len(logs) / elapsed:>12,.0f} logs/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    wallet_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    wallets = [os.urandom(20) for _ in range(5000)]
+    tokens = [os.urandom(20) for _ in range(200)]
+    logs = make_logs(count, wallets, tokens)
+    audited = wallets[:wallet_count]
+    print(f"Block with {count:,} Transfer logs, {wallet_count} audited wallets\n")
+
+    baseline = measure("original decoding, all logs", logs, lambda: [decode_original(entry) for entry in logs])
+
+    checksum.cache_clear()
+    fast = measure("raw bytes decoding, all logs", logs, lambda: [Transfer(entry).to_dict() for entry in logs])
+    measure("raw bytes decoding, records only", logs, lambda: [Transfer(entry) for entry in logs])
+
+    def match_audited():
+        index = TransferIndex(logs)
+        for address_key in audited:
+            for transfer in index.transfers_for(address_key):
+                transfer.to_dict()
+    indexed = measure("index + decode audited wallets", logs, match_audited)
+
+    print(f"\nSpeedup decoding all logs: {baseline / fast:.1f}x, indexed matching: {baseline / indexed:.1f}x")
@@ -0,0 +1,337 @@
+# Local JSON-RPC stub serving synthetic (or recorded) blocks, logs and traces, used to measure the
+# auditor's throughput without a paid endpoint. Latency and rate limits are configurable to mimic a provider.
+# Usage: python rpc_stub.py --port 8545 --latency 0.02 --rate-limit 200
+import argparse # used to read the command line options
+import hashlib # used to derive deterministic hashes and addresses
+import json # requests and responses are JSON
+import random # used to build the synthetic blocks and to add latency jitter
+import threading # the rate limiter is shared by the request threads
+import time # used for latency and rate limiting
+from functools import lru_cache # synthetic blocks are generated once per block number
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Function to derive a deterministic 32 bytes hex value
+def fake_hash(*parts):
+    return "0x" + hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+# Function to derive a deterministic address
+def fake_address(*parts):
+    return "0x" + fake_hash(*parts)[-40:]
+
+# Deterministic synthetic chain
+# Each block has `transactions_per_block` transactions between `wallet_count` wallets (the first ones being the
+# wallets returned by `wallets()` for the benchmark to audit), `contract_ratio` of them calling contracts,
+# and `transfers_per_block` ERC20 Transfer logs.
+class SyntheticChain:
+    def __init__(self, head=18000000, transactions_per_block=150, transfers_per_block=300, wallet_count=2000,
+                 contract_ratio=0.5, seed=1):
+        self.head = head
+        self.transactions_per_block = transactions_per_block
+        self.transfers_per_block = transfers_per_block
+        self.addresses = [fake_address("wallet", seed, i) for i in range(wallet_count)]
+        self.contracts = {fake_address("contract", seed, i) for i in range(50)}
+        self.contract_list = sorted(self.contracts)
+        self.contract_ratio = contract_ratio
+        self.seed = seed
+        # Transactions of the generated blocks by hash, for debug_traceTransaction
+        self.transactions = {}
+
+    def wallets(self, count):
+        return self.addresses[:count]
+
+    def block_hash(self, number):
+        return fake_hash("block", self.seed, number)
+
+    @lru_cache(maxsize=4096)
+    def block(self, number):
+        rng = random.Random(f"{self.seed}:{number}")
+        block_hash = self.block_hash(number)
+        transactions = []
+        for index in range(self.transactions_per_block):
+            to = rng.choice(self.contract_list) if rng.random() < self.contract_ratio else rng.choice(self.addresses)
+            transactions.append({
+                "blockHash": block_hash,
+                "blockNumber": hex(number),
+                "from": rng.choice(self.addresses),
+                "gas": hex(21000 + rng.randrange(200000)),
+                "gasPrice": hex(rng.randrange(10 ** 9, 10 ** 11)),
+                "hash": fake_hash("tx", self.seed, number, index),
+                "input": "0x" if to not in self.contracts else "0xa9059cbb" + "00" * 64,
+                "nonce": hex(rng.randrange(1000)),
+                "to": to,
+                "transactionIndex": hex(index),
+                "value": hex(rng.randrange(10 ** 18)),
+                "type": "0x0",
+                "v": "0x25",
+                "r": fake_hash("r", number, index),
+                "s": fake_hash("s", number, index)
+            })
+            self.transactions[transactions[-1]["hash"]] = transactions[-1]
+
+        logs = []
+        for log_index in range(self.transfers_per_block):
+            tx_index = rng.randrange(self.transactions_per_block)
+            logs.append({
+                "address": rng.choice(self.contract_list),
+                "topics": [
+                    TRANSFER_TOPIC,
+                    "0x" + "00" * 12 + rng.choice(self.addresses)[2:],
+                    "0x" + "00" * 12 + rng.choice(self.addresses)[2:]
+                ],
+                "data": "0x" + rng.getrandbits(96).to_bytes(32, "big").hex(),
+                "blockNumber": hex(number),
+                "blockHash": block_hash,
+                "transactionHash": transactions[tx_index]["hash"],
+                "transactionIndex": hex(tx_index),
+                "logIndex": hex(log_index),
+                "removed": False
+            })
+
+        header = {
+            "number": hex(number),
+            "hash": block_hash,
+            "parentHash": self.block_hash(number - 1),
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": fake_hash("uncles", number),
+            "logsBloom": "0x" + "00" * 256,
+            "transactionsRoot": fake_hash("txroot", number),
+            "stateRoot": fake_hash("state", number),
+            "receiptsRoot": fake_hash("receipts", number),
+            "miner": fake_address("miner", number % 10),
+            "difficulty": "0x0",
+            "totalDifficulty": "0xc70d815d562d3cfa955",
+            "extraData": "0x",
+            "size": hex(1000 + 500 * self.transactions_per_block),
+            "gasLimit": hex(30000000),
+            "gasUsed": hex(15000000),
+            "timestamp": hex(1690000000 + 12 * (number - 17000000)),
+            "baseFeePerGas": hex(20 * 10 ** 9),
+            "mixHash": fake_hash("mix", number),
+            "uncles": []
+        }
+        return header, transactions, logs
+
+    def trace(self, tx):
+        return {
+            "type": "CALL",
+            "from": tx["from"],
+            "to": tx["to"],
+            "value": tx["value"],
+            "gas": tx["gas"],
+            "gasUsed": hex(21000),
+            "input": tx["input"],
+            "output": "0x",
+            "calls": [{"type": "STATICCALL", "from": tx["to"], "to": self.contract_list[0], "gas": "0x1000",
+                       "gasUsed": "0x100", "input": "0x70a08231", "output": "0x" + "00" * 32}]
+        }
+
+# JSON-RPC method handlers, recorded responses (see `load_fixtures`) take precedence over the synthetic chain
+class StubBackend:
+    def __init__(self, chain, fixtures=None):
+        self.chain = chain
+        self.fixtures = fixtures or {}
+        self.filters = {}
+
+    def handle(self, method, params):
+        recorded = self.fixtures.get(method, {}).get(json.dumps(params, sort_keys=True))
+        if recorded is not None:
+            return recorded
+
+        handler = getattr(self, "rpc_" + method, None)
+        if handler is None:
+            raise LookupError(f"the method {method} does not exist/is not available")
+        return handler(*params)
+
+    def _block_number(self, tag):
+        if tag in ("latest", "pending", "safe", "finalized"):
+            return self.chain.head - (64 if tag == "finalized" else 0)
+        if tag == "earliest":
+            return 0
+        return int(tag, 16)
+
+    def rpc_eth_chainId(self):
+        return "0x1"
+
+    def rpc_net_version(self):
+        return "1"
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.chain.head)
+
+    def rpc_eth_getBlockByNumber(self, tag, full_transactions=False):
+        number = self._block_number(tag)
+        if number > self.chain.head:
+            return None
+        header, transactions, _ = self.chain.block(number)
+        return dict(header, transactions=transactions if full_transactions else [tx["hash"] for tx in transactions])
+
+    def rpc_eth_getCode(self, address, tag="latest"):
+        return "0x6080604052" if address.lower() in self.chain.contracts else "0x"
+
+    def rpc_eth_getLogs(self, filter_params):
+        if "blockHash" in filter_params:
+            numbers = [n for n in range(self.chain.head - 256, self.chain.head + 1)
+                       if self.chain.block_hash(n) == filter_params["blockHash"]]
+        else:
+            numbers = range(self._block_number(filter_params.get("fromBlock", "latest")),
+                            self._block_number(filter_params.get("toBlock", "latest")) + 1)
+
+        topics = filter_params.get("topics") or []
+        logs = []
+        for number in numbers:
+            for entry in self.chain.block(number)[2]:
+                if all(topic is None or entry["topics"][i] == topic for i, topic in enumerate(topics)):
+                    logs.append(entry)
+        return logs
+
+    def rpc_debug_traceTransaction(self, tx_hash, config=None):
+        tx = self.chain.transactions.get(tx_hash)
+        if tx is None:
+            raise LookupError(f"transaction {tx_hash} not found")
+        return self.chain.trace(tx)
+
+    def rpc_debug_traceBlockByNumber(self, tag, config=None):
+        _, transactions, _ = self.chain.block(self._block_number(tag))
+        return [{"txHash": tx["hash"], "result": self.chain.trace(tx)} for tx in transactions]
+
+    def rpc_eth_newBlockFilter(self):
+        filter_id = hex(len(self.filters) + 1)
+        self.filters[filter_id] = self.chain.head
+        return filter_id
+
+    def rpc_eth_getFilterChanges(self, filter_id):
+        last = self.filters.get(filter_id, self.chain.head)
+        self.filters[filter_id] = self.chain.head
+        return [self.chain.block_hash(n) for n in range(last + 1, self.chain.head + 1)]
+
+# Function to load recorded responses, a JSON file of {method: {json encoded params: result}}
+def load_fixtures(file_path):
+    with open(file_path) as fixtures_file:
+        return json.load(fixtures_file)
+
+# Records the responses of a real endpoint into a fixtures file the stub can serve, e.g.
+#   recorder = FixtureRecorder(); recorder.instrument(wallet_auditor.w3); wallet_auditor.run(...); recorder.save("fixtures.json")
+class FixtureRecorder:
+    def __init__(self):
+        self.fixtures = {}
+        self.lock = threading.Lock()
+
+    def instrument(self, w3):
+        make_request = w3.provider.make_request
+
+        def recording_make_request(method, params):
+            response = make_request(method, params)
+            if "result" in response:
+                with self.lock:
+                    self.fixtures.setdefault(method, {})[json.dumps(params, sort_keys=True, default=str)] = response["result"]
+            return response
+
+        w3.provider.make_request = recording_make_request
+        return w3
+
+    def save(self, file_path):
+        with open(file_path, "w") as fixtures_file:
+            json.dump(self.fixtures, fixtures_file)
+
+# Token bucket limiting the number of requests per second, like a provider plan
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+# HTTP server answering JSON-RPC requests from a StubBackend, after `latency` seconds (plus up to `jitter` seconds)
+# Requests over the rate limit get an HTTP 429 response, as providers do
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, backend, latency=0.0, jitter=0.0, rate_limit=None, method_latency=None):
+        super().__init__(address, StubRequestHandler)
+        self.backend = backend
+        self.latency = latency
+        self.jitter = jitter
+        self.method_latency = method_latency or {}
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.requests = 0
+        self.rejected = 0
+        self.counter_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        with server.counter_lock:
+            server.requests += 1
+        if server.rate_limiter and not server.rate_limiter.allow():
+            with server.counter_lock:
+                server.rejected += 1
+            self._send(429, {"jsonrpc": "2.0", "id": None, "error": {"code": -32005, "message": "rate limit exceeded"}})
+            return
+
+        request = json.loads(body)
+        method, params = request["method"], request.get("params", [])
+        delay = server.method_latency.get(method, server.latency) + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        try:
+            response = {"jsonrpc": "2.0", "id": request.get("id"), "result": server.backend.handle(method, params)}
+        except LookupError as e:
+            response = {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": str(e)}}
+        self._send(200, response)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to start a stub server in a background thread, port 0 picks a free port
+def start_stub(chain=None, host="127.0.0.1", port=0, fixtures=None, **server_options):
+    backend = StubBackend(chain or SyntheticChain(), fixtures)
+    server = StubServer((host, port), backend, **server_options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local JSON-RPC stub serving synthetic Ethereum data.")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random seconds added to the latency")
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering with HTTP 429")
+    parser.add_argument("--fixtures", help="JSON file of recorded responses")
+    args = parser.parse_args()
+
+    server = StubServer(
+        ("127.0.0.1", args.port),
+        StubBackend(SyntheticChain(), load_fixtures(args.fixtures) if args.fixtures else None),
+        latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit
+    )
+    print(f"JSON-RPC stub listening on {server.url}")
+    server.serve_forever()
@@ -1,144 +1,668 @@
 from web3 import Web3 # we will be using Web3py library for this guide
+import argparse # used to read the command line options
 import json # we will need this to parse through your blockchain node responses
+import os # used to check for the output of a previous run
+import time # used to measure the throughput of each shard
+from collections import deque # keeps the in-flight shards in block order
+from concurrent.futures import ProcessPoolExecutor # runs the shards of a sharded audit in parallel
 from tqdm import tqdm # this library helps us track the progress of our script
+from audit_sinks import open_sink # output writers that stream audit records to disk
+from audit_checkpoints import CheckpointStore, default_worker_id # progress tracking for resumable audits
+from audit_traces import Tracer, TraceCache, TraceFailure # concurrent and cached internal transaction tracing
+from audit_block_cache import BlockCache # local store of finalized blocks and logs
+from audit_transfers import TransferIndex, TRANSFER_TOPIC, fetch_transfer_logs # decoding of ERC20 Transfer logs from their raw bytes
+from audit_metrics import RpcMetrics # per-method request counts, sizes and latencies
+from audit_retries import retry_rate_limited # retries of the requests rejected by the provider's rate limit
 
 # Configuring Ethereum endpoint
-w3 = Web3(Web3.HTTPProvider("https://{your-endpoint-name}.quiknode.pro/{your-token}/"))
+ENDPOINT_URL = "https://{your-endpoint-name}.quiknode.pro/{your-token}/"
 
-# Main function to fetch wallet activity across a range of blocks
-def get_transactions_for_addresses(addresses, from_block, to_block):
+# Configuring request instrumentation
+# Fill in the credits your plan charges per method to get the cost of an audit, e.g. {"eth_getLogs": 20}
+RPC_CREDIT_COSTS = {}
+
+# Configuring internal transaction tracing
+TRACE_CONCURRENCY = 8 # number of trace requests in flight at once
+TRACE_CACHE_DIR = "trace_cache" # traces are stored here by transaction hash, set to None to disable
+BLOCK_TRACE_THRESHOLD = 10 # use debug_traceBlockByNumber when a block has at least this many transactions to trace
+
+# Configuring the local cache of finalized blocks and Transfer logs
+BLOCK_CACHE_PATH = "block_cache.sqlite" # set to None to always read from the provider
+BLOCK_CACHE_MAX_BYTES = 2 * 1024 ** 3 # least recently used blocks are evicted past this size
+
+# Connection state, set up by `configure` on first use so importing this module has no side effects
+w3 = None
+tracer = None
+block_cache = None
+settings = None
+metrics = RpcMetrics(credit_costs=RPC_CREDIT_COSTS)
+
+# Function to connect the auditor to an endpoint and set up its caches
+# It is called with the settings above on first use, call it first to use other settings, e.g. when using the
+# auditor as a library: configure("http://127.0.0.1:8545", block_cache_path=None, trace_cache_dir=None)
+def configure(endpoint_url=ENDPOINT_URL, block_cache_path=BLOCK_CACHE_PATH, trace_cache_dir=TRACE_CACHE_DIR):
+    global w3, tracer, block_cache, settings, last_transfer_index
+    last_transfer_index = None
+    if tracer:
+        tracer.close()
+    if block_cache:
+        block_cache.close()
+
+    settings = {"endpoint_url": endpoint_url, "block_cache_path": block_cache_path, "trace_cache_dir": trace_cache_dir}
+    w3 = Web3(Web3.HTTPProvider(endpoint_url))
+    metrics.instrument(w3)
+    # Installed over the instrumentation, so every rejected attempt is recorded as an error
+    retry_rate_limited(w3, metrics=metrics)
+    tracer = create_tracer(w3, trace_cache_dir)
+    block_cache = create_block_cache(w3, block_cache_path)
+
+# Function to configure the auditor with the default settings if it wasn't configured yet
+def ensure_configured():
+    if w3 is None:
+        configure()
+
+# Function to create the tracer used for internal transactions
+def create_tracer(w3, trace_cache_dir):
+    cache = TraceCache(trace_cache_dir) if trace_cache_dir else None
+    return Tracer(w3, max_workers=TRACE_CONCURRENCY, cache=cache, block_trace_threshold=BLOCK_TRACE_THRESHOLD)
+
+# Function to open the local block cache
+def create_block_cache(w3, block_cache_path):
+    return BlockCache(w3, block_cache_path, max_bytes=BLOCK_CACHE_MAX_BYTES) if block_cache_path else None
+
+# Function to convert an address of any letter case into its 20 bytes key
+def normalize_address(address):
+    if isinstance(address, bytes):
+        key = address
+    else:
+        address = address.strip()
+        if address[:2].lower() == "0x":
+            address = address[2:]
+        key = bytes.fromhex(address)
+
+    if len(key) != 20:
+        raise ValueError(f"Invalid address: {address!r}")
+    return key
+
+# Function to load wallet addresses from a JSON list or a text file with one address per line
+def load_addresses(file_path):
+    with open(file_path) as address_file:
+        if file_path.endswith(".json"):
+            return json.load(address_file)
+
+        addresses = []
+        for line in address_file:
+            # Skip blank lines and comments
+            line = line.split("#", 1)[0].strip()
+            if line:
+                addresses.append(line)
+        return addresses
+
+# Function to index the wallets by their 20 bytes key so each lookup is a constant time set check
+def get_address_keys(addresses):
+    return {normalize_address(address): Web3.toChecksumAddress(address) for address in addresses}
+
+# Function to fetch the wallet activity found in a single block
+# When the block was already fetched (as in follow mode), its logs are requested by block hash so they
+# always belong to that exact block even if the chain reorganizes in between
+def get_block_transactions(address_keys, block_num, block=None):
+    ensure_configured()
     transactions = []
+    to_trace = []
+    block_hash = None
+
+    # Request block data, finalized blocks are read from the local cache when available
+    if block is None:
+        block = block_cache.get_block(block_num) if block_cache else w3.eth.getBlock(block_num, full_transactions=True)
+    else:
+        block_hash = to_hex(block["hash"])
+
+    # Identify block transactions where address of interest is found
+    for tx in block["transactions"]:
+        from_key = normalize_address(tx["from"])
+        to_key = normalize_address(tx["to"]) if tx["to"] else None
+        if from_key in address_keys or to_key in address_keys:
+            tx_details = {
+                "block": block_num,
+                # A wallet sending to itself is matched once
+                "matched": [address_keys[key] for key in dict.fromkeys((from_key, to_key)) if key in address_keys],
+                "hash": to_hex(tx["hash"]),
+                "from": tx["from"],
+                "to": tx["to"],
+                "value": tx["value"],
+                "gas": tx["gas"],
+                "gasPrice": tx["gasPrice"],
+                "input": tx["input"],
+                "token_transfers": [],
+                "internal_transactions": []
+            }
+
+            # Fetch token transfers
+            tx_details["token_transfers"].extend(get_token_transfers(tx["from"], block_num, block_hash))
+            if tx["to"] and to_key != from_key:
+                tx_details["token_transfers"].extend(get_token_transfers(tx["to"], block_num, block_hash))
+
+            # Check for interactions with contracts, their internal transactions are traced below
+            if tx["to"] and is_contract(tx["to"]):
+                to_trace.append(tx_details)
+
+            transactions.append(tx_details)
+
+    # Trace the contract interactions of the block concurrently
+    if to_trace:
+        traces = tracer.trace_transactions(
+            [tx_details["hash"] for tx_details in to_trace],
+            block_num=block_num,
+            block_tx_hashes=[to_hex(tx["hash"]) for tx in block["transactions"]]
+        )
+        for tx_details in to_trace:
+            add_internal_transactions(tx_details, traces[tx_details["hash"]])
+
+    return transactions
+
+# Function to check whether an address holds contract code, read from the local cache when available
+def is_contract(address):
+    if block_cache:
+        return block_cache.is_contract(address)
+    return len(w3.eth.getCode(address)) > 0
+
+# Function to record the internal transactions of a trace result, or the structured failure
+def add_internal_transactions(tx_details, trace):
+    if isinstance(trace, TraceFailure):
+        tx_details["trace_error"] = trace
+    else:
+        tx_details["internal_transactions"].append(trace.get("calls", []))
+
+# Generator that yields the wallet activity of each block as soon as the block is processed
+# `block_ranges` can be any iterable of (start, end) ranges, such as the ranges claimed from a checkpoint store
+def iter_blocks(addresses, from_block, to_block, block_ranges=None, total_blocks=None):
+    address_keys = get_address_keys(addresses)
+
+    if block_ranges is None:
+        block_ranges = [(from_block, to_block)]
 
     # Calculate the total number of blocks to process
-    total_blocks = to_block - from_block + 1
+    if total_blocks is None:
+        total_blocks = to_block - from_block + 1
 
     with tqdm(total=total_blocks, desc="Processing Blocks") as pbar:
-        for block_num in range(from_block, to_block + 1):
-            # Request block data
-            block = w3.eth.getBlock(block_num, full_transactions=True)
-
-            # Identify block transactions where address of interest is found
-            for tx in block.transactions:
-                if tx["from"] in addresses or tx["to"] in addresses:
-                    tx_details = {
-                        "block": block_num,
-                        "hash": tx.hash.hex(),
-                        "from": tx["from"],
-                        "to": tx["to"],
-                        "value": tx["value"],
-                        "gas": tx["gas"],
-                        "gasPrice": tx["gasPrice"],
-                        "input": tx["input"],
-                        "token_transfers": [],
-                        "internal_transactions": []
-                    }
-
-                    # Fetch token transfers
-                    tx_details["token_transfers"].extend(get_token_transfers(tx["from"], block_num))
-                    tx_details["token_transfers"].extend(get_token_transfers(tx["to"], block_num))
-
-                    # Check for interactions with contracts and get internal transactions
-                    if tx["to"] and w3.eth.getCode(tx["to"]).hex() != "0x":
-                        tx_details["internal_transactions"].extend(get_internal_transactions(tx.hash.hex()))
-
-                    transactions.append(tx_details)
-
-            # Update the progress bar
-            pbar.update(1)
-                
+        for start, end in block_ranges:
+            for block_num in range(start, end + 1):
+                yield block_num, get_block_transactions(address_keys, block_num)
+
+                # Update the progress bar
+                pbar.update(1)
+
+# Main function to fetch wallet activity across a range of blocks
+def get_transactions_for_addresses(addresses, from_block, to_block):
+    transactions = []
+    for _, block_transactions in iter_blocks(addresses, from_block, to_block):
+        transactions.extend(block_transactions)
     return transactions
 
-# Function to fetch wallet token transfers 
-def get_token_transfers(address, block_num):
-    # Convert the address to its 32 bytes representation
-    padded_address = address.lower().replace("0x", "0x" + "0" * 24)
+# Function to convert HexBytes values (or hex strings read from the block cache) to hex strings
+def to_hex(value):
+    if isinstance(value, str):
+        return value
+    return "0x" + bytes(value).hex()
+
+# Function to fetch all the ERC20 Transfer logs of a block, read from the local cache when available
+def get_block_transfer_logs(block_num, block_hash=None):
+    if block_hash:
+        return fetch_transfer_logs(w3, {"blockHash": block_hash, "topics": [TRANSFER_TOPIC]})
+    if block_cache:
+        return block_cache.get_transfer_logs(block_num)
 
     # Convert block_num to hexadecimal string
     block_hex = hex(block_num)
+    return fetch_transfer_logs(w3, {"fromBlock": block_hex, "toBlock": block_hex, "topics": [TRANSFER_TOPIC]})
 
-    filter_params = {
-        "fromBlock": block_hex,
-        "toBlock": block_hex,
-        "topics": [
-            "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",  # ERC20 Transfer event signature
-            None,
-            None
-        ]
-    }
+# Function to fetch wallet token transfers 
+# Transfers are returned as compact Transfer records, converted to dicts with checksummed addresses when written out
+def get_token_transfers(address, block_num, block_hash=None):
+    ensure_configured()
+    return get_transfer_index(block_num, block_hash).transfers_for(normalize_address(address))
 
-    # Look for the address as the sender
-    filter_params["topics"][1] = padded_address
-    sent_transfers = w3.eth.get_logs(filter_params)
-    
-    # Parse through API response and record transfer details
-    sent_transfers_list = []
-    for entry in sent_transfers:
-        modified_entry = {
-            "contractAddress": entry["address"],
-            "from": w3.toChecksumAddress(entry["topics"][1].hex().lstrip("0x")),
-            "to": w3.toChecksumAddress(entry["topics"][2].hex().lstrip("0x")),
-            "value": int(entry["data"],16),
-            "topics": [topic.hex() if isinstance(topic, bytes) else topic for topic in entry["topics"]],
-            "data": entry["data"],
-            "blockNumber": entry["blockNumber"],
-            "logIndex": entry["logIndex"],
-            "transactionIndex": entry["transactionIndex"],
-            "transactionHash": entry["transactionHash"].hex(),
-            "blockHash": entry["blockHash"].hex(),
-            "removed": entry["removed"]
-        }
-        sent_transfers_list.append(modified_entry)
-
-    # Look for the address as the receiver
-    filter_params["topics"][1] = None
-    filter_params["topics"][2] = padded_address
-    received_transfers = w3.eth.getLogs(filter_params)
-
-    # Parse through API response and record transfer details
-    received_transfers_list = []
-    for entry in received_transfers:
-        modified_entry = {
-            "contractAddress": entry["address"],
-            "from": w3.toChecksumAddress(entry["topics"][1].hex().lstrip("0x")),
-            "to": w3.toChecksumAddress(entry["topics"][2].hex().lstrip("0x")),
-            "value": int(entry["data"],16),
-            "topics": [topic.hex() if isinstance(topic, bytes) else topic for topic in entry["topics"]],
-            "data": entry["data"],
-            "blockNumber": entry["blockNumber"],
-            "logIndex": entry["logIndex"],
-            "transactionIndex": entry["transactionIndex"],
-            "transactionHash": entry["transactionHash"].hex(),
-            "blockHash": entry["blockHash"].hex(),
-            "removed": entry["removed"]
-        }
-        received_transfers_list.append(modified_entry)
+# Function to index the Transfer logs of a block by address, the index of the last block is reused
+def get_transfer_index(block_num, block_hash=None):
+    global last_transfer_index
+    if last_transfer_index is None or last_transfer_index[0] != (block_num, block_hash):
+        last_transfer_index = ((block_num, block_hash), TransferIndex(get_block_transfer_logs(block_num, block_hash)))
+    return last_transfer_index[1]
 
-    return sent_transfers_list + received_transfers_list
+last_transfer_index = None
 
 # Function to fetch wallet internal transactions
+# Returns a TraceFailure dict with the error "type", "code" and "message" if the transaction could not be traced
 def get_internal_transactions(tx_hash):
-    try:
-        # Making request 
-        trace = w3.provider.make_request("debug_traceTransaction", [tx_hash, {"tracer": "callTracer"}])
-
-        internal_txs = []
-        if "result" in trace:
-            internal_txs.append(trace["result"]["calls"])
-        return internal_txs
-    
-    except Exception as e:
-        return str(e)
-    
+    ensure_configured()
+    trace = tracer.trace_transactions([tx_hash])[tx_hash]
+    if isinstance(trace, TraceFailure):
+        return trace
+    return [trace.get("calls", [])]
+
+# Function to create an empty per-address summary
+def new_address_breakdown(addresses):
+    return {
+        Web3.toChecksumAddress(address): {
+            "transactions": 0,
+            "sent": 0,
+            "received": 0,
+            "value_sent": 0,
+            "value_received": 0,
+            "token_transfers": 0,
+            "first_block": None,
+            "last_block": None
+        }
+        for address in addresses
+    }
+
+# Function to build a per-address summary of the matched transactions
+def get_address_breakdown(addresses, transactions):
+    breakdown = new_address_breakdown(addresses)
+    update_address_breakdown(breakdown, transactions)
+    return breakdown
+
+# Function to add the transactions of one or more whole blocks to the per-address summary
+# The token transfers of a transaction are all the Transfer logs of its wallets in its block, so a wallet with
+# several transactions in a block gets the same logs with each of them: they are counted once per log
+def update_address_breakdown(breakdown, transactions):
+    counted_transfers = set()
+    for tx_details in transactions:
+        for address in tx_details["matched"]:
+            entry = breakdown[address]
+            entry["transactions"] += 1
+            if tx_details["from"] == address:
+                entry["sent"] += 1
+                entry["value_sent"] += tx_details["value"]
+            if tx_details["to"] == address:
+                entry["received"] += 1
+                entry["value_received"] += tx_details["value"]
+            address_key = normalize_address(address)
+            for transfer in tx_details["token_transfers"]:
+                key = (address_key, tx_details["block"], transfer.log_index)
+                if address_key in (transfer.sender, transfer.recipient) and key not in counted_transfers:
+                    counted_transfers.add(key)
+                    entry["token_transfers"] += 1
+            if entry["first_block"] is None:
+                entry["first_block"] = tx_details["block"]
+            entry["last_block"] = tx_details["block"]
+
 # Execution function
-def run(addresses, from_block, to_block):
+# `addresses` can be a list of addresses or the path of a file containing them.
+# Records are streamed to `output_file_path` one JSON line per transaction as each block finishes,
+# so memory use stays flat. Pass a `.jsonl.gz` path for compressed output or a `.parquet` path for columnar output
+# (not resumable, so not available with `checkpoint_path`).
+# With `checkpoint_path`, finished block ranges and written records are stored so a restarted run
+# (or another worker sharing the same file with a different `worker_id` and its own output file) only processes
+# the blocks that are left.
+# `worker_id` defaults to a unique "host:pid" id; restart a crashed worker with the id it had to take back its
+# unfinished ranges right away, otherwise they are claimed again once their lease runs out.
+# A summary of the requests made is printed at the end, and exported to `metrics_path` when given.
+def run(addresses, from_block, to_block, per_address=False, output_file_path="wallet_audit_data.jsonl", flush_every=100,
+        checkpoint_path=None, checkpoint_every=1000, worker_id=None, metrics_path=None):
+    if isinstance(addresses, str):
+        addresses = load_addresses(addresses)
+    worker_id = worker_id or default_worker_id()
+    if checkpoint_path is not None:
+        check_resumable_output(output_file_path)
+    # The requests of earlier audits in this process are not part of this one
+    metrics.reset()
+
+    # Note that on a resumed run the breakdown only covers the blocks processed by this run
+    breakdown = new_address_breakdown(addresses)
+
+    blocks = to_block - from_block + 1
+    if checkpoint_path is None:
+        with open_sink(output_file_path, flush_every=flush_every) as sink:
+            for _, block_transactions in iter_blocks(addresses, from_block, to_block):
+                update_address_breakdown(breakdown, block_transactions)
+                sink.write_block(block_transactions)
+    else:
+        with CheckpointStore(checkpoint_path) as checkpoints:
+            try:
+                with open_checkpointed_sink(output_file_path, checkpoints, flush_every, worker_id) as sink:
+                    blocks = run_with_checkpoints(
+                        addresses, from_block, to_block, sink, checkpoints, checkpoint_every, breakdown, worker_id
+                    )
+            finally:
+                checkpoints.release_output(output_file_path, worker_id)
+
+    report_metrics(blocks, metrics_path)
+
+    # Write the per-address summary collected from the same pass over the blocks
+    if per_address:
+        breakdown_file_path = "wallet_audit_breakdown.json"
+        with open(breakdown_file_path, "w") as json_file:
+            json.dump(breakdown, json_file, indent=4)
+
+# Function to check that an output can be resumed from a checkpoint, before any block is claimed
+# Parquet files are only readable once closed and cannot be appended to, so a stopped run could never continue them
+def check_resumable_output(output_file_path):
+    if output_file_path.endswith(".parquet"):
+        raise ValueError("Parquet output cannot be resumed from a checkpoint, use .jsonl or .jsonl.gz output instead")
+
+# Function to open the output of a checkpointed audit
+# An existing output is cut back to its size at the last checkpoint: whatever a crash left after it was never
+# marked as written, so it is written again by this run. The starting size is checkpointed before anything is written.
+# Workers sharing a checkpoint file each need their own output file, a file another worker writes to is refused.
+def open_checkpointed_sink(output_file_path, checkpoints, flush_every, worker_id):
+    offset = checkpoints.claim_output(output_file_path, worker_id)
+    exists = os.path.exists(output_file_path)
+    resume_offset = offset if exists else None
+    sink = open_sink(output_file_path, flush_every=flush_every, append=exists, resume_offset=resume_offset)
+    checkpoints.mark_emitted([], output_file_path, sink.sync())
+    return sink
+
+# Function to mark records as written once the sink made them durable, along with the size of the output
+def checkpoint_records(checkpoints, sink, keys):
+    checkpoints.mark_emitted(keys, sink.file_path, sink.sync())
+
+# Function to report the blocks of a checkpointed audit left to other workers
+def report_remaining_blocks(checkpoints, from_block, to_block):
+    remaining = checkpoints.remaining_blocks(from_block, to_block)
+    if remaining:
+        print(f"{remaining} blocks are claimed by other workers, run again once they finish or their lease runs out")
+
+# Function to process the unfinished ranges of a checkpointed audit, returns the number of blocks processed
+def run_with_checkpoints(addresses, from_block, to_block, sink, checkpoints, checkpoint_every, breakdown, worker_id):
+    # Take back the ranges this worker left unfinished the last time it ran
+    checkpoints.release_claims(worker_id)
+    claimed_ranges = []
+
+    # Ranges are claimed lazily, one at a time, so workers sharing the store never overlap
+    def claim_ranges():
+        for block_range in checkpoints.iter_claims(from_block, to_block, checkpoint_every, worker_id):
+            claimed_ranges.append(block_range)
+            yield block_range
+
+    total_blocks = checkpoints.remaining_blocks(from_block, to_block)
+
+    unmarked_keys = []
+    blocks = 0
+    for block_num, block_transactions in iter_blocks(addresses, from_block, to_block, claim_ranges(), total_blocks):
+        # Skip the records a previous run already wrote out before it stopped
+        already_emitted = checkpoints.emitted_keys(tx_details["hash"] for tx_details in block_transactions)
+        block_transactions = [tx_details for tx_details in block_transactions if tx_details["hash"] not in already_emitted]
+
+        update_address_breakdown(breakdown, block_transactions)
+        sink.write_block(block_transactions)
+        unmarked_keys.extend(tx_details["hash"] for tx_details in block_transactions)
+        blocks += 1
+
+        # Records are only marked as written once the sink has synced them to disk
+        if sink.pending == 0 and unmarked_keys:
+            checkpoint_records(checkpoints, sink, unmarked_keys)
+            unmarked_keys = []
+
+        range_start, range_end = claimed_ranges[-1]
+        if block_num == range_end:
+            checkpoint_records(checkpoints, sink, unmarked_keys)
+            unmarked_keys = []
+            checkpoints.complete_range(range_start, range_end)
+
+        # Keep the claimed ranges while they are being processed, however slow the blocks are
+        checkpoints.renew_claims(worker_id)
+
+    report_remaining_blocks(checkpoints, from_block, to_block)
+    return blocks
+
+
+# Follow mode function
+# Audits new blocks as they are produced, starting after the current head (or at `from_block`), until interrupted.
+# Blocks are processed `confirmations` blocks behind the head. When a block that was already written out is
+# replaced by a reorg, its records are written again with "removed" set to True (on the record and on each of its
+# token transfers, like the flag of the logs), followed by the records of the new canonical block.
+def follow(addresses, output_file_path="wallet_audit_live.jsonl", from_block=None, confirmations=0, poll_interval=2.0,
+           reorg_depth=64, metrics_path=None):
+    if isinstance(addresses, str):
+        addresses = load_addresses(addresses)
+
+    ensure_configured()
+    metrics.reset()
+    address_keys = get_address_keys(addresses)
+    next_block = from_block if from_block is not None else w3.eth.blockNumber + 1
+    first_block = next_block
+
+    # Hash and records of the latest blocks, to detect reorgs and retract the records of replaced blocks
+    recent_blocks = deque(maxlen=reorg_depth)
+
+    # A block filter tells us when new heads arrive, providers that don't keep filters are polled instead
+    try:
+        block_filter = w3.eth.filter("latest")
+    except Exception:
+        block_filter = None
+
+    with open_sink(output_file_path, append=True) as sink:
+        try:
+            while True:
+                head = w3.eth.blockNumber - confirmations
+
+                while next_block <= head:
+                    block = w3.eth.getBlock(next_block, full_transactions=True)
+
+                    # The new block doesn't build on the last one we processed, roll back one block and retry
+                    if recent_blocks and to_hex(block["parentHash"]) != recent_blocks[-1][1]:
+                        replaced_block, _, replaced_records = recent_blocks.pop()
+                        sink.write_block([remove_record(tx_details) for tx_details in replaced_records])
+                        print(f"Reorg detected, block {replaced_block} was replaced")
+                        next_block = replaced_block
+                        continue
+
+                    block_transactions = get_block_transactions(address_keys, next_block, block)
+                    for tx_details in block_transactions:
+                        tx_details["removed"] = False
+                    sink.write_block(block_transactions)
+                    sink.flush()
+
+                    recent_blocks.append((next_block, to_hex(block["hash"]), block_transactions))
+                    next_block += 1
+
+                wait_for_new_block(block_filter, poll_interval)
+        except KeyboardInterrupt:
+            print(f"\nStopped following at block {next_block - 1}")
+
+    report_metrics(next_block - first_block, metrics_path)
+
+# Function to build the retraction of a record whose block was replaced by a reorg
+def remove_record(tx_details):
+    removed = dict(tx_details, removed=True)
+    removed["token_transfers"] = [dict(transfer.to_dict(), removed=True) for transfer in tx_details["token_transfers"]]
+    return removed
+
+# Function to wait until the block filter reports a new head, or for one polling interval
+def wait_for_new_block(block_filter, poll_interval):
+    deadline = time.monotonic() + poll_interval
+    while time.monotonic() < deadline:
+        if block_filter is None:
+            time.sleep(poll_interval)
+            return
+        try:
+            if block_filter.get_new_entries():
+                return
+        except Exception:
+            # The provider dropped the filter, fall back to polling
+            time.sleep(poll_interval)
+            return
+        time.sleep(min(0.5, poll_interval))
+
+# Function to print the request summary of an audit and export it
+def report_metrics(blocks, metrics_path=None):
+    print(metrics.summary(blocks=blocks))
+    if block_cache and block_cache.hits + block_cache.misses:
+        print(f"Block cache: {block_cache.hits} hits, {block_cache.misses} misses")
+    if metrics_path:
+        metrics.export(metrics_path)
+
+# Function to give each worker process of a sharded audit its own provider connection
+def init_worker(worker_settings):
+    global w3, tracer, block_cache
+    # Forked workers inherit the parent's connection state: its SQLite connection must not be used (or closed) across
+    # a fork and its tracer threads don't exist here, so they are dropped rather than closed before reconnecting
+    w3 = tracer = block_cache = None
+    metrics.snapshot(reset=True)
+    configure(**worker_settings)
+
+# Function run by the worker processes to audit one shard of the block range
+def audit_shard(addresses, start, end):
+    started = time.perf_counter()
+    address_keys = get_address_keys(addresses)
+
+    transactions = []
+    for block_num in range(start, end + 1):
+        transactions.extend(get_block_transactions(address_keys, block_num))
+
+    return {
+        "start": start,
+        "end": end,
+        "transactions": transactions,
+        "elapsed": time.perf_counter() - started,
+        "worker": os.getpid(),
+        "metrics": metrics.snapshot(reset=True)
+    }
+
+# Sharded execution function
+# Splits the block range into shards of `shard_size` blocks that are audited by a pool of `processes`
+# worker processes, each with its own provider connection. Results are written in block order, and
+# the throughput of each shard and of the whole run is reported. Accepts the same options as `run`.
+def run_sharded(addresses, from_block, to_block, processes=None, shard_size=100, per_address=False,
+                output_file_path="wallet_audit_data.jsonl", flush_every=100, checkpoint_path=None, worker_id=None,
+                metrics_path=None):
+    if isinstance(addresses, str):
+        addresses = load_addresses(addresses)
+    worker_id = worker_id or default_worker_id()
+    if checkpoint_path is not None:
+        check_resumable_output(output_file_path)
+    # The requests of earlier audits in this process are not part of this one
+    metrics.reset()
+
+    ensure_configured()
+    processes = processes or os.cpu_count()
+    breakdown = new_address_breakdown(addresses)
+    checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path else None
+
+    # Shards are taken from the checkpoint store when resuming, so finished ranges are skipped
+    if checkpoints:
+        checkpoints.release_claims(worker_id)
+        shards = checkpoints.iter_claims(from_block, to_block, shard_size, worker_id)
+        total_blocks = checkpoints.remaining_blocks(from_block, to_block)
+    else:
+        shards = ((start, min(start + shard_size - 1, to_block)) for start in range(from_block, to_block + 1, shard_size))
+        total_blocks = to_block - from_block + 1
+
+    worker_stats = {}
+    started = time.perf_counter()
+    if checkpoints:
+        sink = open_checkpointed_sink(output_file_path, checkpoints, flush_every, worker_id)
+    else:
+        sink = open_sink(output_file_path, flush_every=flush_every)
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(settings,)) as pool, \
+                sink, tqdm(total=total_blocks, desc="Processing Blocks") as pbar:
+            # Keep a bounded number of shards in flight so finished shards waiting on a slower one don't pile up in memory
+            in_flight = deque()
+            for start, end in shards:
+                in_flight.append(pool.submit(audit_shard, addresses, start, end))
+                if len(in_flight) >= processes * 2:
+                    write_shard(in_flight.popleft().result(), sink, checkpoints, breakdown, worker_stats, pbar, worker_id)
+            while in_flight:
+                write_shard(in_flight.popleft().result(), sink, checkpoints, breakdown, worker_stats, pbar, worker_id)
+        if checkpoints:
+            report_remaining_blocks(checkpoints, from_block, to_block)
+    finally:
+        if checkpoints:
+            checkpoints.release_output(output_file_path, worker_id)
+            checkpoints.close()
+
+    # Report the overall and per-worker throughput
+    elapsed = time.perf_counter() - started
+    print(f"Processed {total_blocks} blocks in {elapsed:.1f}s ({total_blocks / elapsed:.1f} blocks/s) with {processes} processes")
+    for worker, (blocks, busy) in sorted(worker_stats.items()):
+        print(f"  worker {worker}: {blocks} blocks, {blocks / busy:.1f} blocks/s")
+    report_metrics(total_blocks, metrics_path)
+
+    # Write the per-address summary collected from the same pass over the blocks
+    if per_address:
+        breakdown_file_path = "wallet_audit_breakdown.json"
+        with open(breakdown_file_path, "w") as json_file:
+            json.dump(breakdown, json_file, indent=4)
+
+# Function to write out the result of one shard once all the shards before it were written
+def write_shard(shard, sink, checkpoints, breakdown, worker_stats, pbar, worker_id=None):
+    transactions = shard["transactions"]
+    if checkpoints:
+        # Skip the records a previous run already wrote out before it stopped
+        already_emitted = checkpoints.emitted_keys(tx_details["hash"] for tx_details in transactions)
+        transactions = [tx_details for tx_details in transactions if tx_details["hash"] not in already_emitted]
+
+    update_address_breakdown(breakdown, transactions)
+    sink.write_block(transactions)
+
+    if checkpoints:
+        checkpoint_records(checkpoints, sink, [tx_details["hash"] for tx_details in transactions])
+        checkpoints.complete_range(shard["start"], shard["end"])
+        # Keep the shards still in flight, however long they take
+        checkpoints.renew_claims(worker_id)
+
+    metrics.merge(shard["metrics"])
+    blocks = shard["end"] - shard["start"] + 1
+    worker_blocks, worker_busy = worker_stats.get(shard["worker"], (0, 0.0))
+    worker_stats[shard["worker"]] = (worker_blocks + blocks, worker_busy + shard["elapsed"])
+    pbar.set_postfix(shard=f"{shard['start']}-{shard['end']}", blocks_per_s=f"{blocks / shard['elapsed']:.1f}")
+    pbar.update(blocks)
+
+
+# Command line entry point
+# Examples:
+#   python wallet_auditor.py 0x91b51c173a4bDAa1A60e234fC3f705A16D228740 --from-block 17881437 --to-block 17881437
+#   python wallet_auditor.py wallets.txt --from-block 17881437 --to-block 17881537 --per-address
+#   python wallet_auditor.py wallets.txt --from-block 17000000 --to-block 17881537 --checkpoint wallet_audit.checkpoint
+#   python wallet_auditor.py wallets.txt --from-block 17000000 --to-block 17881537 --processes 8 --shard-size 200
+#   python wallet_auditor.py wallets.txt --follow --confirmations 2
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit the activity of Ethereum wallets across a range of blocks.")
+    parser.add_argument("addresses", nargs="+", help="wallet addresses, or the path of a file listing them")
+    parser.add_argument("--from-block", type=int, help="first block to audit")
+    parser.add_argument("--to-block", type=int, help="last block to audit")
+    parser.add_argument("--endpoint", default=ENDPOINT_URL, help="Ethereum endpoint URL")
+    parser.add_argument("--output", help="output file (.jsonl, .jsonl.gz or .parquet)")
+    parser.add_argument("--per-address", action="store_true", help="also write a per-address summary")
+    parser.add_argument("--checkpoint", help="checkpoint file that makes the audit resumable")
+    parser.add_argument("--worker-id", help="id of this worker in the checkpoint file, a unique host:pid id by default")
+    parser.add_argument("--processes", type=int, help="audit shards of the block range in this many processes")
+    parser.add_argument("--shard-size", type=int, default=100, help="number of blocks per shard")
+    parser.add_argument("--follow", action="store_true", help="audit new blocks as they arrive")
+    parser.add_argument("--confirmations", type=int, default=0, help="blocks to stay behind the head in follow mode")
+    parser.add_argument("--metrics", help="export the request metrics to this file (.json or .prom)")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the local block and trace caches")
+    args = parser.parse_args(argv)
+
+    addresses = args.addresses[0] if len(args.addresses) == 1 and not args.addresses[0].startswith("0x") else args.addresses
+    if args.no_cache:
+        configure(args.endpoint, block_cache_path=None, trace_cache_dir=None)
+    else:
+        configure(args.endpoint)
+
+    if args.follow:
+        follow(addresses, output_file_path=args.output or "wallet_audit_live.jsonl", from_block=args.from_block,
+               confirmations=args.confirmations, metrics_path=args.metrics)
+        return
 
-    transactions = get_transactions_for_addresses(addresses, from_block, to_block)
+    if args.from_block is None or args.to_block is None:
+        parser.error("--from-block and --to-block are required unless --follow is used")
 
-    # Write output to the JSON file
-    output_file_path = "wallet_audit_data.json"
-    with open(output_file_path, "w") as json_file:
-        json.dump(transactions, json_file, indent=4)
+    output_file_path = args.output or "wallet_audit_data.jsonl"
+    if args.checkpoint and output_file_path.endswith(".parquet"):
+        parser.error("--checkpoint requires .jsonl or .jsonl.gz output, Parquet output cannot be resumed")
+    if args.processes:
+        run_sharded(addresses, args.from_block, args.to_block, processes=args.processes, shard_size=args.shard_size,
+                    per_address=args.per_address, output_file_path=output_file_path,
+                    checkpoint_path=args.checkpoint, worker_id=args.worker_id, metrics_path=args.metrics)
+    else:
+        run(addresses, args.from_block, args.to_block, per_address=args.per_address, output_file_path=output_file_path,
+            checkpoint_path=args.checkpoint, worker_id=args.worker_id, metrics_path=args.metrics)
 
 
-# Usage example:
-run(["0x91b51c173a4bDAa1A60e234fC3f705A16D228740"],17881437, 17881437 )
\ No newline at end of file
+if __name__ == "__main__":
+    main()
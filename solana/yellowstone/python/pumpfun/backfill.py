@@ -0,0 +1,150 @@
+"""
+Backfill transactions missed while a Yellowstone subscription was down, using the standard Solana JSON-RPC API.
+"""
+
+import json
+import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import base58
+
+import generated.geyser_pb2 as geyser_pb2
+
+logger = logging.getLogger(__name__)
+
+COMMITMENT_NAMES = {
+    # getSignaturesForAddress and getTransaction do not accept processed, confirmed is the closest level
+    geyser_pb2.CommitmentLevel.PROCESSED: "confirmed",
+    geyser_pb2.CommitmentLevel.CONFIRMED: "confirmed",
+    geyser_pb2.CommitmentLevel.FINALIZED: "finalized",
+}
+
+def rpc_request(rpc_url: str, method: str, params: list, timeout: float = 30.0):
+    """
+    Send a JSON-RPC request.
+
+    Args:
+        rpc_url: Solana HTTP RPC endpoint URL
+        method: JSON-RPC method name
+        params: JSON-RPC params
+        timeout: Seconds to wait for the response
+
+    Returns:
+        The result of the request
+
+    Raises:
+        RuntimeError: If the node answers with a JSON-RPC error
+    """
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}).encode()
+    request = urllib.request.Request(rpc_url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        payload = json.loads(response.read())
+    if "error" in payload:
+        raise RuntimeError(f"{method} failed: {payload['error']}")
+    return payload["result"]
+
+def fetch_missed_updates(
+    rpc_url: str,
+    address: str,
+    since_slot: int,
+    filter_name: str,
+    commitment: int = geyser_pb2.CommitmentLevel.CONFIRMED,
+    max_transactions: int = 5000,
+    concurrency: int = 8
+) -> List[geyser_pb2.SubscribeUpdate]:
+    """
+    Fetch the successful transactions mentioning an address from `since_slot` onwards, oldest first, as
+    SubscribeUpdate messages shaped like the ones of the live stream so the same handlers process them.
+
+    Pass the narrowest account the subscription requires (e.g. the Pump.fun mint authority, which only
+    signs creates rather than the program, which every buy and sell mentions), since every signature
+    listed costs a getTransaction request. Failed transactions are skipped, as the live filter does.
+    When the gap holds more than `max_transactions`, the oldest ones are kept: the newest overlap with
+    the reopened subscription, which delivers them too.
+
+    Args:
+        rpc_url: Solana HTTP RPC endpoint URL
+        address: Account whose transactions are fetched (e.g. the Pump.fun mint authority)
+        since_slot: First slot to backfill
+        filter_name: Filter name set on the updates, as the subscription would
+        commitment: Commitment level of the requests
+        max_transactions: Upper bound on the number of transactions fetched
+        concurrency: Number of getTransaction requests in flight at once
+
+    Returns:
+        List[geyser_pb2.SubscribeUpdate]: The missed transaction updates
+    """
+    config = {"commitment": COMMITMENT_NAMES.get(commitment, "confirmed")}
+    signatures = []
+    before: Optional[str] = None
+    while True:
+        options = {**config, "limit": 1000}
+        if before:
+            options["before"] = before
+        page = rpc_request(rpc_url, "getSignaturesForAddress", [address, options])
+        signatures.extend(entry["signature"] for entry in page if entry["slot"] >= since_slot and entry.get("err") is None)
+        if len(page) < 1000 or page[-1]["slot"] < since_slot:
+            break
+        before = page[-1]["signature"]
+
+    # getSignaturesForAddress lists the newest first
+    signatures.reverse()
+    if len(signatures) > max_transactions:
+        logger.warning(
+            f"Backfill from slot {since_slot} found {len(signatures)} transactions, only the oldest "
+            f"{max_transactions} are fetched"
+        )
+        signatures = signatures[:max_transactions]
+
+    transaction_config = {**config, "encoding": "json", "maxSupportedTransactionVersion": 0}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(
+            lambda signature: rpc_request(rpc_url, "getTransaction", [signature, transaction_config]), signatures
+        )
+        return [transaction_to_update(result, filter_name) for result in results if result is not None]
+
+def transaction_to_update(result: dict, filter_name: str) -> geyser_pb2.SubscribeUpdate:
+    """
+    Convert a getTransaction result (json encoding) to a SubscribeUpdate transaction message.
+
+    Args:
+        result: Result of a getTransaction request
+        filter_name: Filter name set on the update
+
+    Returns:
+        geyser_pb2.SubscribeUpdate: The equivalent update
+    """
+    transaction = result["transaction"]
+    message = transaction["message"]
+    meta = result.get("meta") or {}
+
+    update = geyser_pb2.SubscribeUpdate(filters=[filter_name])
+    update.transaction.slot = result["slot"]
+    tx_info = update.transaction.transaction
+    tx_info.signature = base58.b58decode(transaction["signatures"][0])
+    tx_info.transaction.signatures.extend(base58.b58decode(signature) for signature in transaction["signatures"])
+
+    tx_message = tx_info.transaction.message
+    tx_message.versioned = result.get("version", "legacy") != "legacy"
+    tx_message.account_keys.extend(base58.b58decode(key) for key in message["accountKeys"])
+    for instruction in message["instructions"]:
+        tx_message.instructions.add(
+            program_id_index=instruction["programIdIndex"],
+            accounts=bytes(instruction["accounts"]),
+            data=base58.b58decode(instruction["data"])
+        )
+
+    loaded = meta.get("loadedAddresses") or {}
+    tx_info.meta.loaded_writable_addresses.extend(base58.b58decode(key) for key in loaded.get("writable", []))
+    tx_info.meta.loaded_readonly_addresses.extend(base58.b58decode(key) for key in loaded.get("readonly", []))
+    for inner in meta.get("innerInstructions") or []:
+        tx_inner = tx_info.meta.inner_instructions.add(index=inner["index"])
+        for instruction in inner["instructions"]:
+            tx_inner.instructions.add(
+                program_id_index=instruction["programIdIndex"],
+                accounts=bytes(instruction["accounts"]),
+                data=base58.b58decode(instruction["data"])
+            )
+    return update
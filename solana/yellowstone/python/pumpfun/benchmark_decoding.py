@@ -0,0 +1,154 @@
+"""
+Benchmark of SubscribeUpdate decoding per core: full deserialization of every update against the lazy path
+of AsyncPumpMonitor, which skips transactions without the mint discriminator before deserializing them.
+Both paths go all the way to the base58 signature, slot and mint of every mint, and are checked to find
+the same ones. Runs on a capture file (see capture.py, recorded with record.py), or on a synthetic one when
+none is given.
+
+Usage: python benchmark_decoding.py [--capture stream.yscap] [--count 20000] [--mint-ratio 0.05]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+import base58
+
+import generated.geyser_pb2 as geyser_pb2
+from capture import CaptureWriter, read_capture
+from decoders import DecoderRegistry, pump_fun_registry
+from events import MintEvent
+from filters import PUMP_FUN_ACCOUNT
+from main import AsyncPumpMonitor
+from wire import peek_instruction_data, peek_update_kind, protobuf_backend
+
+def synthetic_update(slot: int, mint: bool) -> geyser_pb2.SubscribeUpdate:
+    """
+    Build a Pump.fun transaction update of a realistic size: compute budget instructions, a create or
+    buy instruction, inner instructions, balances and program logs.
+
+    Args:
+        slot: Slot of the transaction
+        mint: Whether the transaction is a create (mint) transaction
+
+    Returns:
+        geyser_pb2.SubscribeUpdate: The update
+    """
+    update = geyser_pb2.SubscribeUpdate(filters=["pumpFun"])
+    update.transaction.slot = slot
+    tx_info = update.transaction.transaction
+    tx_info.signature = os.urandom(64)
+    tx_info.index = random.randrange(2000)
+    tx_info.transaction.signatures.append(tx_info.signature)
+
+    message = tx_info.transaction.message
+    message.header.num_required_signatures = 1
+    message.recent_blockhash = os.urandom(32)
+    message.account_keys.extend([os.urandom(32) for _ in range(15)] + [base58.b58decode(PUMP_FUN_ACCOUNT)])
+    discriminator = AsyncPumpMonitor.PUMP_INSTRUCTION_PREFIX if mint else bytes([102, 6, 61, 18, 1, 218, 235, 234])
+    message.instructions.add(program_id_index=14, data=bytes([2]) + os.urandom(4))
+    message.instructions.add(program_id_index=14, data=bytes([3]) + os.urandom(8))
+    message.instructions.add(program_id_index=15, accounts=bytes(range(14)), data=discriminator + os.urandom(80 if mint else 16))
+
+    meta = tx_info.meta
+    meta.fee = 5000
+    meta.pre_balances.extend(random.randrange(10 ** 10) for _ in range(16))
+    meta.post_balances.extend(random.randrange(10 ** 10) for _ in range(16))
+    meta.log_messages.extend(
+        f"Program {PUMP_FUN_ACCOUNT} invoke [1]" if i % 6 == 0 else f"Program log: Instruction: {os.urandom(24).hex()}"
+        for i in range(30)
+    )
+    inner = meta.inner_instructions.add(index=2)
+    for _ in range(5):
+        inner.instructions.add(program_id_index=random.randrange(15), accounts=bytes([1, 2, 3]), data=os.urandom(24))
+    for account_index in (3, 4):
+        balance = meta.post_token_balances.add(account_index=account_index, mint=base58.b58encode(os.urandom(32)).decode())
+        balance.ui_token_amount.amount = str(random.randrange(10 ** 15))
+        balance.ui_token_amount.decimals = 6
+    meta.compute_units_consumed = random.randrange(200000)
+    return update
+
+def write_synthetic_capture(file_path: str, count: int, mint_ratio: float) -> None:
+    """Write a capture of `count` synthetic transaction updates, `mint_ratio` of them mints."""
+    with CaptureWriter(file_path) as writer:
+        for index in range(count):
+            update = synthetic_update(300000000 + index // 50, random.random() < mint_ratio)
+            writer.write(time.time(), update.SerializeToString())
+
+def large_registry(types: int) -> DecoderRegistry:
+    """Pump.fun registry padded with made-up instruction types of Pump.fun and 8 other programs, `types` in total."""
+    registry = pump_fun_registry()
+    programs = [PUMP_FUN_ACCOUNT] + [base58.b58encode(os.urandom(32)).decode() for _ in range(8)]
+    for index in range(types - 1):
+        registry.register(programs[index % len(programs)], os.urandom(8), f"made_up_{index}")
+    return registry
+
+def measure(name: str, frames: List[bytes], decode: Callable[[bytes], list]) -> Tuple[float, list]:
+    """Time a decoding path over all the frames and print its throughput, returns the time and the matches."""
+    started = time.perf_counter()
+    matches = [match for frame in frames for match in decode(frame)]
+    elapsed = time.perf_counter() - started
+    print(f"{name:<44} {elapsed * 1000:>9.1f} ms {len(frames) / elapsed:>12,.0f} msg/s {len(matches):>7} mints")
+    return elapsed, matches
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure SubscribeUpdate decoding throughput on one core.")
+    parser.add_argument("--capture", help="capture file to decode, a synthetic one is generated when omitted")
+    parser.add_argument("--count", type=int, default=20000, help="updates of the synthetic capture")
+    parser.add_argument("--mint-ratio", type=float, default=0.05, help="share of mints in the synthetic capture")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        capture_path = args.capture
+        if capture_path is None:
+            capture_path = os.path.join(work_dir, "synthetic.yscap")
+            write_synthetic_capture(capture_path, args.count, args.mint_ratio)
+        frames = [frame for _, frame in read_capture(capture_path)]
+
+    monitor = AsyncPumpMonitor("localhost:10000", "")
+    prefix = monitor.PUMP_INSTRUCTION_PREFIX
+    print(f"{len(frames):,} frames, {sum(map(len, frames)) / len(frames):,.0f} bytes on average, "
+          f"protobuf {protobuf_backend()} backend\n")
+
+    def mints_of(update: geyser_pb2.SubscribeUpdate) -> List[Tuple[str, int, str]]:
+        # What on_mint() gets to see of each mint, the common output of both paths
+        return [
+            (event.signature, event.slot, event.mint)
+            for event in map(MintEvent, monitor.decoders.decode_transaction(update.transaction))
+        ]
+
+    def full(frame: bytes) -> List[Tuple[str, int, str]]:
+        return mints_of(geyser_pb2.SubscribeUpdate.FromString(frame))
+
+    def lazy(frame: bytes) -> List[Tuple[str, int, str]]:
+        if not monitor.wants_transaction(frame) and peek_update_kind(frame) == "transaction":
+            return []
+        return mints_of(geyser_pb2.SubscribeUpdate.FromString(frame))
+
+    def registry_decoding(registry: DecoderRegistry) -> Callable[[bytes], list]:
+        return lambda frame: [
+            instruction
+            for instruction in registry.decode_transaction(geyser_pb2.SubscribeUpdate.FromString(frame).transaction)
+            if instruction.name == "pump_create"
+        ]
+
+    def wire_walk(frame: bytes) -> list:
+        return [data for data in peek_instruction_data(frame) if data.startswith(prefix)]
+
+    baseline, full_mints = measure("full decoding of every update", frames, full)
+    fast, lazy_mints = measure("lazy: discriminator check, then full decoding", frames, lazy)
+    if lazy_mints != full_mints:
+        raise RuntimeError("The lazy path did not find the same mints as full decoding")
+    print(f"\nSpeedup of the lazy path: {baseline / fast:.1f}x, same {len(full_mints)} mints found\n")
+
+    # A pure Python walk down to the instruction data, without the protobuf objects: it finds the
+    # instruction data only, yet is slower than upb's full parse, so it is not used on the hot path
+    measure("wire walk to the instruction data", frames, wire_walk)
+    measure("registry with 1 instruction type", frames, registry_decoding(pump_fun_registry()))
+    measure("registry with 64 instruction types", frames, registry_decoding(large_registry(64)))
+
+if __name__ == "__main__":
+    main()
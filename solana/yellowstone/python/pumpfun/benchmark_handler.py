@@ -0,0 +1,128 @@
+"""
+Replay harness for AsyncPumpMonitor: serves a capture (see capture.py and record.py) from a local replay
+server and runs the monitor against it, reporting the end-to-end and handle_update() throughput, then the
+peak and retained memory while processing the stream (tracemalloc) and the garbage collections it triggered.
+Runs on a synthetic capture when none is given.
+
+Usage: python benchmark_handler.py [--capture stream.yscap] [--speed 0] [--count 20000] [--mint-ratio 0.05]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import generated.geyser_pb2 as geyser_pb2
+from benchmark_decoding import write_synthetic_capture
+from events import MintEvent
+from replay import ReplayPumpMonitor, ReplayServicer, start_replay_server
+from wire import protobuf_backend
+
+class TimedMonitor(ReplayPumpMonitor):
+    """
+    Replay monitor timing handle_update() and counting the mints instead of printing them.
+
+    Attributes:
+        handler_seconds (float): Time spent in handle_update()
+        mints (int): Mints detected
+    """
+
+    def __init__(self, endpoint: str, **kwargs) -> None:
+        super().__init__(endpoint, "", stats_interval=None, max_retries=0, ping_interval=None, **kwargs)
+        self.handler_seconds = 0.0
+        self.mints = 0
+
+    async def handle_update(self, update: geyser_pb2.SubscribeUpdate) -> None:
+        started = time.perf_counter()
+        await super().handle_update(update)
+        self.handler_seconds += time.perf_counter() - started
+
+    async def on_mint(self, event: MintEvent) -> None:
+        self.mints += 1
+
+async def replay_once(servicer: ReplayServicer, trace: bool, **monitor_options) -> dict:
+    """
+    Replay the capture once to a fresh monitor.
+
+    Args:
+        servicer: Replay servicer holding the capture
+        trace: Whether to trace the memory allocations with tracemalloc
+        **monitor_options: AsyncPumpMonitor options
+
+    Returns:
+        dict: The monitor, elapsed seconds, gen0 collections, and when tracing the peak traced memory and
+            the difference between the snapshots taken before and after, i.e. the memory still retained
+    """
+    server, port = await start_replay_server(servicer)
+    monitor = TimedMonitor(f"127.0.0.1:{port}", **monitor_options)
+    result = {"monitor": monitor}
+    try:
+        gc.collect()
+        collections = gc.get_stats()[0]["collections"]
+        if trace:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        await monitor.start_monitoring()
+        result["elapsed"] = time.perf_counter() - started
+        if trace:
+            result["snapshot"] = tracemalloc.take_snapshot().compare_to(before, "lineno")
+            result["peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        result["collections"] = gc.get_stats()[0]["collections"] - collections
+    finally:
+        await server.stop(None)
+    return result
+
+async def benchmark(capture_path: str, speed: float, lazy_decode: bool) -> None:
+    servicer = ReplayServicer.from_capture(capture_path, speed)
+    frames = len(servicer.frames)
+    print(f"{frames:,} frames, protobuf {protobuf_backend()} backend, replay speed "
+          f"{'max' if not speed else f'{speed:g}x'}, lazy decoding {'on' if lazy_decode else 'off'}\n")
+
+    timed = await replay_once(servicer, trace=False, lazy_decode=lazy_decode)
+    monitor, elapsed = timed["monitor"], timed["elapsed"]
+    stats = monitor.stats
+    print(f"End to end:     {elapsed:.2f} s, {frames / elapsed:,.0f} frames/s, {stats['processed']:,} processed, "
+          f"{stats['skipped']:,} skipped, {monitor.mints:,} mints")
+    handled = max(stats["processed"], 1)
+    print(f"handle_update:  {monitor.handler_seconds:.2f} s, {handled / max(monitor.handler_seconds, 1e-9):,.0f} updates/s, "
+          f"{monitor.handler_seconds / handled * 1e6:.1f} us per update")
+
+    traced = await replay_once(servicer, trace=True, lazy_decode=lazy_decode)
+    differences = traced["snapshot"]
+    retained = sum(difference.size_diff for difference in differences if difference.size_diff > 0)
+    blocks = sum(difference.count_diff for difference in differences if difference.count_diff > 0)
+    # The snapshot difference is the memory left behind by the run, not what it allocated along the way:
+    # the churn shows in the gen0 collections, each triggered after gc.get_threshold()[0] net container allocations
+    print(f"\nPeak memory:    {traced['peak'] / 1e6:.1f} MB traced while processing the stream")
+    print(f"Retained:       {retained / 1e6:.1f} MB in {blocks:,} blocks still allocated at the end")
+    print(f"Collections:    {traced['collections'] / frames * 1000:.1f} gen0 collections per 1000 frames")
+    print("Largest sites of retained memory:")
+    for difference in differences[:5]:
+        frame = difference.traceback[0]
+        print(f"  {os.path.basename(frame.filename)}:{frame.lineno:<6} {difference.size_diff / 1e3:>10.1f} kB "
+              f"{difference.count_diff:>8,} blocks")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a capture through AsyncPumpMonitor and measure it.")
+    parser.add_argument("--capture", help="capture file to replay, a synthetic one is generated when omitted")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed, 0 for as fast as possible")
+    parser.add_argument("--count", type=int, default=20000, help="updates of the synthetic capture")
+    parser.add_argument("--mint-ratio", type=float, default=0.05, help="share of mints in the synthetic capture")
+    parser.add_argument("--no-lazy", action="store_true", help="deserialize every update")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        capture_path = args.capture
+        if capture_path is None:
+            capture_path = os.path.join(work_dir, "synthetic.yscap")
+            write_synthetic_capture(capture_path, args.count, args.mint_ratio)
+        asyncio.run(benchmark(capture_path, args.speed, not args.no_lazy))
+
+if __name__ == "__main__":
+    main()
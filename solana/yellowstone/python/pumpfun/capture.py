@@ -0,0 +1,75 @@
+"""
+Capture files of raw Yellowstone stream frames. A capture starts with the MAGIC header, followed by one
+record per SubscribeUpdate: the receive time (little-endian float64, Unix seconds), the length of the
+frame (little-endian uint32) and the serialized SubscribeUpdate itself.
+"""
+
+import struct
+from typing import BinaryIO, Iterator, Tuple
+
+MAGIC = b"YSCAP1\n"
+RECORD_HEADER = struct.Struct("<dI")
+
+class CaptureWriter:
+    """
+    Appends frames to a capture file.
+
+    Attributes:
+        frames (int): Number of frames written
+        bytes (int): Number of frame bytes written, headers excluded
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file: BinaryIO = open(file_path, "wb")
+        self.file.write(MAGIC)
+        self.frames = 0
+        self.bytes = 0
+
+    def write(self, received_at: float, frame: bytes) -> None:
+        """
+        Write one frame.
+
+        Args:
+            received_at: Unix time the frame was received at
+            frame: Serialized SubscribeUpdate
+        """
+        self.file.write(RECORD_HEADER.pack(received_at, len(frame)))
+        self.file.write(frame)
+        self.frames += 1
+        self.bytes += len(frame)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def read_capture(file_path: str) -> Iterator[Tuple[float, bytes]]:
+    """
+    Read the frames of a capture file.
+
+    Args:
+        file_path: Path of the capture
+
+    Yields:
+        Tuple[float, bytes]: Receive time and serialized SubscribeUpdate of each frame
+
+    Raises:
+        ValueError: If the file is not a capture
+    """
+    with open(file_path, "rb") as capture:
+        if capture.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_path} is not a Yellowstone capture file")
+        while True:
+            header = capture.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            received_at, length = RECORD_HEADER.unpack(header)
+            frame = capture.read(length)
+            if len(frame) < length:
+                # Truncated last record, e.g. the recorder was killed mid-write
+                return
+            yield received_at, frame
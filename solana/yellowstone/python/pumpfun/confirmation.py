@@ -0,0 +1,344 @@
+"""
+Processed-commitment fast path: mints are emitted as soon as their transaction is processed, then
+upgraded to confirmed and finalized, or retracted, as the slot and transaction status updates come in.
+"""
+
+import heapq
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Set
+
+import generated.geyser_pb2 as geyser_pb2
+from decoders import DecodedInstruction
+from events import MintEvent
+from filters import PUMP_FUN_ACCOUNT, PUMP_MINT_AUTHORITY, transaction_filter
+from main import AsyncPumpMonitor
+
+logger = logging.getLogger(__name__)
+
+CommitmentLevel = geyser_pb2.CommitmentLevel
+
+class StatusChange:
+    """
+    Change of the commitment status of a provisional mint.
+
+    Attributes:
+        event (MintEvent): The mint, at the commitment level of the change for upgrades
+        status (str): "confirmed", "finalized", "retracted" (the transaction will not land) or "expired"
+            (no final status was seen before the mint was evicted)
+        reason (str): Why the mint was retracted or expired, empty otherwise
+    """
+
+    __slots__ = ("event", "status", "reason")
+
+    def __init__(self, event: MintEvent, status: str, reason: str = "") -> None:
+        self.event = event
+        self.status = status
+        self.reason = reason
+
+    def to_dict(self) -> dict:
+        """Format the change, e.g. to write it out as JSON."""
+        return {
+            "signature": self.event.signature,
+            "slot": self.event.slot,
+            "mint": self.event.mint,
+            "status": self.status,
+            "reason": self.reason,
+        }
+
+    def __repr__(self) -> str:
+        return f"StatusChange({self.status}, slot={self.event.slot}, mint={self.event.mint})"
+
+class ConfirmationTracker:
+    """
+    Pending provisional mints, indexed by slot so a slot status update resolves all the mints of its slot at
+    once. A transaction can be processed in several slots when the cluster forks; it is confirmed as soon as
+    one of them is, and only retracted once all of them are dead or abandoned. A slot is abandoned when a
+    later slot is finalized before it was ever confirmed.
+
+    Pending slots are kept in a min-heap, so the oldest ones are evicted first: mints still pending
+    `max_pending_slots` slots after the newest slot seen expire. The status of recent slots is remembered,
+    so mints tracked after their slot status arrived are resolved right away.
+
+    Attributes:
+        stats (dict): Tracked, confirmed, finalized, retracted and expired mints
+    """
+
+    def __init__(self, max_pending_slots: int = 300, max_slot_statuses: int = 10000) -> None:
+        """
+        Initializer.
+
+        Args:
+            max_pending_slots: Slots a mint can stay unresolved behind the newest slot before it expires
+            max_slot_statuses: Number of recent slot statuses remembered
+        """
+        self.max_pending_slots = max_pending_slots
+        self.max_slot_statuses = max_slot_statuses
+        self.stats = {"tracked": 0, "confirmed": 0, "finalized": 0, "retracted": 0, "expired": 0}
+        self.newest_slot = 0
+        self._by_slot: Dict[int, Dict[bytes, MintEvent]] = {}
+        self._slots_of: Dict[bytes, Set[int]] = {}
+        self._slot_heap: List[int] = []
+        self._slot_status: OrderedDict = OrderedDict()
+
+    def pending(self) -> int:
+        """Number of mints not finalized, retracted or expired yet."""
+        return len(self._slots_of)
+
+    def _index(self, event: MintEvent, slot: int) -> None:
+        slot_events = self._by_slot.get(slot)
+        if slot_events is None:
+            slot_events = self._by_slot[slot] = {}
+            heapq.heappush(self._slot_heap, slot)
+        slot_events[event.raw_signature] = event
+        self._slots_of.setdefault(event.raw_signature, set()).add(slot)
+
+    def _forget(self, signature: bytes) -> None:
+        for slot in self._slots_of.pop(signature, ()):
+            slot_events = self._by_slot.get(slot)
+            if slot_events is not None:
+                slot_events.pop(signature, None)
+                if not slot_events:
+                    del self._by_slot[slot]
+
+    def _unlink(self, event: MintEvent, slot: int, reason: str) -> List[StatusChange]:
+        """Remove a slot of a mint, retracting the mint when it has no slot left."""
+        signature = event.raw_signature
+        slots = self._slots_of.get(signature)
+        if slots is None:
+            return []
+        slots.discard(slot)
+        slot_events = self._by_slot.get(slot)
+        if slot_events is not None:
+            slot_events.pop(signature, None)
+            if not slot_events:
+                del self._by_slot[slot]
+        if slots:
+            return []
+        del self._slots_of[signature]
+        self.stats["retracted"] += 1
+        return [StatusChange(event, "retracted", reason)]
+
+    def _upgrade(self, event: MintEvent, status: str) -> List[StatusChange]:
+        # The event already published may still be waiting in a sink, the upgrade is a copy
+        upgraded = event.with_commitment(status)
+        self.stats[status] += 1
+        if status == "finalized":
+            self._forget(event.raw_signature)
+        else:
+            for slot in self._slots_of[event.raw_signature]:
+                self._by_slot[slot][event.raw_signature] = upgraded
+        return [StatusChange(upgraded, status)]
+
+    def _apply(self, event: MintEvent, slot: int, status: int, dead_error: str = "") -> List[StatusChange]:
+        """Apply the status of one of its slots to a mint."""
+        if status == CommitmentLevel.DEAD:
+            return self._unlink(event, slot, f"slot {slot} is dead" + (f": {dead_error}" if dead_error else ""))
+        if status == CommitmentLevel.CONFIRMED and event.commitment == "processed":
+            return self._upgrade(event, "confirmed")
+        if status == CommitmentLevel.FINALIZED:
+            return self._upgrade(event, "finalized")
+        return []
+
+    def track(self, event: MintEvent) -> List[StatusChange]:
+        """
+        Start tracking a provisional mint.
+
+        Args:
+            event: Mint seen at processed commitment
+
+        Returns:
+            List[StatusChange]: Changes already known from the status of its slot
+        """
+        if event.raw_signature in self._slots_of:
+            return []
+        self.stats["tracked"] += 1
+        self._index(event, event.slot)
+        changes = []
+        status = self._slot_status.get(event.slot)
+        if status is not None:
+            changes.extend(self._apply(event, event.slot, status))
+        changes.extend(self._expire())
+        return changes
+
+    def on_slot(self, slot: int, status: int, dead_error: str = "") -> List[StatusChange]:
+        """
+        Apply a slot status update to the mints of the slot.
+
+        Args:
+            slot: Slot of the update
+            status: New status of the slot (CommitmentLevel)
+            dead_error: Why the slot is dead, for DEAD slots
+
+        Returns:
+            List[StatusChange]: The resulting upgrades and retractions
+        """
+        self._slot_status[slot] = status
+        if len(self._slot_status) > self.max_slot_statuses:
+            self._slot_status.popitem(last=False)
+        self.newest_slot = max(self.newest_slot, slot)
+
+        changes = []
+        for event in list(self._by_slot.get(slot, {}).values()):
+            changes.extend(self._apply(event, slot, status, dead_error))
+        if status == CommitmentLevel.FINALIZED:
+            changes.extend(self._abandon(slot))
+        changes.extend(self._expire())
+        return changes
+
+    def _abandon(self, finalized_slot: int) -> List[StatusChange]:
+        """Unlink the mints of the slots before a finalized slot that were never confirmed."""
+        changes = []
+        for slot in [slot for slot in self._by_slot if slot < finalized_slot]:
+            if self._slot_status.get(slot) in (CommitmentLevel.CONFIRMED, CommitmentLevel.FINALIZED):
+                continue
+            for event in list(self._by_slot.get(slot, {}).values()):
+                changes.extend(self._unlink(event, slot, f"slot {slot} was skipped by finalized slot {finalized_slot}"))
+        return changes
+
+    def _expire(self) -> List[StatusChange]:
+        """Evict the slots too far behind the newest one, expiring the mints left in them."""
+        changes = []
+        heap = self._slot_heap
+        while heap and heap[0] < self.newest_slot - self.max_pending_slots:
+            slot = heapq.heappop(heap)
+            for event in list(self._by_slot.pop(slot, {}).values()):
+                slots = self._slots_of.get(event.raw_signature)
+                if slots is None:
+                    continue
+                slots.discard(slot)
+                if not slots:
+                    del self._slots_of[event.raw_signature]
+                    self.stats["expired"] += 1
+                    changes.append(StatusChange(event, "expired", f"no final status within {self.max_pending_slots} slots"))
+        # Slots emptied by resolved mints are left in the heap, drop them once they reach the top
+        while heap and heap[0] not in self._by_slot:
+            heapq.heappop(heap)
+        return changes
+
+    def on_transaction_status(self, signature: bytes, slot: int, failed: bool) -> List[StatusChange]:
+        """
+        Apply a transaction status update to a tracked mint: the transaction was processed in `slot`,
+        possibly another fork than the one it was first seen in.
+
+        Args:
+            signature: Raw transaction signature
+            slot: Slot the transaction was processed in
+            failed: Whether the transaction failed in that slot
+
+        Returns:
+            List[StatusChange]: The resulting upgrades and retractions
+        """
+        slots = self._slots_of.get(signature)
+        if slots is None:
+            return []
+        event = self._by_slot[next(iter(slots))][signature]
+        if failed:
+            return self._unlink(event, slot, f"transaction failed in slot {slot}")
+        if slot in slots:
+            return []
+        self._index(event, slot)
+        status = self._slot_status.get(slot)
+        return self._apply(event, slot, status) if status is not None else []
+
+class ProcessedPumpMonitor(AsyncPumpMonitor):
+    """
+    AsyncPumpMonitor subscribed at processed commitment, for the earliest detection. Mints are passed to
+    on_mint() as provisional events (commitment "processed"), then tracked by a ConfirmationTracker
+    through the slot updates (all statuses) and the transaction status updates of Pump.fun create
+    transactions. Every upgrade to confirmed or finalized and every retraction is passed to on_status().
+
+    Attributes:
+        tracker (ConfirmationTracker): The provisional mints waiting for their final status
+    """
+
+    COMMITMENT_LEVEL = CommitmentLevel.PROCESSED
+
+    def __init__(self, endpoint: str, token: str, max_pending_slots: int = 300, **kwargs) -> None:
+        """
+        Initializer.
+
+        Args:
+            endpoint: gRPC service endpoint URL (your RPC endpoint with port 10000)
+            token: Authentication token for the service
+            max_pending_slots: Slots a mint can stay unresolved behind the newest slot before it expires
+            **kwargs: AsyncPumpMonitor options
+        """
+        super().__init__(endpoint, token, **kwargs)
+        self.tracker = ConfirmationTracker(max_pending_slots=max_pending_slots)
+
+    def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
+        """
+        Generate subscription requests for monitoring: the mint transactions at processed commitment, every
+        slot status, and the status of Pump.fun create transactions, failed ones included.
+
+        Yields:
+            geyser_pb2.SubscribeRequest: Configured subscription request
+        """
+        for request in super().request_iterator():
+            request.slots["confirmation"].filter_by_commitment = False
+            request.transactions_status["pumpFun"].CopyFrom(transaction_filter(
+                account_include=[PUMP_FUN_ACCOUNT], account_required=[PUMP_MINT_AUTHORITY], vote=False, failed=None
+            ))
+            yield request
+
+    async def handle_update(self, update: geyser_pb2.SubscribeUpdate) -> None:
+        """
+        Process transaction updates as AsyncPumpMonitor does, and slot and transaction status updates
+        through the tracker.
+
+        Args:
+            update: Update message from the gRPC subscription
+        """
+        kind = update.WhichOneof("update_oneof")
+        if kind == "slot":
+            dead_error = update.slot.dead_error if update.slot.HasField("dead_error") else ""
+            changes = self.tracker.on_slot(update.slot.slot, update.slot.status, dead_error)
+        elif kind == "transaction_status":
+            status = update.transaction_status
+            changes = self.tracker.on_transaction_status(status.signature, status.slot, status.HasField("err"))
+        else:
+            await super().handle_update(update)
+            return
+        for change in changes:
+            await self.on_status(change)
+
+    async def on_instruction(self, instruction: DecodedInstruction) -> None:
+        """
+        Pump.fun create instructions are passed on to on_mint() as provisional MintEvents and tracked
+        until their final status.
+
+        Args:
+            instruction: The matched instruction
+        """
+        if instruction.name != "pump_create":
+            return
+        event = MintEvent(instruction, commitment="processed")
+        if self.curves is not None:
+            self.curves.track(event)
+        # Tracked before on_mint() yields to the event loop, so no slot update can be missed in between
+        changes = self.tracker.track(event)
+        await self.on_mint(event)
+        for change in changes:
+            await self.on_status(change)
+
+    async def on_status(self, change: StatusChange) -> None:
+        """
+        Called when a provisional mint is confirmed, finalized, retracted or expires. Publishes the change to
+        the sinks, or logs it when there are none.
+
+        Args:
+            change: The status change
+        """
+        if not self.sinks:
+            logger.info(f"Mint {change.event.mint} {change.status}" + (f": {change.reason}" if change.reason else ""))
+        for sink in self.sinks:
+            sink.publish(change)
+
+    def log_stats(self) -> None:
+        super().log_stats()
+        stats = self.tracker.stats
+        logger.info(
+            f"Provisional mints: {self.tracker.pending()} pending, {stats['confirmed']} confirmed, "
+            f"{stats['finalized']} finalized, {stats['retracted']} retracted, {stats['expired']} expired"
+        )
@@ -0,0 +1,179 @@
+"""
+In-memory state of the bonding curves of new Pump.fun tokens, kept up to date from the account stream so
+it can be read without any RPC call.
+"""
+
+import struct
+from collections import OrderedDict, deque
+from typing import Dict, NamedTuple, Optional, Union
+
+import generated.geyser_pb2 as geyser_pb2
+from encoding import decode_pubkey
+from events import MintEvent
+
+# Curve fields after the discriminator: five u64 (virtual and real reserves, total supply) and the complete flag
+CURVE_LAYOUT = struct.Struct("<QQQQQ?")
+# Only these bytes of the curve accounts are requested, see accounts_data_slice
+CURVE_DATA_SLICE = (8, CURVE_LAYOUT.size)
+
+LAMPORTS_PER_SOL = 10 ** 9
+TOKEN_DECIMALS = 6
+
+class CurveState(NamedTuple):
+    """
+    State of a bonding curve at a given account version.
+
+    Attributes:
+        slot: Slot of the account update
+        write_version: Write version of the account update, orders the updates of a slot
+        virtual_token_reserves: Virtual token reserves, in base units
+        virtual_sol_reserves: Virtual SOL reserves, in lamports
+        real_token_reserves: Tokens left on the curve, in base units
+        real_sol_reserves: SOL in the curve, in lamports
+        token_total_supply: Total supply of the token, in base units
+        complete: Whether the curve is complete (the token migrated)
+    """
+    slot: int
+    write_version: int
+    virtual_token_reserves: int
+    virtual_sol_reserves: int
+    real_token_reserves: int
+    real_sol_reserves: int
+    token_total_supply: int
+    complete: bool
+
+    def price(self) -> float:
+        """Price of one token in SOL, 0 while the curve has no reserves."""
+        if not self.virtual_token_reserves:
+            return 0.0
+        return (self.virtual_sol_reserves / LAMPORTS_PER_SOL) / (self.virtual_token_reserves / 10 ** TOKEN_DECIMALS)
+
+def decode_curve(data: bytes, slot: int, write_version: int) -> Optional[CurveState]:
+    """
+    Decode the sliced data of a bonding curve account.
+
+    Args:
+        data: Account data from CURVE_DATA_SLICE onwards
+        slot: Slot of the account update
+        write_version: Write version of the account update
+
+    Returns:
+        Optional[CurveState]: The state, None when the data is too short
+    """
+    if len(data) < CURVE_LAYOUT.size:
+        return None
+    return CurveState(slot, write_version, *CURVE_LAYOUT.unpack_from(data))
+
+class CurveTracker:
+    """
+    Slot-versioned table of the bonding curves of the tracked mints. Each curve keeps its most recent
+    versions, newest last, and updates older than the newest version are ignored, so updates handled out
+    of order never roll a curve back. Reads are dict lookups.
+
+    Curve updates often arrive before the transaction creating the token has been handled, so the latest
+    state of recent untracked curves is kept too, and used when their mint gets tracked.
+
+    Attributes:
+        stats (dict): Account updates applied, ignored as stale, or for untracked curves
+    """
+
+    def __init__(self, max_tracked: int = 10000, history: int = 8, max_untracked: int = 10000) -> None:
+        """
+        Initializer.
+
+        Args:
+            max_tracked: Number of mints tracked, the oldest ones are dropped beyond it
+            history: Number of versions kept per curve
+            max_untracked: Number of recent untracked curves whose latest state is kept
+        """
+        self.max_tracked = max_tracked
+        self.history = history
+        self.max_untracked = max_untracked
+        self.stats = {"applied": 0, "stale": 0, "untracked": 0}
+        self._curve_of_mint: OrderedDict = OrderedDict()
+        self._versions: Dict[bytes, deque] = {}
+        self._untracked: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._curve_of_mint)
+
+    def track(self, event: MintEvent) -> None:
+        """
+        Start tracking the bonding curve of a new mint.
+
+        Args:
+            event: The mint, with its bonding curve account
+        """
+        curve = event.raw_bonding_curve
+        if curve is None or event.raw_mint in self._curve_of_mint:
+            return
+        self._curve_of_mint[event.raw_mint] = curve
+        versions = self._versions[curve] = deque(maxlen=self.history)
+        state = self._untracked.pop(curve, None)
+        if state is not None:
+            versions.append(state)
+        if len(self._curve_of_mint) > self.max_tracked:
+            _, evicted = self._curve_of_mint.popitem(last=False)
+            self._versions.pop(evicted, None)
+
+    def on_account(self, update: geyser_pb2.SubscribeUpdateAccount) -> None:
+        """
+        Apply a bonding curve account update.
+
+        Args:
+            update: Account update of the subscription, with the data sliced to CURVE_DATA_SLICE
+        """
+        account = update.account
+        state = decode_curve(account.data, update.slot, account.write_version)
+        if state is None:
+            return
+        versions = self._versions.get(account.pubkey)
+        if versions is None:
+            self.stats["untracked"] += 1
+            latest = self._untracked.get(account.pubkey)
+            if latest is None or (state.slot, state.write_version) > (latest.slot, latest.write_version):
+                self._untracked[account.pubkey] = state
+                self._untracked.move_to_end(account.pubkey)
+                if len(self._untracked) > self.max_untracked:
+                    self._untracked.popitem(last=False)
+            return
+        if versions and (state.slot, state.write_version) <= (versions[-1].slot, versions[-1].write_version):
+            self.stats["stale"] += 1
+            return
+        versions.append(state)
+        self.stats["applied"] += 1
+
+    def _versions_of(self, mint: Union[bytes, str]) -> Optional[deque]:
+        if isinstance(mint, str):
+            mint = decode_pubkey(mint)
+        curve = self._curve_of_mint.get(mint)
+        return self._versions.get(curve) if curve is not None else None
+
+    def get(self, mint: Union[bytes, str]) -> Optional[CurveState]:
+        """
+        Latest known state of the bonding curve of a mint.
+
+        Args:
+            mint: Mint address, raw or base58
+
+        Returns:
+            Optional[CurveState]: The state, None if the mint is not tracked or its curve not seen yet
+        """
+        versions = self._versions_of(mint)
+        return versions[-1] if versions else None
+
+    def state_at(self, mint: Union[bytes, str], slot: int) -> Optional[CurveState]:
+        """
+        State of the bonding curve of a mint as of a slot, among the versions kept.
+
+        Args:
+            mint: Mint address, raw or base58
+            slot: Slot to read the state at
+
+        Returns:
+            Optional[CurveState]: The last state written at or before `slot`, None if not kept
+        """
+        for state in reversed(self._versions_of(mint) or ()):
+            if state.slot <= slot:
+                return state
+        return None
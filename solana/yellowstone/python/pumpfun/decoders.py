@@ -0,0 +1,208 @@
+"""
+Registry of instruction decoders keyed by program ID and instruction discriminator, so one stream can
+watch many programs and instruction types at a constant cost per instruction.
+"""
+
+import struct
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+import base58
+
+import generated.geyser_pb2 as geyser_pb2
+import generated.solana_storage_pb2 as solana_storage_pb2
+from filters import PUMP_FUN_ACCOUNT
+
+PUMP_CREATE_DISCRIMINATOR = bytes([24, 30, 200, 40, 5, 28, 7, 119])
+
+# Raw frames are only searched for discriminators when there are at most this many, all at least
+# MIN_PREFILTER_LENGTH bytes long; otherwise they are searched for the watched program IDs
+MAX_PREFILTER_DISCRIMINATORS = 4
+MIN_PREFILTER_LENGTH = 4
+
+class DecodedInstruction(NamedTuple):
+    """
+    An instruction matched by the registry. Keys and signatures are raw bytes, encode them only when needed.
+
+    Attributes:
+        name: Name the instruction type was registered with
+        program_id: Program ID of the instruction
+        data: Instruction data, discriminator included
+        accounts: Account keys passed to the instruction
+        signature: Signature of the transaction
+        slot: Slot of the transaction
+        inner: Whether the instruction was invoked by another program (inner instruction)
+        value: Result of the registered decode function, None without one
+    """
+    name: str
+    program_id: bytes
+    data: bytes
+    accounts: List[bytes]
+    signature: bytes
+    slot: int
+    inner: bool
+    value: Any
+
+class _Program:
+    """Instruction types registered for one program."""
+
+    def __init__(self) -> None:
+        self.by_discriminator: Dict[bytes, tuple] = {}
+        self.lengths: List[int] = []
+
+class DecoderRegistry:
+    """
+    Dispatches instructions to their decoders through a lookup table: the program ID selects the
+    program's table, then the leading bytes of the instruction data select the instruction type. Both
+    are dict lookups, so the cost per instruction does not grow with the number of registered types.
+    """
+
+    def __init__(self) -> None:
+        self.programs: Dict[bytes, _Program] = {}
+        self._needles: List[bytes] = []
+
+    def register(
+        self,
+        program_id: str,
+        discriminator: bytes,
+        name: str,
+        decode: Optional[Callable[[bytes, List[bytes]], Any]] = None
+    ) -> None:
+        """
+        Register an instruction type.
+
+        Args:
+            program_id: Base58 program ID
+            discriminator: Leading bytes of the instruction data identifying the instruction
+                (8 bytes for Anchor programs, 1 byte for most native programs)
+            name: Name reported in DecodedInstruction.name
+            decode: Optional function turning the instruction data and accounts into a value
+        """
+        program = self.programs.setdefault(base58.b58decode(program_id), _Program())
+        program.by_discriminator[bytes(discriminator)] = (name, decode)
+        if len(discriminator) not in program.lengths:
+            program.lengths.append(len(discriminator))
+            program.lengths.sort(reverse=True)
+        self._needles = self._prefilter_needles()
+
+    def _prefilter_needles(self) -> List[bytes]:
+        discriminators: Set[bytes] = {
+            discriminator for program in self.programs.values() for discriminator in program.by_discriminator
+        }
+        if len(discriminators) <= MAX_PREFILTER_DISCRIMINATORS and all(
+            len(discriminator) >= MIN_PREFILTER_LENGTH for discriminator in discriminators
+        ):
+            return sorted(discriminators)
+        return list(self.programs)
+
+    def may_match(self, frame: bytes) -> bool:
+        """
+        Cheap check on a serialized update: False when none of the registered instructions can be in it.
+
+        Args:
+            frame: Serialized SubscribeUpdate
+
+        Returns:
+            bool: False if the update can be skipped without deserializing it
+        """
+        return any(needle in frame for needle in self._needles)
+
+    def decode_transaction(self, transaction: geyser_pb2.SubscribeUpdateTransaction) -> List[DecodedInstruction]:
+        """
+        Match the top-level and inner instructions of a transaction against the registry.
+
+        Args:
+            transaction: Transaction of a SubscribeUpdate
+
+        Returns:
+            List[DecodedInstruction]: The matched instructions, top-level ones first
+        """
+        tx_info = transaction.transaction
+        message = tx_info.transaction.message
+        meta = tx_info.meta
+
+        # Top-level programs are always static account keys, but programs invoked through CPI can be loaded
+        # from lookup tables, like any account. The full key list is only built when one of them is needed.
+        static_keys = message.account_keys
+        static_count = len(static_keys)
+        programs = self.programs
+
+        matches = []
+        account_keys = None
+        instruction_groups = [(False, message.instructions)]
+        instruction_groups.extend((True, inner.instructions) for inner in meta.inner_instructions)
+        for inner, instructions in instruction_groups:
+            for instruction in instructions:
+                program_index = instruction.program_id_index
+                if program_index < static_count:
+                    program_id = static_keys[program_index]
+                else:
+                    if account_keys is None:
+                        account_keys = self._account_keys(message, meta)
+                    if program_index >= len(account_keys):
+                        continue
+                    program_id = account_keys[program_index]
+                program = programs.get(program_id)
+                if program is None:
+                    continue
+                data = instruction.data
+                for length in program.lengths:
+                    handler = program.by_discriminator.get(data[:length])
+                    if handler is None:
+                        continue
+                    if account_keys is None:
+                        account_keys = self._account_keys(message, meta)
+                    if any(index >= len(account_keys) for index in instruction.accounts):
+                        break
+                    name, decode = handler
+                    accounts = [account_keys[index] for index in instruction.accounts]
+                    matches.append(DecodedInstruction(
+                        name=name,
+                        program_id=program_id,
+                        data=data,
+                        accounts=accounts,
+                        signature=tx_info.signature,
+                        slot=transaction.slot,
+                        inner=inner,
+                        value=decode(data, accounts) if decode is not None else None
+                    ))
+                    break
+        return matches
+
+    @staticmethod
+    def _account_keys(
+        message: solana_storage_pb2.Message, meta: solana_storage_pb2.TransactionStatusMeta
+    ) -> List[bytes]:
+        """Account keys of a transaction, the addresses loaded from lookup tables after the static keys."""
+        return [*message.account_keys, *meta.loaded_writable_addresses, *meta.loaded_readonly_addresses]
+
+def read_borsh_string(data: bytes, offset: int) -> tuple:
+    """Read a Borsh string (u32 little-endian length, then UTF-8 bytes), returning it and the next offset."""
+    (length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    return data[offset:offset + length].decode("utf-8", errors="replace"), offset + length
+
+def decode_pump_create(data: bytes, accounts: List[bytes]) -> dict:
+    """
+    Decode the arguments of a Pump.fun create instruction.
+
+    Args:
+        data: Instruction data, discriminator included
+        accounts: Account keys of the instruction (mint, mint authority, bonding curve, ...)
+
+    Returns:
+        dict: Token name, symbol and metadata URI
+    """
+    offset = len(PUMP_CREATE_DISCRIMINATOR)
+    try:
+        name, offset = read_borsh_string(data, offset)
+        symbol, offset = read_borsh_string(data, offset)
+        uri, offset = read_borsh_string(data, offset)
+    except struct.error:
+        return {}
+    return {"name": name, "symbol": symbol, "uri": uri}
+
+def pump_fun_registry() -> DecoderRegistry:
+    """Registry watching Pump.fun create (mint) instructions."""
+    registry = DecoderRegistry()
+    registry.register(PUMP_FUN_ACCOUNT, PUMP_CREATE_DISCRIMINATOR, "pump_create", decode_pump_create)
+    return registry
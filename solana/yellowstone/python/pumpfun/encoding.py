@@ -0,0 +1,50 @@
+"""
+Base58 encoding of keys and signatures. Uses the Rust based `based58` package when installed, which is
+several times faster than the pure Python `base58`, and memoizes public keys since the same programs and
+accounts show up in most transactions.
+"""
+
+from functools import lru_cache
+
+from filters import PUMP_FUN_ACCOUNT, PUMP_MINT_AUTHORITY
+
+try:
+    import based58 as _base58
+    FAST_BASE58 = True
+except ImportError:
+    import base58 as _base58
+    FAST_BASE58 = False
+
+# Accounts present in most Pump.fun transactions, encoded once at import
+COMMON_ACCOUNTS = [
+    PUMP_FUN_ACCOUNT,
+    PUMP_MINT_AUTHORITY,
+    '11111111111111111111111111111111',              # System program
+    'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf8Ss623VQ5DA',   # Token program
+    'ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL',  # Associated token account program
+    'metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s',   # Metaplex token metadata program
+    'SysvarRent111111111111111111111111111111111',   # Rent sysvar
+    'ComputeBudget111111111111111111111111111111',   # Compute budget program
+    '4wTV1YmiEkRvAtNtsSGPtUrqRYQMe5SKy2uB4Jjaxnjf',  # Pump.fun global account
+    'Ce6TQqeHC9p8KetsN6JsjHK7UTZk7nasjjnr7XxXp9F1',  # Pump.fun event authority
+]
+
+def encode_signature(signature: bytes) -> str:
+    """Base58 encode a transaction signature. Signatures are unique, so they are not memoized."""
+    return _base58.b58encode(signature).decode()
+
+@lru_cache(maxsize=65536)
+def encode_pubkey(pubkey: bytes) -> str:
+    """Base58 encode a 32 bytes public key, memoizing the most recently seen keys."""
+    return _base58.b58encode(pubkey).decode()
+
+def decode_pubkey(pubkey: str) -> bytes:
+    """Base58 decode a public key."""
+    return bytes(_base58.b58decode(pubkey.encode()))
+
+def warm_up(pubkeys=COMMON_ACCOUNTS) -> None:
+    """Put well-known accounts in the public key cache."""
+    for pubkey in pubkeys:
+        encode_pubkey(decode_pubkey(pubkey))
+
+warm_up()
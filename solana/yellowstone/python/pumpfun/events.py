@@ -0,0 +1,88 @@
+"""
+Events emitted by the monitor. They hold raw bytes and only format them as strings when read, so no
+encoding work is done for events that are filtered out or never written anywhere.
+"""
+
+import copy
+from typing import Optional
+
+from decoders import DecodedInstruction
+from encoding import encode_pubkey, encode_signature
+
+class MintEvent:
+    """
+    A new Pump.fun mint, built from a matched create instruction. Addresses and the signature are
+    base58 encoded on access.
+
+    Attributes:
+        slot (int): Slot of the transaction
+        raw_signature (bytes): Transaction signature
+        raw_mint (bytes): Mint account
+        raw_bonding_curve (bytes): Bonding curve account of the token
+        raw_creator (bytes): Account that created the token
+        details (dict): Token name, symbol and metadata URI, when the instruction could be decoded
+        inner (bool): Whether the create instruction was invoked by another program
+        commitment (str): Commitment level the mint was seen at ("processed", "confirmed" or "finalized")
+    """
+
+    __slots__ = ("slot", "raw_signature", "raw_mint", "raw_bonding_curve", "raw_creator", "details", "inner", "commitment")
+
+    def __init__(self, instruction: DecodedInstruction, commitment: str = "confirmed") -> None:
+        accounts = instruction.accounts
+        self.slot = instruction.slot
+        self.raw_signature = instruction.signature
+        self.raw_mint = accounts[0]
+        self.raw_bonding_curve = accounts[2] if len(accounts) > 2 else None
+        self.raw_creator = accounts[7] if len(accounts) > 7 else None
+        self.details = instruction.value or {}
+        self.inner = instruction.inner
+        self.commitment = commitment
+
+    @property
+    def signature(self) -> str:
+        return encode_signature(self.raw_signature)
+
+    @property
+    def mint(self) -> str:
+        return encode_pubkey(self.raw_mint)
+
+    @property
+    def bonding_curve(self) -> Optional[str]:
+        return encode_pubkey(self.raw_bonding_curve) if self.raw_bonding_curve is not None else None
+
+    @property
+    def creator(self) -> Optional[str]:
+        return encode_pubkey(self.raw_creator) if self.raw_creator is not None else None
+
+    def with_commitment(self, commitment: str) -> "MintEvent":
+        """
+        Copy of the event at another commitment level. Published events are never modified, since sinks
+        may only format them later.
+
+        Args:
+            commitment: The new commitment level
+
+        Returns:
+            MintEvent: The copy
+        """
+        event = copy.copy(self)
+        event.commitment = commitment
+        return event
+
+    def to_dict(self) -> dict:
+        """Format the event, e.g. to write it out as JSON."""
+        return {
+            "signature": self.signature,
+            "slot": self.slot,
+            "mint": self.mint,
+            "bondingCurve": self.bonding_curve,
+            "creator": self.creator,
+            "name": self.details.get("name"),
+            "symbol": self.details.get("symbol"),
+            "uri": self.details.get("uri"),
+            "inner": self.inner,
+            "commitment": self.commitment,
+        }
+
+    def __repr__(self) -> str:
+        return f"MintEvent(slot={self.slot}, mint={self.mint})"
@@ -0,0 +1,152 @@
+"""
+Build Yellowstone transaction filters and measure how much traffic each of them lets through.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import generated.geyser_pb2 as geyser_pb2
+
+PUMP_FUN_ACCOUNT = '6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P'
+# PDA signing as the mint authority of every Pump.fun token, only present in create transactions
+PUMP_MINT_AUTHORITY = 'TSLvdd1pWpHVjahSpsvCXUbgwsL3JAcvokwaKt1eokM'
+
+def transaction_filter(
+    account_include: Iterable[str] = (),
+    account_exclude: Iterable[str] = (),
+    account_required: Iterable[str] = (),
+    vote: Optional[bool] = False,
+    failed: Optional[bool] = False,
+    signature: Optional[str] = None
+) -> geyser_pb2.SubscribeRequestFilterTransactions:
+    """
+    Build a transaction filter. A transaction matches when it mentions at least one of `account_include`,
+    none of `account_exclude` and all of `account_required`.
+
+    Args:
+        account_include: Accounts of which at least one must be in the transaction
+        account_exclude: Accounts that must not be in the transaction
+        account_required: Accounts that must all be in the transaction
+        vote: False to drop vote transactions, True to only get them, None for both
+        failed: False to drop failed transactions, True to only get them, None for both
+        signature: Only match the transaction with this signature
+
+    Returns:
+        geyser_pb2.SubscribeRequestFilterTransactions: The filter
+    """
+    transaction_filter = geyser_pb2.SubscribeRequestFilterTransactions(
+        account_include=list(account_include),
+        account_exclude=list(account_exclude),
+        account_required=list(account_required)
+    )
+    if vote is not None:
+        transaction_filter.vote = vote
+    if failed is not None:
+        transaction_filter.failed = failed
+    if signature is not None:
+        transaction_filter.signature = signature
+    return transaction_filter
+
+def pump_mint_filter() -> geyser_pb2.SubscribeRequestFilterTransactions:
+    """
+    Filter for successful Pump.fun create transactions. Requiring the mint authority keeps the buys and
+    sells, which make up most of the program's traffic, on the server.
+    """
+    return transaction_filter(
+        account_include=[PUMP_FUN_ACCOUNT], account_required=[PUMP_MINT_AUTHORITY], vote=False, failed=False
+    )
+
+# Anchor discriminator at the start of the data of Pump.fun BondingCurve accounts
+BONDING_CURVE_DISCRIMINATOR = bytes([23, 183, 248, 55, 96, 216, 172, 96])
+
+def bonding_curve_filter() -> geyser_pb2.SubscribeRequestFilterAccounts:
+    """
+    Filter for Pump.fun bonding curve accounts: accounts owned by the program whose data starts with the
+    BondingCurve discriminator. The data size is not filtered on, since newer curves are larger than the
+    original layout.
+    """
+    return geyser_pb2.SubscribeRequestFilterAccounts(
+        owner=[PUMP_FUN_ACCOUNT],
+        filters=[geyser_pb2.SubscribeRequestFilterAccountsFilter(
+            memcmp=geyser_pb2.SubscribeRequestFilterAccountsFilterMemcmp(offset=0, bytes=BONDING_CURVE_DISCRIMINATOR)
+        )]
+    )
+
+# Filter combinations compared by measure_filters.py, from the original program-wide filter to the tightest one
+PUMP_FILTER_CANDIDATES = {
+    "program": lambda: transaction_filter(account_include=[PUMP_FUN_ACCOUNT], vote=None, failed=None),
+    "programNoVoteNoFailed": lambda: transaction_filter(account_include=[PUMP_FUN_ACCOUNT]),
+    "mintAuthority": pump_mint_filter,
+}
+
+def build_request(
+    transaction_filters: Dict[str, geyser_pb2.SubscribeRequestFilterTransactions],
+    commitment: int = geyser_pb2.CommitmentLevel.CONFIRMED
+) -> geyser_pb2.SubscribeRequest:
+    """
+    Build a subscription request from named transaction filters.
+
+    Args:
+        transaction_filters: Filters by name, the names are reported in SubscribeUpdate.filters
+        commitment: Commitment level of the subscription
+
+    Returns:
+        geyser_pb2.SubscribeRequest: The subscription request
+    """
+    request = geyser_pb2.SubscribeRequest(commitment=commitment)
+    for name, transaction_filter in transaction_filters.items():
+        request.transactions[name].CopyFrom(transaction_filter)
+    return request
+
+class FilterStats:
+    """
+    Counts the messages and serialized bytes delivered for each filter name. Subscribing with several
+    filters at once, every update lists all the filters it matched, so each filter's counts are what it
+    would cost on its own.
+
+    Attributes:
+        filters (dict): Messages, bytes and matches per filter name
+    """
+
+    def __init__(self) -> None:
+        self.filters: Dict[str, dict] = {}
+
+    def record(self, update: geyser_pb2.SubscribeUpdate, matched: bool = False) -> None:
+        """
+        Record an update.
+
+        Args:
+            update: Update message from the gRPC subscription
+            matched: Whether the update is one the monitor is looking for (e.g. a new mint)
+        """
+        size = update.ByteSize()
+        for name in update.filters:
+            stats = self.filters.setdefault(name, {"messages": 0, "bytes": 0, "matches": 0})
+            stats["messages"] += 1
+            stats["bytes"] += size
+            stats["matches"] += matched
+
+    def summary(self, baseline: Optional[str] = None) -> str:
+        """
+        Format a table of the traffic per filter and what it saves compared to the baseline filter.
+
+        Args:
+            baseline: Filter name the others are compared to, the one with the most bytes by default
+
+        Returns:
+            str: The summary table
+        """
+        if not self.filters:
+            return "No updates recorded"
+        baseline = baseline or max(self.filters, key=lambda name: self.filters[name]["bytes"])
+        base = self.filters.get(baseline, {"messages": 0, "bytes": 0})
+
+        lines = [f"{'filter':<24} {'messages':>10} {'MB':>10} {'matches':>8} {'msgs saved':>11} {'bytes saved':>12}"]
+        for name, stats in sorted(self.filters.items(), key=lambda item: -item[1]["bytes"]):
+            saved_messages = 1 - stats["messages"] / base["messages"] if base["messages"] else 0.0
+            saved_bytes = 1 - stats["bytes"] / base["bytes"] if base["bytes"] else 0.0
+            lines.append(
+                f"{name:<24} {stats['messages']:>10} {stats['bytes'] / 1e6:>10.2f} {stats['matches']:>8} "
+                f"{saved_messages:>11.1%} {saved_bytes:>12.1%}"
+            )
+        lines.append(f"Savings relative to '{baseline}'")
+        return "\n".join(lines)
@@ -0,0 +1,161 @@
+"""
+Latency instrumentation of the monitor: how long updates take to decode and handle, and how long after
+their slot the watched instructions are detected.
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples, 0 when there are none."""
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+class LatencyTracker:
+    """
+    Records per-update timings and correlates detections with their slot. Two references are used for
+    a slot: the local time its first slot update was received (any status, the earliest one is kept),
+    and the block time of its block meta update. Block times are unix timestamps in whole seconds set
+    by the leader, so latencies measured against them are only accurate to about a second; detections
+    made before the block meta arrives are kept until it does.
+
+    Timings are kept in bounded windows of the most recent samples, in seconds:
+        - decode: deserialization of a raw update
+        - queue: time from reception until a worker starts handling the update
+        - handler: handle_update() of a transaction update
+        - slot: detection time minus the time the slot was first seen
+        - block_time: detection time minus the block time
+
+    Attributes:
+        samples (dict): Most recent samples of each timing
+        counters (dict): Received frames and bytes, handled transactions and detections
+    """
+
+    TIMINGS = ("decode", "queue", "handler", "slot", "block_time")
+
+    def __init__(self, window: int = 10000, max_slots: int = 2000) -> None:
+        """
+        Initializer.
+
+        Args:
+            window: Number of samples kept per timing
+            max_slots: Number of recent slots whose reference times are remembered
+        """
+        self.max_slots = max_slots
+        self.samples: Dict[str, deque] = {name: deque(maxlen=window) for name in self.TIMINGS}
+        self.counters = {"frames": 0, "bytes": 0, "handled": 0, "detections": 0}
+        self._slot_seen: OrderedDict = OrderedDict()
+        self._block_times: OrderedDict = OrderedDict()
+        self._awaiting_block_time: OrderedDict = OrderedDict()
+        self._interval_started = time.monotonic()
+        self._interval_counters = dict(self.counters)
+
+    def _remember(self, table: OrderedDict, slot: int, value) -> None:
+        table[slot] = value
+        if len(table) > self.max_slots:
+            table.popitem(last=False)
+
+    def record_frame(self, size: int = 0) -> None:
+        """Count a received frame of `size` serialized bytes."""
+        self.counters["frames"] += 1
+        self.counters["bytes"] += size
+
+    def record_decode(self, seconds: float) -> None:
+        """Record the deserialization time of an update."""
+        self.samples["decode"].append(seconds)
+
+    def record_slot(self, slot: int, received_at: float) -> None:
+        """
+        Record a slot update. Only the first update of each slot is kept as its reference time.
+
+        Args:
+            slot: Slot of the update
+            received_at: Wall clock time the update was received
+        """
+        if slot not in self._slot_seen:
+            self._remember(self._slot_seen, slot, received_at)
+
+    def record_block_meta(self, slot: int, block_time: Optional[int], received_at: float) -> None:
+        """
+        Record a block meta update, resolving the detections of its slot made before it arrived.
+
+        Args:
+            slot: Slot of the block
+            block_time: Unix timestamp of the block, None when the leader did not set one
+            received_at: Wall clock time the update was received
+        """
+        self.record_slot(slot, received_at)
+        if not block_time:
+            self._awaiting_block_time.pop(slot, None)
+            return
+        self._remember(self._block_times, slot, block_time)
+        for detected_at in self._awaiting_block_time.pop(slot, ()):
+            self.samples["block_time"].append(detected_at - block_time)
+
+    def record_handled(self, received_at: Optional[float], started_at: float, handler_seconds: float) -> None:
+        """
+        Record the handling of a transaction update.
+
+        Args:
+            received_at: Wall clock time the update was received, None for backfilled updates
+            started_at: Wall clock time a worker started handling it
+            handler_seconds: Time spent in handle_update()
+        """
+        self.counters["handled"] += 1
+        if received_at is not None:
+            self.samples["queue"].append(started_at - received_at)
+        self.samples["handler"].append(handler_seconds)
+
+    def record_detection(self, slot: int, detected_at: float) -> None:
+        """
+        Record the detection of a watched instruction.
+
+        Args:
+            slot: Slot of the transaction
+            detected_at: Wall clock time of the detection
+        """
+        self.counters["detections"] += 1
+        seen_at = self._slot_seen.get(slot)
+        if seen_at is not None:
+            self.samples["slot"].append(detected_at - seen_at)
+        block_time = self._block_times.get(slot)
+        if block_time is not None:
+            self.samples["block_time"].append(detected_at - block_time)
+        else:
+            if slot not in self._awaiting_block_time:
+                self._remember(self._awaiting_block_time, slot, [])
+            self._awaiting_block_time[slot].append(detected_at)
+
+    def percentiles(self, name: str) -> Tuple[float, float]:
+        """
+        p50 and p99 of a timing over its window.
+
+        Args:
+            name: One of TIMINGS
+
+        Returns:
+            Tuple[float, float]: The p50 and p99 in seconds
+        """
+        samples = sorted(self.samples[name])
+        return percentile(samples, 0.5), percentile(samples, 0.99)
+
+    def summary(self) -> str:
+        """Format the latency percentiles and the throughput since the previous summary."""
+        now = time.monotonic()
+        elapsed = max(now - self._interval_started, 1e-9)
+        delta = {name: self.counters[name] - self._interval_counters[name] for name in self.counters}
+        self._interval_started = now
+        self._interval_counters = dict(self.counters)
+
+        # Frame sizes are only known when the updates are received as raw bytes
+        throughput = f"{delta['frames'] / elapsed:.0f} msg/s"
+        if delta["bytes"]:
+            throughput += f" ({delta['bytes'] / elapsed / 1e6:.2f} MB/s)"
+        parts = [f"{throughput}, {delta['handled'] / elapsed:.0f} handled/s, {delta['detections']} detections"]
+        for name in self.TIMINGS:
+            if self.samples[name]:
+                p50, p99 = self.percentiles(name)
+                parts.append(f"{name} p50 {p50 * 1000:.2f} ms p99 {p99 * 1000:.2f} ms")
+        return "Latency: " + ", ".join(parts)
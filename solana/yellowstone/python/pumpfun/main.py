@@ -3,14 +3,26 @@ Monitor Solana transactions for new Pump.fun mints using Yellowstone gRPC.
 """
 
 import asyncio
-import base58
 import grpc
 import logging
-from typing import Iterator, Optional
+import random
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Iterator, List, Optional, Sequence
 
 import generated.geyser_pb2 as geyser_pb2
 import generated.geyser_pb2_grpc as geyser_pb2_grpc
 import generated.solana_storage_pb2 as solana_storage_pb2
+from backfill import fetch_missed_updates
+from capture import CaptureWriter
+from curves import CURVE_DATA_SLICE, CurveTracker
+from decoders import DecodedInstruction, DecoderRegistry, pump_fun_registry
+from encoding import encode_pubkey, encode_signature
+from events import MintEvent
+from filters import PUMP_FUN_ACCOUNT, PUMP_MINT_AUTHORITY, bonding_curve_filter, build_request, pump_mint_filter
+from latency import LatencyTracker
+from sinks import Sink
+from wire import peek_update_kind, protobuf_backend
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +35,7 @@ class PumpMonitor:
         stub (geyser_pb2_grpc.GeyserStub): gRPC stub for communication
     """
 
-    PUMP_FUN_ACCOUNT = '6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P'
+    PUMP_FUN_ACCOUNT = PUMP_FUN_ACCOUNT
     PUMP_INSTRUCTION_PREFIX = bytes([24, 30, 200, 40, 5, 28, 7, 119])
     COMMITMENT_LEVEL = geyser_pb2.CommitmentLevel.CONFIRMED
 
@@ -51,15 +63,13 @@ class PumpMonitor:
 
     def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
         """
-        Generate subscription requests for monitoring.
+        Generate subscription requests for monitoring. The filter only lets successful, non-vote
+        Pump.fun create transactions through, see filters.pump_mint_filter().
 
         Yields:
             geyser_pb2.SubscribeRequest: Configured subscription request
         """
-        request = geyser_pb2.SubscribeRequest()
-        request.transactions["pumpFun"].account_include.extend([self.PUMP_FUN_ACCOUNT])
-        request.commitment = self.COMMITMENT_LEVEL
-        yield request
+        yield build_request({"pumpFun": pump_mint_filter()}, self.COMMITMENT_LEVEL)
 
     def handle_update(self, update: geyser_pb2.SubscribeUpdate) -> None:
         """
@@ -69,21 +79,35 @@ class PumpMonitor:
         Args:
             update: Update message from the gRPC subscription
         """
+        for mint in self._find_mints(update):
+            self._log_mint_information(**mint)
+
+    def _find_mints(self, update: geyser_pb2.SubscribeUpdate) -> List[dict]:
+        """
+        Find the new Pump.fun mints of a transaction update.
+
+        Args:
+            update: Update message from the gRPC subscription
+
+        Returns:
+            List[dict]: The signature, slot and mint of every mint instruction of the transaction
+        """
         if not self._is_valid_pump_transaction(update):
-            return
+            return []
 
         tx_info = update.transaction.transaction
         message = tx_info.transaction.message
+        account_keys = message.account_keys
 
-        for instruction in message.instructions:
-            if instruction.data.startswith(self.PUMP_INSTRUCTION_PREFIX):
-                self._log_mint_information(
-                    signature=base58.b58encode(bytes(tx_info.signature)).decode(),
-                    slot=update.transaction.slot,
-                    mint=base58.b58encode(
-                        bytes(message.account_keys[instruction.accounts[0]])
-                    ).decode()
-                )
+        return [
+            {
+                "signature": encode_signature(tx_info.signature),
+                "slot": update.transaction.slot,
+                "mint": encode_pubkey(account_keys[instruction.accounts[0]])
+            }
+            for instruction in message.instructions
+            if instruction.data.startswith(self.PUMP_INSTRUCTION_PREFIX)
+        ]
 
     def _is_valid_pump_transaction(self, update: geyser_pb2.SubscribeUpdate) -> bool:
         """
@@ -136,14 +160,528 @@ class PumpMonitor:
         finally:
             self.channel.close()
 
+class AsyncPumpMonitor(PumpMonitor):
+    """
+    Variant of PumpMonitor built on grpc.aio. The stream is consumed with `async for`, so the event
+    loop is free while waiting for updates and several monitors can share one event loop.
+
+    Receiving and processing are separate stages: the receive loop only puts updates on a bounded
+    queue, and a pool of workers takes them off to run handle_update(). `on_mint` can therefore await
+    downstream I/O (a database, a webhook, ...) without slowing down how fast the stream is drained.
+    When the queue is full, `overflow` decides what happens:
+        - "block": the receive loop waits for room, nothing is lost but the server sees backpressure
+        - "drop_newest": the incoming update is dropped
+        - "drop_oldest": the oldest queued update is dropped to make room for the incoming one
+
+    The subscription is supervised: when the stream fails or ends, it is reopened after a jittered
+    exponential backoff, resuming from the last processed slot. Servers supporting `from_slot` replay
+    the missed updates themselves; otherwise, when `rpc_url` is set, they are backfilled over JSON-RPC.
+    Replayed updates are deduplicated by signature against the most recently seen ones.
+
+    The request stream stays open for the life of the subscription: the client pings the server every
+    `ping_interval` seconds and answers the server's pings, so load balancers do not drop idle streams,
+    and update_filters() replaces the filters of the live stream without reconnecting.
+
+    Instructions are matched by a DecoderRegistry (see decoders.py) keyed by program ID and
+    discriminator, inner instructions included, and passed to on_instruction(). The default registry
+    watches Pump.fun create instructions, which on_instruction() turns into on_mint() calls. Register
+    more instruction types on `decoders` to watch other programs on the same stream.
+
+    With `lazy_decode`, updates are received as raw bytes and transactions that cannot match are skipped
+    before being deserialized: wants_transaction() looks for the registered discriminators or programs in
+    the raw frame, which is far cheaper than building the protobuf objects of every update.
+
+    With a `latency` tracker (see latency.py), slot and block meta updates are subscribed to as well, and
+    the decode, queue and handler times of every update are recorded along with how long after their slot
+    the watched instructions are detected. Percentiles and throughput are logged with the statistics.
+
+    With a `curves` tracker (see curves.py), the bonding curve accounts of Pump.fun are subscribed to as
+    well, only the bytes of the curve state being sent, and the curve of every new mint is kept up to date
+    in memory: `curves.get(mint)` reads it without any RPC call.
+
+    Attributes:
+        channel (grpc.aio.Channel): Secure asyncio gRPC channel, created when monitoring starts
+        stub (geyser_pb2_grpc.GeyserStub): gRPC stub bound to the asyncio channel
+        stats (dict): Counters of received, processed, dropped and duplicate updates, reconnects
+            and the largest queue depth seen
+        last_slot (int): Slot of the most recent processed transaction, None before the first one
+        ping_rtts (deque): Round-trip times in seconds of the most recent pings
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+    SUPPORTS_FROM_SLOT = "from_slot" in geyser_pb2.SubscribeRequest.DESCRIPTOR.fields_by_name
+
+    def __init__(self, endpoint: str, token: str, queue_size: int = 10000, workers: int = 4,
+                 overflow: str = "drop_oldest", stats_interval: Optional[float] = 60.0,
+                 rpc_url: Optional[str] = None, max_retries: Optional[int] = None,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, dedup_size: int = 100000,
+                 ping_interval: Optional[float] = 10.0, lazy_decode: bool = True,
+                 decoders: Optional[DecoderRegistry] = None, sinks: Sequence[Sink] = (),
+                 latency: Optional[LatencyTracker] = None, capture: Optional[CaptureWriter] = None,
+                 curves: Optional[CurveTracker] = None) -> None:
+        """
+        Initializer. The channel is only created in start_monitoring(), since asyncio channels
+        belong to the event loop they are created in.
+
+        Args:
+            endpoint: gRPC service endpoint URL (your RPC endpoint with port 10000)
+            token: Authentication token for the service
+            queue_size: Maximum number of updates waiting to be processed
+            workers: Number of tasks processing updates concurrently
+            overflow: What to do when the queue is full, one of OVERFLOW_POLICIES
+            stats_interval: Seconds between queue statistics log lines, None to disable them
+            rpc_url: Solana HTTP RPC endpoint used to backfill missed transactions after a reconnect
+            max_retries: Consecutive failed connections before giving up, None to retry forever
+                and 0 to never reconnect
+            backoff_base: Seconds of the first reconnect backoff, doubled on every failed attempt
+            backoff_max: Upper bound of the reconnect backoff in seconds
+            dedup_size: Number of recent signatures remembered to drop replayed duplicates
+            ping_interval: Seconds between keepalive pings, None to only answer the server's pings
+            lazy_decode: Skip transactions rejected by wants_transaction() without deserializing them
+            decoders: Instruction types to watch, Pump.fun create instructions by default
+            sinks: Sinks the mints are published to (see sinks.py), mints are printed when there are none
+            latency: Tracker recording the timings of updates and detections, None to disable it
+            capture: Writer every received frame is recorded to (see capture.py), e.g. to replay it later
+            curves: Table of the bonding curves of new mints to keep up to date, None to not track them
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}, got {overflow!r}")
+        self.endpoint = endpoint.replace('http://', '').replace('https://', '')
+        self.token = token
+        self.channel: Optional[grpc.aio.Channel] = None
+        self.stub: Optional[geyser_pb2_grpc.GeyserStub] = None
+        self.queue_size = queue_size
+        self.workers = workers
+        self.overflow = overflow
+        self.stats_interval = stats_interval
+        self.rpc_url = rpc_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dedup_size = dedup_size
+        self.ping_interval = ping_interval
+        self.lazy_decode = lazy_decode
+        self.decoders = decoders if decoders is not None else pump_fun_registry()
+        self.sinks = list(sinks)
+        self.latency = latency
+        self.capture = capture
+        self.curves = curves
+        self.stats = {
+            "received": 0, "skipped": 0, "processed": 0, "dropped": 0, "failed": 0, "duplicates": 0,
+            "reconnects": 0, "backfilled": 0, "pings_sent": 0, "pings_answered": 0, "max_depth": 0
+        }
+        self.last_slot: Optional[int] = None
+        self.ping_rtts: deque = deque(maxlen=100)
+        self._filters: Optional[geyser_pb2.SubscribeRequest] = None
+        self._outgoing: Optional[asyncio.Queue] = None
+        self._pings_in_flight: dict = {}
+        self._next_ping_id = 1
+        self._queue: Optional[asyncio.Queue] = None
+        self._seen_signatures: OrderedDict = OrderedDict()
+        self._backfill_tasks: set = set()
+
+    def _create_secure_channel(self) -> grpc.aio.Channel:
+        """Create a secure asyncio gRPC channel with authentication credentials."""
+        auth = grpc.metadata_call_credentials(
+            lambda context, callback: callback((("x-token", self.token),), None)
+        )
+        ssl_creds = grpc.ssl_channel_credentials()
+        combined_creds = grpc.composite_channel_credentials(ssl_creds, auth)
+        return grpc.aio.secure_channel(self.endpoint, credentials=combined_creds)
+
+    def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
+        """
+        Generate subscription requests for monitoring. When latencies are tracked, every slot update
+        (all statuses) and block meta update is subscribed to as well, as references for the slots. When
+        bonding curves are tracked, so are the curve accounts, sliced to the bytes of the curve state.
+
+        Yields:
+            geyser_pb2.SubscribeRequest: Configured subscription request
+        """
+        for request in super().request_iterator():
+            if self.latency is not None:
+                request.slots["latency"].filter_by_commitment = False
+                request.blocks_meta["latency"].SetInParent()
+            if self.curves is not None:
+                request.accounts["bondingCurves"].CopyFrom(bonding_curve_filter())
+                offset, length = CURVE_DATA_SLICE
+                request.accounts_data_slice.add(offset=offset, length=length)
+            yield request
+
+    async def handle_update(self, update: geyser_pb2.SubscribeUpdate) -> None:
+        """
+        Process transaction updates from the subscription, awaiting on_instruction() for every
+        instruction matched by the decoder registry, and bonding curve account updates.
+
+        Args:
+            update: Update message from the gRPC subscription
+        """
+        kind = update.WhichOneof("update_oneof")
+        if kind == "account" and self.curves is not None:
+            self.curves.on_account(update.account)
+        if kind != "transaction":
+            return
+        for instruction in self.decoders.decode_transaction(update.transaction):
+            if self.latency is not None:
+                self.latency.record_detection(instruction.slot, time.time())
+            await self.on_instruction(instruction)
+
+    async def on_instruction(self, instruction: DecodedInstruction) -> None:
+        """
+        Called for every instruction matched by the decoder registry. Pump.fun create instructions are
+        passed on to on_mint() as MintEvents; override to handle the other registered instruction types.
+
+        Args:
+            instruction: The matched instruction
+        """
+        if instruction.name == "pump_create":
+            event = MintEvent(instruction, geyser_pb2.CommitmentLevel.Name(self.COMMITMENT_LEVEL).lower())
+            if self.curves is not None:
+                self.curves.track(event)
+            await self.on_mint(event)
+
+    async def on_mint(self, event: MintEvent) -> None:
+        """
+        Called for every new mint. Publishes it to the sinks, or logs it when there are none.
+        Publishing never waits on sink I/O, and the event's addresses are only base58 encoded when a
+        sink formats it.
+
+        Args:
+            event: The new mint
+        """
+        if not self.sinks:
+            self._log_mint_information(signature=event.signature, slot=event.slot, mint=event.mint)
+        for sink in self.sinks:
+            sink.publish(event)
+
+    def queue_depth(self) -> int:
+        """Number of updates waiting to be processed."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _is_duplicate(self, update: geyser_pb2.SubscribeUpdate) -> bool:
+        """Check whether a transaction update was already received, remembering its signature otherwise."""
+        if not update.HasField("transaction"):
+            return False
+        return self._is_duplicate_signature(update.transaction.transaction.signature)
+
+    def _is_duplicate_signature(self, signature: bytes) -> bool:
+        """Check whether a transaction signature was already seen, remembering it otherwise."""
+        if signature in self._seen_signatures:
+            return True
+        self._seen_signatures[signature] = None
+        if len(self._seen_signatures) > self.dedup_size:
+            self._seen_signatures.popitem(last=False)
+        return False
+
+    async def _enqueue(self, update: geyser_pb2.SubscribeUpdate, received_at: Optional[float] = None) -> None:
+        """
+        Put a received update on the queue, applying the overflow policy when it is full.
+
+        Args:
+            update: Update message from the gRPC subscription
+            received_at: Wall clock time the update was received, None for backfilled updates
+        """
+        self.stats["received"] += 1
+        if self._is_duplicate(update):
+            self.stats["duplicates"] += 1
+            return
+        if self.overflow == "block":
+            await self._queue.put((received_at, update))
+        else:
+            if self._queue.full():
+                self.stats["dropped"] += 1
+                if self.overflow == "drop_newest":
+                    return
+                self._queue.get_nowait()
+                self._queue.task_done()
+            self._queue.put_nowait((received_at, update))
+        self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+
+    async def _worker(self) -> None:
+        """Take updates off the queue and handle them until cancelled."""
+        while True:
+            received_at, update = await self._queue.get()
+            try:
+                if self.latency is not None and update.HasField("transaction"):
+                    started_at = time.time()
+                    started = time.perf_counter()
+                    await self.handle_update(update)
+                    self.latency.record_handled(received_at, started_at, time.perf_counter() - started)
+                else:
+                    await self.handle_update(update)
+                self.stats["processed"] += 1
+                if update.HasField("transaction"):
+                    self.last_slot = max(self.last_slot or 0, update.transaction.slot)
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Update handler failed")
+            finally:
+                self._queue.task_done()
+
+    async def _report_stats(self) -> None:
+        """Log the statistics every stats_interval seconds."""
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.log_stats()
+
+    def log_stats(self) -> None:
+        """Log the queue, sink and latency statistics."""
+        logger.info(
+            f"Queue depth {self.queue_depth()}/{self.queue_size}, received {self.stats['received']}, "
+            f"processed {self.stats['processed']}, dropped {self.stats['dropped']}, "
+            f"failed {self.stats['failed']}, duplicates {self.stats['duplicates']}, "
+            f"reconnects {self.stats['reconnects']}, max depth {self.stats['max_depth']}, "
+            f"ping rtt {self.average_ping_rtt() * 1000:.1f} ms"
+        )
+        for sink in self.sinks:
+            logger.info(sink.summary())
+        if self.latency is not None:
+            logger.info(self.latency.summary())
+
+    def average_ping_rtt(self) -> float:
+        """Average round-trip time in seconds of the most recent pings, 0 before the first pong."""
+        return sum(self.ping_rtts) / len(self.ping_rtts) if self.ping_rtts else 0.0
+
+    async def update_filters(self, request: geyser_pb2.SubscribeRequest) -> None:
+        """
+        Replace the subscription filters. The request is sent on the live stream, and used instead of
+        request_iterator() when reconnecting.
+
+        Args:
+            request: Complete subscription request (filters, commitment, ...)
+        """
+        self._filters = request
+        if self._outgoing is not None:
+            await self._outgoing.put(request)
+
+    def _send_ping(self, ping_id: int) -> None:
+        """Queue a ping request on the live stream."""
+        self._outgoing.put_nowait(geyser_pb2.SubscribeRequest(ping=geyser_pb2.SubscribeRequestPing(id=ping_id)))
+
+    async def _keepalive(self) -> None:
+        """Ping the server every ping_interval seconds, timing each ping until its pong."""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            ping_id = self._next_ping_id
+            # Ping ids are int32 and 0 is kept for the answers to server pings
+            self._next_ping_id = ping_id % (2 ** 31 - 1) + 1
+            self._pings_in_flight[ping_id] = time.monotonic()
+            self._send_ping(ping_id)
+            self.stats["pings_sent"] += 1
+
+    def _handle_control(self, kind: str, response: geyser_pb2.SubscribeUpdate) -> None:
+        """Answer server pings and record the round-trip time of our own pings."""
+        if kind == "ping":
+            self._send_ping(0)
+            self.stats["pings_answered"] += 1
+        else:
+            sent_at = self._pings_in_flight.pop(response.pong.id, None)
+            if sent_at is not None:
+                self.ping_rtts.append(time.monotonic() - sent_at)
+
+    async def _subscription_requests(self, outgoing: asyncio.Queue) -> AsyncIterator[geyser_pb2.SubscribeRequest]:
+        """
+        Long-lived request stream: the initial subscription request, resuming from the last processed
+        slot when the server supports it, then pings and filter updates as they are queued on `outgoing`,
+        until None is queued.
+        """
+        requests = list(self.request_iterator()) if self._filters is None else [self._filters]
+        for request in requests:
+            if self.last_slot is not None and self.SUPPORTS_FROM_SLOT:
+                resumed = geyser_pb2.SubscribeRequest()
+                resumed.CopyFrom(request)
+                resumed.from_slot = self.last_slot
+                request = resumed
+            yield request
+        while True:
+            request = await outgoing.get()
+            if request is None:
+                return
+            yield request
+
+    async def _backfill(self, since_slot: int) -> None:
+        """Queue the transactions missed since `since_slot`, fetched over JSON-RPC."""
+        try:
+            updates = await asyncio.to_thread(
+                fetch_missed_updates, self.rpc_url, PUMP_MINT_AUTHORITY, since_slot, "pumpFun", self.COMMITMENT_LEVEL
+            )
+        except Exception:
+            logger.exception(f"Backfill from slot {since_slot} failed")
+            return
+        for update in updates:
+            await self._enqueue(update)
+        self.stats["backfilled"] += len(updates)
+        logger.info(f"Backfilled {len(updates)} transactions from slot {since_slot}")
+
+    def wants_transaction(self, frame: bytes) -> bool:
+        """
+        Cheap check on a serialized transaction update, before it is deserialized: transactions whose
+        bytes contain none of the registered discriminators (or programs) are skipped. Override along
+        with handle_update() when looking for other transactions.
+
+        Args:
+            frame: Serialized SubscribeUpdate
+
+        Returns:
+            bool: False if the transaction can be skipped
+        """
+        return self.decoders.may_match(frame)
+
+    async def _receive_frame(self, frame: bytes, received_at: Optional[float]) -> None:
+        """Deserialize a raw update that passed wants_transaction() and pass it to _receive_update()."""
+        if self.latency is not None:
+            started = time.perf_counter()
+            update = geyser_pb2.SubscribeUpdate.FromString(frame)
+            self.latency.record_decode(time.perf_counter() - started)
+        else:
+            update = geyser_pb2.SubscribeUpdate.FromString(frame)
+        await self._receive_update(update, received_at)
+
+    async def _receive_update(self, update: geyser_pb2.SubscribeUpdate, received_at: Optional[float]) -> None:
+        """Answer the control messages of the stream and queue the other updates."""
+        kind = update.WhichOneof("update_oneof")
+        if kind == "ping" or kind == "pong":
+            self._handle_control(kind, update)
+            return
+        if self.latency is not None:
+            # Slot references are taken on reception, not when a worker gets to them
+            if kind == "slot":
+                self.latency.record_slot(update.slot.slot, received_at)
+            elif kind == "block_meta":
+                block_meta = update.block_meta
+                block_time = block_meta.block_time.timestamp if block_meta.HasField("block_time") else None
+                self.latency.record_block_meta(block_meta.slot, block_time, received_at)
+        await self._enqueue(update, received_at)
+
+    async def _subscribe(self) -> None:
+        """Open one subscription and queue its updates until the stream ends."""
+        self.channel = self._create_secure_channel()
+        self.stub = geyser_pb2_grpc.GeyserStub(self.channel)
+        self._outgoing = asyncio.Queue()
+        self._pings_in_flight.clear()
+        keepalive = asyncio.create_task(self._keepalive()) if self.ping_interval else None
+        if self.lazy_decode:
+            # Same call as GeyserStub.Subscribe, without deserializing the responses
+            subscribe = self.channel.stream_stream(
+                "/geyser.Geyser/Subscribe",
+                request_serializer=geyser_pb2.SubscribeRequest.SerializeToString,
+                response_deserializer=None
+            )
+        else:
+            subscribe = self.stub.Subscribe
+        try:
+            responses = subscribe(self._subscription_requests(self._outgoing))
+            # The subscription is opened before backfilling, so no update falls in between
+            if self.last_slot is not None and not self.SUPPORTS_FROM_SLOT and self.rpc_url:
+                task = asyncio.create_task(self._backfill(self.last_slot))
+                self._backfill_tasks.add(task)
+                task.add_done_callback(self._backfill_tasks.discard)
+            latency = self.latency
+            capture = self.capture
+            async for response in responses:
+                received_at = time.time() if latency is not None or capture is not None else None
+                if capture is not None:
+                    capture.write(received_at, response if self.lazy_decode else response.SerializeToString())
+                if self.lazy_decode:
+                    if latency is not None:
+                        latency.record_frame(len(response))
+                    # The byte search runs first, the update kind is only peeked at when it fails
+                    if not self.wants_transaction(response) and peek_update_kind(response) == "transaction":
+                        self.stats["skipped"] += 1
+                        continue
+                    await self._receive_frame(response, received_at)
+                else:
+                    if latency is not None:
+                        latency.record_frame()
+                    await self._receive_update(response, received_at)
+        finally:
+            if keepalive is not None:
+                keepalive.cancel()
+            # End the request stream so its consumer task finishes with the call
+            self._outgoing.put_nowait(None)
+            self._outgoing = None
+            await self.channel.close()
+
+    async def _supervise(self) -> None:
+        """Keep the subscription open, reconnecting with a jittered exponential backoff."""
+        attempt = 0
+        while True:
+            received = self.stats["received"]
+            error = None
+            try:
+                await self._subscribe()
+                logger.warning("Subscription stream ended")
+            except grpc.RpcError as e:
+                error = e
+                logger.error(f"gRPC error occurred: {e}")
+
+            if self.stats["received"] > received:
+                attempt = 0
+            if self.max_retries is not None and attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return
+
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            attempt += 1
+            self.stats["reconnects"] += 1
+            logger.info(f"Reconnecting in {delay:.1f}s (attempt {attempt}), resuming from slot {self.last_slot}")
+            await asyncio.sleep(delay)
+
+    async def start_monitoring(self) -> None:
+        """
+        Start monitoring for Pump.fun transactions, reconnecting whenever the stream fails. Updates still
+        queued when monitoring stops are processed before returning.
+
+        Raises:
+            grpc.RpcError: If gRPC communication fails more than max_retries times in a row
+        """
+        if protobuf_backend() != "upb":
+            logger.warning(f"protobuf uses its {protobuf_backend()} backend, install protobuf>=4.21 for the faster upb one")
+        for sink in self.sinks:
+            await sink.start()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        background = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.stats_interval:
+            background.append(asyncio.create_task(self._report_stats()))
+
+        try:
+            await self._supervise()
+            if self._backfill_tasks:
+                await asyncio.gather(*self._backfill_tasks)
+            await self._queue.join()
+        finally:
+            for task in [*background, *self._backfill_tasks]:
+                task.cancel()
+            await asyncio.gather(*background, *self._backfill_tasks, return_exceptions=True)
+            for sink in self.sinks:
+                await sink.close()
+
+async def run_monitors(*monitors: AsyncPumpMonitor) -> None:
+    """
+    Run several monitors on the current event loop, e.g. one per endpoint or per filter.
+    If one of them fails, the others are cancelled.
+
+    Args:
+        monitors: Monitors to run
+    """
+    tasks = [asyncio.create_task(monitor.start_monitoring()) for monitor in monitors]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 def main():
     logging.basicConfig(level=logging.INFO)
-    monitor = PumpMonitor(
+    monitor = AsyncPumpMonitor(
         "https://REPLACE_ME.solana-mainnet.quiknode.pro:10000",
-        "REPALCE_ME_1234567890"
+        "REPALCE_ME_1234567890",
+        rpc_url="https://REPLACE_ME.solana-mainnet.quiknode.pro/REPALCE_ME_1234567890/"
     )
     try:
-        asyncio.run(monitor.start_monitoring())
+        asyncio.run(run_monitors(monitor))
     except KeyboardInterrupt:
         print("\nShutting down...")
 
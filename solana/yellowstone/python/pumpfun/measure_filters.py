@@ -0,0 +1,61 @@
+"""
+Subscribe with every candidate Pump.fun filter at once and report the messages and bytes each of them
+delivers, to see how much traffic a tighter filter keeps on the server.
+
+Usage: python measure_filters.py https://example-guide-demo.solana-mainnet.quiknode.pro:10000 123456789 --seconds 60
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Iterator
+
+import generated.geyser_pb2 as geyser_pb2
+from filters import PUMP_FILTER_CANDIDATES, FilterStats, build_request
+from main import AsyncPumpMonitor
+
+class FilterMeasurement(AsyncPumpMonitor):
+    """
+    Monitor subscribing with all the filters of PUMP_FILTER_CANDIDATES and recording their traffic.
+
+    Attributes:
+        filter_stats (FilterStats): Messages, bytes and mints per filter
+    """
+
+    def __init__(self, endpoint: str, token: str) -> None:
+        super().__init__(endpoint, token, overflow="block", stats_interval=None, max_retries=0,
+                         lazy_decode=False)
+        self.filter_stats = FilterStats()
+
+    def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
+        yield build_request({name: make() for name, make in PUMP_FILTER_CANDIDATES.items()}, self.COMMITMENT_LEVEL)
+
+    async def handle_update(self, update: geyser_pb2.SubscribeUpdate) -> None:
+        matched = update.HasField("transaction") and any(
+            instruction.data.startswith(self.PUMP_INSTRUCTION_PREFIX)
+            for instruction in update.transaction.transaction.transaction.message.instructions
+        )
+        self.filter_stats.record(update, matched)
+
+async def measure(endpoint: str, token: str, seconds: float) -> FilterStats:
+    monitor = FilterMeasurement(endpoint, token)
+    try:
+        await asyncio.wait_for(monitor.start_monitoring(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return monitor.filter_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the traffic of the candidate Pump.fun filters.")
+    parser.add_argument("endpoint", help="gRPC endpoint URL with port 10000")
+    parser.add_argument("token", help="authentication token")
+    parser.add_argument("--seconds", type=float, default=60, help="how long to measure")
+    parser.add_argument("--baseline", default="program", help="filter the others are compared to")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(measure(args.endpoint, args.token, args.seconds))
+    print(stats.summary(args.baseline))
+
+if __name__ == "__main__":
+    main()
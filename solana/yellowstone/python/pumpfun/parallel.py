@@ -0,0 +1,265 @@
+"""
+Fan the decoding and matching of transaction and block updates out to worker processes, so the monitor
+is not bound to the one core the GIL allows for firehose subscriptions (all transactions, blocks, ...).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import generated.geyser_pb2 as geyser_pb2
+from decoders import DecodedInstruction, DecoderRegistry
+from main import AsyncPumpMonitor
+from wire import peek_signature, peek_slot, peek_update_kind
+
+logger = logging.getLogger(__name__)
+
+# Registry of the worker process, set by _init_worker()
+_registry: Optional[DecoderRegistry] = None
+
+class _BlockTransaction(NamedTuple):
+    """Transaction of a block, shaped like the SubscribeUpdateTransaction DecoderRegistry expects."""
+    transaction: geyser_pb2.SubscribeUpdateTransactionInfo
+    slot: int
+
+def _init_worker(registry: DecoderRegistry) -> None:
+    global _registry
+    _registry = registry
+
+def match_frames(frames: List[bytes]) -> List[Tuple[int, List[DecodedInstruction]]]:
+    """
+    Decode serialized transaction or block updates and match their instructions against the worker's
+    registry. Runs in the worker processes.
+
+    Args:
+        frames: Serialized SubscribeUpdates
+
+    Returns:
+        List[Tuple[int, List[DecodedInstruction]]]: Slot and matched instructions of each frame
+    """
+    results = []
+    for frame in frames:
+        update = geyser_pb2.SubscribeUpdate.FromString(frame)
+        if update.HasField("block"):
+            block = update.block
+            instructions = []
+            if _registry.may_match(frame):
+                for transaction in block.transactions:
+                    instructions.extend(_registry.decode_transaction(_BlockTransaction(transaction, block.slot)))
+            results.append((block.slot, instructions))
+        else:
+            results.append((update.transaction.slot, _registry.decode_transaction(update.transaction)))
+    return results
+
+class ParallelPumpMonitor(AsyncPumpMonitor):
+    """
+    AsyncPumpMonitor decoding transaction and block updates in worker processes. The receive loop only
+    peeks at the raw frames: transactions are deduplicated by signature and sharded by signature (or slot),
+    blocks by slot, and the raw bytes are sent to the shard's process in batches. Workers deserialize the
+    frames and match them against the decoder registry in parallel, and only the matched instructions come
+    back to on_instruction() in the event loop. Other updates are handled in the event loop as usual.
+
+    Each shard is one worker process, so the frames of a shard are matched in the order they were received.
+    With `ordered`, the matches of all shards are merged back into the order the frames were received in,
+    i.e. the slot order of the stream; otherwise they are handled as soon as their batch is done.
+
+    The registry is sent to the workers once, when they start, so its decode functions must be picklable
+    (module-level functions, not lambdas). A worker that dies is restarted on the next batch of its shard;
+    the frames it was matching are counted as failed.
+
+    Attributes:
+        processes (int): Number of worker processes (shards)
+    """
+
+    SHARD_KEYS = ("signature", "slot")
+
+    def __init__(self, endpoint: str, token: str, processes: Optional[int] = None, shard_by: str = "signature",
+                 ordered: bool = True, batch_size: int = 64, batch_delay: float = 0.005, max_batches: int = 64,
+                 **kwargs) -> None:
+        """
+        Initializer.
+
+        Args:
+            endpoint: gRPC service endpoint URL (your RPC endpoint with port 10000)
+            token: Authentication token for the service
+            processes: Number of worker processes, the number of CPUs by default
+            shard_by: Key transactions are sharded by, one of SHARD_KEYS; blocks are always sharded by slot
+            ordered: Handle the matches in the order the frames were received
+            batch_size: Frames sent to a worker at once
+            batch_delay: Seconds a partial batch waits for more frames before being sent
+            max_batches: Batches in flight before the receive loop waits, bounding the memory used
+            **kwargs: AsyncPumpMonitor options, lazy_decode is always on
+        """
+        if shard_by not in self.SHARD_KEYS:
+            raise ValueError(f"shard_by must be one of {self.SHARD_KEYS}, got {shard_by!r}")
+        kwargs["lazy_decode"] = True
+        super().__init__(endpoint, token, **kwargs)
+        self.processes = processes or os.cpu_count() or 1
+        self.shard_by = shard_by
+        self.ordered = ordered
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_batches = max_batches
+        self.stats.update({"batches": 0, "offloaded": 0, "restarts": 0})
+        self._executors: List[ProcessPoolExecutor] = []
+        self._batches: List[List[Tuple[int, bytes]]] = [[] for _ in range(self.processes)]
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._results: Dict[int, Any] = {}
+        self._results_ready: Optional[asyncio.Event] = None
+        self._next_sequence = 0
+        self._handled_sequences = 0
+        self._next_to_handle = 0
+
+    def _start_worker(self) -> ProcessPoolExecutor:
+        # Workers are spawned rather than forked, gRPC does not support forking a process with live channels
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+            initargs=(self.decoders,)
+        )
+
+    def _shard(self, kind: str, frame: bytes, signature: Optional[bytes]) -> int:
+        if kind == "transaction" and self.shard_by == "signature":
+            return hash(signature) % self.processes
+        return (peek_slot(frame) or 0) % self.processes
+
+    async def _receive_frame(self, frame: bytes, received_at: Optional[float]) -> None:
+        """Batch transaction and block frames for the workers, handle the other updates in the event loop."""
+        kind = peek_update_kind(frame)
+        if kind != "transaction" and kind != "block":
+            await super()._receive_frame(frame, received_at)
+            return
+        self.stats["received"] += 1
+        signature = None
+        if kind == "transaction":
+            signature = peek_signature(frame)
+            if self._is_duplicate_signature(signature):
+                self.stats["duplicates"] += 1
+                return
+        shard = self._shard(kind, frame, signature)
+        batch = self._batches[shard]
+        batch.append((self._next_sequence, frame))
+        self._next_sequence += 1
+        if len(batch) >= self.batch_size:
+            await self._submit(shard)
+
+    async def _submit(self, shard: int) -> None:
+        """Send the pending batch of a shard to its worker."""
+        batch = self._batches[shard]
+        if not batch:
+            return
+        self._batches[shard] = []
+        await self._batch_slots.acquire()
+        self.stats["batches"] += 1
+        self.stats["offloaded"] += len(batch)
+        frames = [frame for _, frame in batch]
+        try:
+            future = self._executors[shard].submit(match_frames, frames)
+        except BrokenProcessPool:
+            # The worker of the shard died (killed, out of memory, ...), replace it and send the batch again
+            logger.warning(f"Worker of shard {shard} died, restarting it")
+            self._executors[shard].shutdown(wait=False)
+            self._executors[shard] = self._start_worker()
+            self.stats["restarts"] += 1
+            try:
+                future = self._executors[shard].submit(match_frames, frames)
+            except Exception as e:
+                # Still goes through _collect(), which releases the batch slot and fails the frames
+                future = Future()
+                future.set_exception(e)
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._collect, batch, done))
+
+    def _collect(self, batch: List[Tuple[int, bytes]], done: Future) -> None:
+        """
+        Store the results of a batch by sequence number, None for each frame of a failed or cancelled batch,
+        so the ordered merge does not wait for them.
+        """
+        self._batch_slots.release()
+        try:
+            results = done.result()
+        except BaseException:
+            if not done.cancelled():
+                logger.exception(f"Worker failed to match a batch of {len(batch)} frames")
+            self.stats["failed"] += len(batch)
+            results = [None] * len(batch)
+        for (sequence, _), result in zip(batch, results):
+            self._results[sequence] = result
+        self._results_ready.set()
+
+    async def _flush_batches(self) -> None:
+        """Send the partial batches every batch_delay seconds."""
+        while True:
+            await asyncio.sleep(self.batch_delay)
+            for shard in range(self.processes):
+                await self._submit(shard)
+
+    async def _handle_result(self, result: Optional[Tuple[int, List[DecodedInstruction]]]) -> None:
+        self._handled_sequences += 1
+        if result is None:
+            return
+        slot, instructions = result
+        try:
+            for instruction in instructions:
+                if self.latency is not None:
+                    self.latency.record_detection(instruction.slot, time.time())
+                await self.on_instruction(instruction)
+            self.stats["processed"] += 1
+            self.last_slot = max(self.last_slot or 0, slot)
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Instruction handler failed")
+
+    async def _handle_results(self) -> None:
+        """Hand the matched instructions to on_instruction(), in receive order when `ordered`."""
+        while True:
+            await self._results_ready.wait()
+            self._results_ready.clear()
+            if self.ordered:
+                while self._next_to_handle in self._results:
+                    result = self._results.pop(self._next_to_handle)
+                    self._next_to_handle += 1
+                    await self._handle_result(result)
+            else:
+                results, self._results = self._results, {}
+                for result in results.values():
+                    await self._handle_result(result)
+
+    async def _supervise(self) -> None:
+        """Run the subscription, then wait for the frames still in the workers to be handled."""
+        await super()._supervise()
+        for shard in range(self.processes):
+            await self._submit(shard)
+        while self._handled_sequences < self._next_sequence:
+            await asyncio.sleep(self.batch_delay)
+
+    def log_stats(self) -> None:
+        super().log_stats()
+        logger.info(
+            f"Workers: {self.stats['offloaded']} frames in {self.stats['batches']} batches over {self.processes} "
+            f"processes ({self.stats['restarts']} restarts), {self._next_sequence - self._handled_sequences} in flight"
+        )
+
+    async def start_monitoring(self) -> None:
+        """
+        Start the worker processes, then monitor as AsyncPumpMonitor does.
+
+        Raises:
+            grpc.RpcError: If gRPC communication fails more than max_retries times in a row
+        """
+        self._executors = [self._start_worker() for _ in range(self.processes)]
+        self._batch_slots = asyncio.Semaphore(self.max_batches)
+        self._results_ready = asyncio.Event()
+        background = [asyncio.create_task(self._flush_batches()), asyncio.create_task(self._handle_results())]
+        try:
+            await super().start_monitoring()
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            for executor in self._executors:
+                executor.shutdown(cancel_futures=True)
@@ -0,0 +1,206 @@
+"""
+Subscribe to several Yellowstone endpoints at once and act on whichever copy of each update arrives first.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import grpc
+
+import generated.geyser_pb2 as geyser_pb2
+from latency import percentile
+from main import AsyncPumpMonitor
+
+logger = logging.getLogger(__name__)
+
+def race_key(update: geyser_pb2.SubscribeUpdate) -> Optional[tuple]:
+    """
+    Identity of an update across endpoints: the signature of transactions, the pubkey, slot and write
+    version of account updates, the slot and status of slot updates, the slot of block meta updates.
+    None for the other updates, which are not deduplicated.
+    """
+    kind = update.WhichOneof("update_oneof")
+    if kind == "transaction":
+        return (kind, update.transaction.transaction.signature)
+    if kind == "account":
+        account = update.account.account
+        return (kind, account.pubkey, update.account.slot, account.write_version)
+    if kind == "slot":
+        return (kind, update.slot.slot, update.slot.status)
+    if kind == "block_meta":
+        return (kind, update.block_meta.slot)
+    return None
+
+class EndpointFeed(AsyncPumpMonitor):
+    """
+    Subscription to one endpoint of a RacingPumpMonitor. It reconnects and keeps its stream alive on its
+    own, but hands its updates to the racing monitor instead of queueing them. It resumes from the last
+    slot processed by the racing monitor, whichever endpoint delivered it.
+    """
+
+    def __init__(self, racer: "RacingPumpMonitor", endpoint: str, token: str, **kwargs) -> None:
+        # Set first, the initializer already goes through the last_slot property
+        self.racer = racer
+        super().__init__(endpoint, token, **kwargs)
+
+    @property
+    def last_slot(self) -> Optional[int]:
+        return self.racer.last_slot
+
+    @last_slot.setter
+    def last_slot(self, slot: Optional[int]) -> None:
+        self.racer.last_slot = slot
+
+    def _create_secure_channel(self) -> grpc.aio.Channel:
+        # Channels are created the way the racing monitor creates them, so overriding it there covers every feed
+        return type(self.racer)._create_secure_channel(self)
+
+    def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
+        return self.racer.request_iterator()
+
+    async def _enqueue(self, update: geyser_pb2.SubscribeUpdate, received_at: Optional[float] = None) -> None:
+        self.stats["received"] += 1
+        await self.racer._race(self, update, received_at)
+
+class RacingPumpMonitor(AsyncPumpMonitor):
+    """
+    AsyncPumpMonitor subscribed to several endpoints with the same filters. The streams are merged and
+    deduplicated: the first copy of each update is queued for processing, the copies arriving later from
+    the other endpoints are dropped. Updates are remembered for `window` seconds, so the set of seen
+    updates stays bounded whatever the stream rate.
+
+    For every endpoint, the updates it delivered first (wins) and how far behind the fastest copy each of
+    its updates arrived are recorded, to rank the endpoints by latency. Each endpoint is supervised on its
+    own, so a failing endpoint does not interrupt the others; monitoring only stops once they have all
+    given up.
+    An endpoint reconnecting resumes from the last slot processed from any of them (with `from_slot`,
+    or backfilled over `rpc_url`).
+
+    Attributes:
+        feeds (List[EndpointFeed]): Subscriptions to the endpoints
+        endpoint_stats (dict): Per endpoint, the updates received and won, and the recent delays behind
+            the fastest copy (0 for wins), in seconds
+    """
+
+    def __init__(self, endpoints: Sequence[Tuple[str, str]], window: float = 30.0, **kwargs) -> None:
+        """
+        Initializer.
+
+        Args:
+            endpoints: gRPC endpoint URL and authentication token of each endpoint
+            window: Seconds an update is remembered to drop its copies from the other endpoints
+            **kwargs: AsyncPumpMonitor options; the connection ones (rpc_url, max_retries, backoff_base,
+                backoff_max, ping_interval, lazy_decode) apply to every endpoint
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        super().__init__(*endpoints[0], **kwargs)
+        self.window = window
+        feed_options = {
+            name: kwargs[name]
+            for name in ("rpc_url", "max_retries", "backoff_base", "backoff_max", "ping_interval", "lazy_decode")
+            if name in kwargs
+        }
+        self.feeds: List[EndpointFeed] = [
+            EndpointFeed(self, endpoint, token, decoders=self.decoders, latency=self.latency,
+                         stats_interval=None, **feed_options)
+            for endpoint, token in endpoints
+        ]
+        self.endpoint_stats: Dict[str, dict] = {
+            feed.endpoint: {"received": 0, "wins": 0, "delays": deque(maxlen=10000)} for feed in self.feeds
+        }
+        self._first_seen: OrderedDict = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        """Forget the updates first seen more than `window` seconds ago."""
+        first_seen = self._first_seen
+        while first_seen:
+            _, seen_at = first_seen[next(iter(first_seen))]
+            if now - seen_at <= self.window and len(first_seen) <= self.dedup_size:
+                break
+            first_seen.popitem(last=False)
+
+    async def _race(self, feed: EndpointFeed, update: geyser_pb2.SubscribeUpdate, received_at: Optional[float]) -> None:
+        """Queue the first copy of an update, recording which endpoint delivered it and how late the others were."""
+        now = time.monotonic()
+        stats = self.endpoint_stats[feed.endpoint]
+        stats["received"] += 1
+        key = race_key(update)
+        if key is not None:
+            self._expire(now)
+            first = self._first_seen.get(key)
+            if first is not None:
+                stats["delays"].append(now - first[1])
+                self.stats["duplicates"] += 1
+                return
+            self._first_seen[key] = (feed.endpoint, now)
+            stats["wins"] += 1
+            stats["delays"].append(0.0)
+        await self._enqueue(update, received_at)
+
+    def first_endpoint(self, signature: bytes) -> Optional[str]:
+        """
+        Endpoint that delivered a transaction first, e.g. to tag events in on_mint().
+
+        Args:
+            signature: Raw transaction signature
+
+        Returns:
+            Optional[str]: The endpoint, None once the transaction has left the window
+        """
+        first = self._first_seen.get(("transaction", signature))
+        return first[0] if first is not None else None
+
+    def endpoint_ranking(self) -> List[dict]:
+        """
+        Rank the endpoints from fastest to slowest by their average delay behind the fastest copy.
+
+        Returns:
+            List[dict]: Endpoint, updates received and won, share of wins, p50/p99 and average delay
+        """
+        total_wins = sum(stats["wins"] for stats in self.endpoint_stats.values()) or 1
+        ranking = []
+        for endpoint, stats in self.endpoint_stats.items():
+            delays = sorted(stats["delays"])
+            ranking.append({
+                "endpoint": endpoint,
+                "received": stats["received"],
+                "wins": stats["wins"],
+                "win_share": stats["wins"] / total_wins,
+                "p50_delay": percentile(delays, 0.5),
+                "p99_delay": percentile(delays, 0.99),
+                "average_delay": sum(delays) / len(delays) if delays else float("inf"),
+            })
+        return sorted(ranking, key=lambda entry: entry["average_delay"])
+
+    def log_stats(self) -> None:
+        self.stats["reconnects"] = sum(feed.stats["reconnects"] for feed in self.feeds)
+        self.stats["backfilled"] = sum(feed.stats["backfilled"] for feed in self.feeds)
+        super().log_stats()
+        for rank, entry in enumerate(self.endpoint_ranking(), 1):
+            logger.info(
+                f"#{rank} {entry['endpoint']}: {entry['wins']}/{entry['received']} first ({entry['win_share']:.0%} of wins), "
+                f"behind fastest p50 {entry['p50_delay'] * 1000:.1f} ms p99 {entry['p99_delay'] * 1000:.1f} ms"
+            )
+
+    async def update_filters(self, request: geyser_pb2.SubscribeRequest) -> None:
+        """
+        Replace the subscription filters on every endpoint.
+
+        Args:
+            request: Complete subscription request (filters, commitment, ...)
+        """
+        self._filters = request
+        for feed in self.feeds:
+            await feed.update_filters(request)
+
+    async def _supervise(self) -> None:
+        """Run the subscriptions to every endpoint until they have all given up."""
+        results = await asyncio.gather(*(feed._supervise() for feed in self.feeds), return_exceptions=True)
+        self.stats["reconnects"] = sum(feed.stats["reconnects"] for feed in self.feeds)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if len(errors) == len(self.feeds):
+            raise errors[0]
@@ -0,0 +1,74 @@
+"""
+Record a Yellowstone stream to a capture file (see capture.py), to replay it later with replay.py or
+benchmark the decoding on it with benchmark_decoding.py. Every received frame is written as is, before
+the monitor filters it.
+
+Usage: python record.py https://example-guide-demo.solana-mainnet.quiknode.pro:10000 123456789 --seconds 60 --output stream.yscap
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Iterator, Optional
+
+import generated.geyser_pb2 as geyser_pb2
+from capture import CaptureWriter
+from filters import PUMP_FILTER_CANDIDATES, build_request
+from main import AsyncPumpMonitor
+
+class StreamRecorder(AsyncPumpMonitor):
+    """
+    Monitor recording its stream to a capture file without handling the updates.
+
+    Attributes:
+        capture (CaptureWriter): The capture being written
+    """
+
+    def __init__(self, endpoint: str, token: str, capture: CaptureWriter, filter_name: Optional[str] = None) -> None:
+        """
+        Initializer.
+
+        Args:
+            endpoint: gRPC service endpoint URL (your RPC endpoint with port 10000)
+            token: Authentication token for the service
+            capture: Writer the frames are recorded to
+            filter_name: Filter of PUMP_FILTER_CANDIDATES to subscribe with, the monitor's filter by default
+        """
+        super().__init__(endpoint, token, stats_interval=None, max_retries=0, capture=capture)
+        self.filter_name = filter_name
+
+    def request_iterator(self) -> Iterator[geyser_pb2.SubscribeRequest]:
+        if self.filter_name is None:
+            yield from super().request_iterator()
+        else:
+            yield build_request({self.filter_name: PUMP_FILTER_CANDIDATES[self.filter_name]()}, self.COMMITMENT_LEVEL)
+
+    def wants_transaction(self, frame: bytes) -> bool:
+        # Frames are recorded before this check, none of them needs decoding afterwards
+        return False
+
+async def record(endpoint: str, token: str, output: str, seconds: float, filter_name: Optional[str]) -> CaptureWriter:
+    with CaptureWriter(output) as capture:
+        recorder = StreamRecorder(endpoint, token, capture, filter_name)
+        try:
+            await asyncio.wait_for(recorder.start_monitoring(), seconds)
+        except asyncio.TimeoutError:
+            pass
+    return capture
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a Yellowstone stream to a capture file.")
+    parser.add_argument("endpoint", help="gRPC endpoint URL with port 10000")
+    parser.add_argument("token", help="authentication token")
+    parser.add_argument("--output", default="stream.yscap", help="capture file to write")
+    parser.add_argument("--seconds", type=float, default=60, help="how long to record")
+    parser.add_argument("--filter", choices=sorted(PUMP_FILTER_CANDIDATES), help="filter to subscribe with, "
+                        "the monitor's filter by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    capture = asyncio.run(record(args.endpoint, args.token, args.output, args.seconds, args.filter))
+    print(f"Recorded {capture.frames} frames ({capture.bytes / 1e6:.1f} MB) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Local Geyser server replaying a capture file (see capture.py), so the monitor can be run, benchmarked and
+regression-tested without a live endpoint. The capture is replayed at its original pace, N times faster,
+or as fast as possible, to every subscriber regardless of its filters.
+
+Usage: python replay.py stream.yscap --port 10000 --speed 1
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import AsyncIterator, List, Tuple
+
+import grpc
+
+import generated.geyser_pb2 as geyser_pb2
+import generated.geyser_pb2_grpc as geyser_pb2_grpc
+from capture import read_capture
+from main import AsyncPumpMonitor
+from wire import peek_update_kind
+
+logger = logging.getLogger(__name__)
+
+class ReplayServicer(geyser_pb2_grpc.GeyserServicer):
+    """
+    Geyser service whose Subscribe streams the frames of a capture. The frames are parsed once when the
+    capture is loaded, and the pings and pongs of the recorded connection are left out; the server answers
+    the pings of its own subscribers instead.
+
+    Attributes:
+        frames (list): Receive time and update of each replayed frame
+        speed (float): Replay speed relative to the capture, 0 to replay as fast as possible
+        stats (dict): Subscriptions served and frames sent
+    """
+
+    def __init__(self, frames: List[Tuple[float, geyser_pb2.SubscribeUpdate]], speed: float = 1.0) -> None:
+        self.frames = frames
+        self.speed = speed
+        self.stats = {"subscriptions": 0, "frames": 0}
+
+    @classmethod
+    def from_capture(cls, file_path: str, speed: float = 1.0) -> "ReplayServicer":
+        """
+        Load a capture file.
+
+        Args:
+            file_path: Path of the capture
+            speed: Replay speed relative to the capture, 0 to replay as fast as possible
+
+        Returns:
+            ReplayServicer: The servicer
+        """
+        frames = [
+            (received_at, geyser_pb2.SubscribeUpdate.FromString(frame))
+            for received_at, frame in read_capture(file_path)
+            if peek_update_kind(frame) not in ("ping", "pong")
+        ]
+        return cls(frames, speed)
+
+    async def _answer_pings(self, request_iterator: AsyncIterator[geyser_pb2.SubscribeRequest], pongs: asyncio.Queue) -> None:
+        async for request in request_iterator:
+            if request.HasField("ping"):
+                pongs.put_nowait(geyser_pb2.SubscribeUpdate(pong=geyser_pb2.SubscribeUpdatePong(id=request.ping.id)))
+
+    async def Subscribe(self, request_iterator, context):
+        self.stats["subscriptions"] += 1
+        pongs: asyncio.Queue = asyncio.Queue()
+        # The subscription request and the later ones (pings, filter updates) are read in the background
+        reader = asyncio.create_task(self._answer_pings(request_iterator, pongs))
+        loop = asyncio.get_running_loop()
+        try:
+            if not self.frames:
+                return
+            first_time = self.frames[0][0]
+            started = loop.time()
+            for received_at, update in self.frames:
+                if self.speed:
+                    delay = started + (received_at - first_time) / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                while not pongs.empty():
+                    yield pongs.get_nowait()
+                yield update
+                self.stats["frames"] += 1
+        finally:
+            reader.cancel()
+
+async def start_replay_server(servicer: ReplayServicer, address: str = "127.0.0.1:0") -> Tuple[grpc.aio.Server, int]:
+    """
+    Start a local insecure gRPC server for a replay servicer.
+
+    Args:
+        servicer: The servicer
+        address: Address to listen on, port 0 picks a free port
+
+    Returns:
+        Tuple[grpc.aio.Server, int]: The started server and its port
+    """
+    server = grpc.aio.server()
+    geyser_pb2_grpc.add_GeyserServicer_to_server(servicer, server)
+    port = server.add_insecure_port(address)
+    await server.start()
+    return server, port
+
+class ReplayPumpMonitor(AsyncPumpMonitor):
+    """AsyncPumpMonitor connecting to a local replay server over an insecure channel."""
+
+    def _create_secure_channel(self) -> grpc.aio.Channel:
+        return grpc.aio.insecure_channel(self.endpoint)
+
+async def serve(file_path: str, port: int, speed: float) -> None:
+    servicer = ReplayServicer.from_capture(file_path, speed)
+    server, port = await start_replay_server(servicer, f"127.0.0.1:{port}")
+    logger.info(f"Replaying {len(servicer.frames)} frames of {file_path} on 127.0.0.1:{port}")
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a capture file as a local Yellowstone endpoint.")
+    parser.add_argument("capture", help="capture file to replay")
+    parser.add_argument("--port", type=int, default=10000, help="port to listen on")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 for as fast as possible")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.capture, args.port, args.speed))
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+
+if __name__ == "__main__":
+    main()
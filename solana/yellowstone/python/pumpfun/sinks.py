@@ -0,0 +1,241 @@
+"""
+Non-blocking sinks for the events of the monitor. publish() only appends the event to an in-memory
+buffer; a background task writes the buffer out in batches, off the event loop for file and database
+sinks, so the receive loop never waits on sink I/O.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def to_serializable(event: Any) -> dict:
+    """Format an event as a dict, using its to_dict() method when it has one."""
+    return event.to_dict() if hasattr(event, "to_dict") else event
+
+class Sink:
+    """
+    Base class of the sinks. Events are buffered by publish() and written by batches of up to
+    `batch_size` events, as soon as a batch is full or every `flush_interval` seconds. When more
+    than `max_pending` events are waiting, new ones are dropped rather than growing without bound.
+
+    Attributes:
+        stats (dict): Published, written and dropped events, batches, failed writes and the
+            publish-to-write lag (last and maximum, in seconds)
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_pending: int = 100000) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.stats = {
+            "published": 0, "written": 0, "dropped": 0, "batches": 0, "failed": 0,
+            "last_lag": 0.0, "max_lag": 0.0, "write_seconds": 0.0
+        }
+        self._pending: deque = deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._started_at = time.monotonic()
+
+    def publish(self, event: Any) -> None:
+        """
+        Queue an event to be written. Never blocks.
+
+        Args:
+            event: Event to write, formatted with its to_dict() method when it has one
+        """
+        if len(self._pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self._pending.append((time.monotonic(), event))
+        self.stats["published"] += 1
+        if len(self._pending) >= self.batch_size and self._batch_ready is not None:
+            self._batch_ready.set()
+
+    async def start(self) -> None:
+        """Open the sink and start writing in the background."""
+        self._batch_ready = asyncio.Event()
+        self._closing = False
+        self._started_at = time.monotonic()
+        await self._open()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Write the remaining events and close the sink."""
+        if self._task is not None:
+            # Let the background task finish its current batch instead of cancelling it mid-write
+            self._closing = True
+            self._batch_ready.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._pending:
+            await self._flush()
+        await self._close()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            while self._pending:
+                await self._flush()
+                if len(self._pending) < self.batch_size:
+                    break
+
+    async def _flush(self) -> None:
+        """Write one batch of pending events."""
+        batch: List[Tuple[float, Any]] = [
+            self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))
+        ]
+        started = time.monotonic()
+        try:
+            await self._write([event for _, event in batch])
+        except Exception:
+            self.stats["failed"] += len(batch)
+            logger.exception(f"{type(self).__name__} failed to write {len(batch)} events")
+            return
+        finished = time.monotonic()
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["write_seconds"] += finished - started
+        self.stats["last_lag"] = finished - batch[0][0]
+        self.stats["max_lag"] = max(self.stats["max_lag"], self.stats["last_lag"])
+
+    def throughput(self) -> float:
+        """Events written per second since the sink started."""
+        return self.stats["written"] / max(time.monotonic() - self._started_at, 1e-9)
+
+    def summary(self) -> str:
+        return (
+            f"{type(self).__name__}: {self.stats['written']} written ({self.throughput():.0f}/s), "
+            f"{len(self._pending)} pending, {self.stats['dropped']} dropped, {self.stats['failed']} failed, "
+            f"lag {self.stats['last_lag'] * 1000:.1f} ms (max {self.stats['max_lag'] * 1000:.1f} ms)"
+        )
+
+    async def _open(self) -> None:
+        pass
+
+    async def _write(self, events: List[Any]) -> None:
+        raise NotImplementedError
+
+    async def _close(self) -> None:
+        pass
+
+class JsonLinesSink(Sink):
+    """Appends events to a JSON Lines file, one flush per batch."""
+
+    def __init__(self, file_path: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.file_path = file_path
+        self.file = None
+
+    async def _open(self) -> None:
+        self.file = open(self.file_path, "a", buffering=1024 * 1024)
+
+    def _write_lines(self, events: List[Any]) -> None:
+        self.file.write("".join(json.dumps(to_serializable(event)) + "\n" for event in events))
+        self.file.flush()
+
+    async def _write(self, events: List[Any]) -> None:
+        await asyncio.to_thread(self._write_lines, events)
+
+    async def _close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+class SqliteSink(Sink):
+    """
+    Inserts events into a SQLite table, one transaction per batch. Each row holds the signature, slot,
+    mint and status (the commitment level of the mint) of the event, with the whole event as JSON; events
+    already stored are ignored. Status changes (records with a "status", see confirmation.StatusChange)
+    update the status of the row of their mint instead.
+    """
+
+    def __init__(self, file_path: str, table: str = "mints", **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.file_path = file_path
+        self.table = table
+        self.connection: Optional[sqlite3.Connection] = None
+
+    async def _open(self) -> None:
+        # The connection is only ever used by one write at a time, from the threads of asyncio.to_thread
+        self.connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "signature TEXT PRIMARY KEY, slot INTEGER NOT NULL, mint TEXT, status TEXT, data TEXT NOT NULL)"
+        )
+        # Tables created before the status column was added
+        columns = [row[1] for row in self.connection.execute(f"PRAGMA table_info({self.table})")]
+        if "status" not in columns:
+            self.connection.execute(f"ALTER TABLE {self.table} ADD COLUMN status TEXT")
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_slot ON {self.table} (slot)")
+
+    def _insert(self, events: List[Any]) -> None:
+        rows = []
+        changes = []
+        for event in events:
+            record = to_serializable(event)
+            status = record.get("status", record.get("commitment"))
+            row = (record["signature"], record["slot"], record.get("mint"), status, json.dumps(record))
+            (changes if "status" in record else rows).append(row)
+        with self.connection:
+            # A status change is always published after its mint, so the mints of the batch go in first
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (signature, slot, mint, status, data) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                f"INSERT INTO {self.table} (signature, slot, mint, status, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(signature) DO UPDATE SET status = excluded.status", changes
+            )
+
+    async def _write(self, events: List[Any]) -> None:
+        await asyncio.to_thread(self._insert, events)
+
+    async def _close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+
+class SocketSink(Sink):
+    """
+    Publishes events as JSON lines to a local TCP ("host:port") or Unix socket (a path) consumer,
+    reconnecting on the next batch when the connection drops. Batches written while no consumer is
+    connected are counted as failed.
+    """
+
+    def __init__(self, address: str, **kwargs) -> None:
+        kwargs.setdefault("flush_interval", 0.05)
+        super().__init__(**kwargs)
+        self.address = address
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> None:
+        host, separator, port = self.address.rpartition(":")
+        if separator and port.isdigit():
+            _, self.writer = await asyncio.open_connection(host, int(port))
+        else:
+            _, self.writer = await asyncio.open_unix_connection(self.address)
+
+    async def _write(self, events: List[Any]) -> None:
+        if self.writer is None or self.writer.is_closing():
+            await self._connect()
+        self.writer.write("".join(json.dumps(to_serializable(event)) + "\n" for event in events).encode())
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.writer = None
+            raise
+
+    async def _close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            await asyncio.gather(self.writer.wait_closed(), return_exceptions=True)
@@ -0,0 +1,154 @@
+"""
+Minimal protobuf wire format reader, to peek into serialized SubscribeUpdate messages without
+deserializing them into Python objects.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+from google.protobuf.internal import api_implementation
+
+# Wire types of the protobuf encoding
+VARINT, FIXED64, LENGTH_DELIMITED, FIXED32 = 0, 1, 2, 5
+
+# Field numbers of the SubscribeUpdate `update_oneof` members
+UPDATE_KINDS = {
+    2: "account", 3: "slot", 4: "transaction", 10: "transaction_status", 5: "block",
+    6: "ping", 9: "pong", 7: "block_meta", 8: "entry",
+}
+
+def protobuf_backend() -> str:
+    """Name of the protobuf runtime in use: "upb" (C, fastest), "cpp" or "python"."""
+    return api_implementation.Type()
+
+def read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    """
+    Read a varint.
+
+    Args:
+        data: Serialized message
+        position: Offset of the varint
+
+    Returns:
+        Tuple[int, int]: The value and the offset right after it
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def iter_fields(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Iterate over the fields of a serialized message without decoding their values.
+
+    Args:
+        data: Serialized message
+        start: Offset of the first field
+        end: Offset right after the last field, the end of `data` by default
+
+    Yields:
+        Tuple[int, int, int, int]: Field number, wire type, and for length-delimited fields the start and
+        end offsets of the value; for varints the value and the offset after it
+    """
+    end = len(data) if end is None else end
+    position = start
+    while position < end:
+        key, position = read_varint(data, position)
+        field_number, wire_type = key >> 3, key & 7
+        if wire_type == LENGTH_DELIMITED:
+            length, position = read_varint(data, position)
+            yield field_number, wire_type, position, position + length
+            position += length
+        elif wire_type == VARINT:
+            value, position = read_varint(data, position)
+            yield field_number, wire_type, value, position
+        elif wire_type == FIXED64:
+            yield field_number, wire_type, position, position + 8
+            position += 8
+        elif wire_type == FIXED32:
+            yield field_number, wire_type, position, position + 4
+            position += 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type} at offset {position}")
+
+def find_field(data: bytes, field_number: int, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """Start and end offsets of the first length-delimited field with the given number, None if absent."""
+    for number, wire_type, value_start, value_end in iter_fields(data, start, end):
+        if number == field_number and wire_type == LENGTH_DELIMITED:
+            return value_start, value_end
+    return None
+
+def peek_update_kind(data: bytes) -> Optional[str]:
+    """Which `update_oneof` member a serialized SubscribeUpdate holds ("transaction", "ping", ...)."""
+    for number, _, _, _ in iter_fields(data):
+        kind = UPDATE_KINDS.get(number)
+        if kind is not None:
+            return kind
+    return None
+
+def peek_filters(data: bytes) -> List[str]:
+    """Filter names of a serialized SubscribeUpdate."""
+    return [
+        data[start:end].decode()
+        for number, wire_type, start, end in iter_fields(data)
+        if number == 1 and wire_type == LENGTH_DELIMITED
+    ]
+
+# Field number of the slot in the update_oneof members that have one: transaction (4) and block (5)
+SLOT_FIELDS = {4: 2, 5: 1}
+
+def peek_slot(data: bytes) -> Optional[int]:
+    """Slot of a serialized SubscribeUpdate transaction or block, None for other updates."""
+    for number, wire_type, start, end in iter_fields(data):
+        slot_field = SLOT_FIELDS.get(number)
+        if slot_field is not None and wire_type == LENGTH_DELIMITED:
+            for inner_number, inner_wire_type, value, _ in iter_fields(data, start, end):
+                if inner_number == slot_field and inner_wire_type == VARINT:
+                    return value
+            return 0
+    return None
+
+def peek_signature(data: bytes) -> Optional[bytes]:
+    """
+    Signature of a serialized SubscribeUpdate transaction, following SubscribeUpdate.transaction (4) >
+    SubscribeUpdateTransaction.transaction (1) > SubscribeUpdateTransactionInfo.signature (1). None for
+    other updates.
+    """
+    span = find_field(data, 4)
+    if span is None:
+        return None
+    span = find_field(data, 1, *span)
+    if span is None:
+        return b""
+    signature = find_field(data, 1, *span)
+    return data[slice(*signature)] if signature is not None else b""
+
+def peek_instruction_data(data: bytes) -> List[bytes]:
+    """
+    Data of the top-level instructions of a serialized SubscribeUpdate transaction, following
+    SubscribeUpdate.transaction (4) > SubscribeUpdateTransaction.transaction (1) >
+    SubscribeUpdateTransactionInfo.transaction (3) > Transaction.message (2) > Message.instructions (4) >
+    CompiledInstruction.data (3).
+
+    Args:
+        data: Serialized SubscribeUpdate
+
+    Returns:
+        List[bytes]: The data of each instruction, empty for other updates
+    """
+    span = (0, len(data))
+    for field_number in (4, 1, 3, 2):
+        span = find_field(data, field_number, *span)
+        if span is None:
+            return []
+
+    instructions = []
+    for number, wire_type, start, end in iter_fields(data, *span):
+        if number == 4 and wire_type == LENGTH_DELIMITED:
+            instruction_data = find_field(data, 3, start, end)
+            instructions.append(data[slice(*instruction_data)] if instruction_data else b"")
+    return instructions